@@ -0,0 +1,50 @@
+"""create expense categorization cache table
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'expense_categorization_cache',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('household_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('cache_key', sa.String(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id'], ondelete='CASCADE')
+    )
+    op.create_index(
+        'ix_categorization_cache_key_household',
+        'expense_categorization_cache',
+        ['cache_key', 'household_id'],
+        unique=False
+    )
+    op.create_index(
+        op.f('ix_expense_categorization_cache_expires_at'),
+        'expense_categorization_cache',
+        ['expires_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_expense_categorization_cache_expires_at'), table_name='expense_categorization_cache')
+    op.drop_index('ix_categorization_cache_key_household', table_name='expense_categorization_cache')
+    op.drop_table('expense_categorization_cache')
@@ -0,0 +1,41 @@
+"""create receipt scans table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'receipt_scans',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('household_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('scanned_by', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('image_hash', sa.String(length=16), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['scanned_by'], ['users.id'], ondelete='SET NULL')
+    )
+    op.create_index(op.f('ix_receipt_scans_household_id'), 'receipt_scans', ['household_id'], unique=False)
+    op.create_index(op.f('ix_receipt_scans_created_at'), 'receipt_scans', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_receipt_scans_created_at'), table_name='receipt_scans')
+    op.drop_index(op.f('ix_receipt_scans_household_id'), table_name='receipt_scans')
+    op.drop_table('receipt_scans')
@@ -0,0 +1,49 @@
+"""create receipt jobs table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'receipt_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('household_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('submitted_by', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'processing', 'completed', 'failed', name='receiptjobstatus'), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('image_data', sa.LargeBinary(), nullable=True),
+        sa.Column('webhook_url', sa.String(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['submitted_by'], ['users.id'], ondelete='CASCADE')
+    )
+    op.create_index(op.f('ix_receipt_jobs_household_id'), 'receipt_jobs', ['household_id'], unique=False)
+    # Workers poll for due pending jobs
+    op.create_index('ix_receipt_jobs_status_next_attempt', 'receipt_jobs', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_receipt_jobs_status_next_attempt', table_name='receipt_jobs')
+    op.drop_index(op.f('ix_receipt_jobs_household_id'), table_name='receipt_jobs')
+    op.drop_table('receipt_jobs')
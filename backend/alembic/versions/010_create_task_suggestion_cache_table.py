@@ -0,0 +1,34 @@
+"""create task suggestion cache table
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_suggestion_cache',
+        sa.Column('household_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('suggestions', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('household_id'),
+        sa.ForeignKeyConstraint(['household_id'], ['households.id'], ondelete='CASCADE')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_suggestion_cache')
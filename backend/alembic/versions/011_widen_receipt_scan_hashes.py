@@ -0,0 +1,42 @@
+"""widen receipt scan hashes
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 64-bit hashes can't be compared with the new 256-bit ones, and the scans
+    # only cache AI extractions, so they are dropped rather than converted
+    op.execute('DELETE FROM receipt_scans')
+    op.alter_column(
+        'receipt_scans', 'image_hash',
+        existing_type=sa.String(length=16), type_=sa.String(length=64), existing_nullable=False,
+    )
+    op.add_column('receipt_scans', sa.Column('content_hash', sa.String(length=64), nullable=False))
+    op.create_index(
+        'ix_receipt_scans_household_content_hash', 'receipt_scans',
+        ['household_id', 'content_hash'], unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM receipt_scans')
+    op.drop_index('ix_receipt_scans_household_content_hash', table_name='receipt_scans')
+    op.drop_column('receipt_scans', 'content_hash')
+    op.alter_column(
+        'receipt_scans', 'image_hash',
+        existing_type=sa.String(length=64), type_=sa.String(length=16), existing_nullable=False,
+    )
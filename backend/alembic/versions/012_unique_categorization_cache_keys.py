@@ -0,0 +1,45 @@
+"""unique categorization cache keys
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Concurrent misses may have stored the same key twice, and the rows only
+    # cache AI results, so they are dropped rather than deduplicated
+    op.execute('DELETE FROM expense_categorization_cache')
+    op.drop_index('ix_categorization_cache_key_household', table_name='expense_categorization_cache')
+    # household_id is NULL in the global tier and NULLs never conflict, so
+    # each tier gets its own partial unique index
+    op.create_index(
+        'ix_categorization_cache_key_household', 'expense_categorization_cache',
+        ['cache_key', 'household_id'], unique=True,
+        postgresql_where=sa.text('household_id IS NOT NULL'),
+    )
+    op.create_index(
+        'ix_categorization_cache_key_global', 'expense_categorization_cache',
+        ['cache_key'], unique=True,
+        postgresql_where=sa.text('household_id IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categorization_cache_key_global', table_name='expense_categorization_cache')
+    op.drop_index('ix_categorization_cache_key_household', table_name='expense_categorization_cache')
+    op.create_index(
+        'ix_categorization_cache_key_household', 'expense_categorization_cache',
+        ['cache_key', 'household_id'], unique=False,
+    )
@@ -3,14 +3,19 @@ API dependencies for FastAPI endpoints.
 Common dependencies used across multiple endpoints.
 """
 
+import uuid
+from typing import Any, Dict, List, Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from jose import JWTError
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import verify_token
 from app.models.user import User
+from app.models.household import HouseholdMember, MemberRole
 
 # Security scheme for JWT bearer token
 security = HTTPBearer()
@@ -22,6 +27,10 @@ def get_current_user(
     """
     Get the current authenticated user from JWT token.
 
+    When the token carries embedded household membership claims, their
+    membership version is checked against the user row and the claims are
+    exposed as ``user.household_roles`` for membership checks.
+
     Args:
         credentials: HTTP authorization credentials containing the bearer token
         db: Database session
@@ -30,7 +39,7 @@ def get_current_user(
         User object if authentication successful
 
     Raises:
-        HTTPException: If token is invalid or user not found
+        HTTPException: If token is invalid, user not found or membership claims are stale
     """
     try:
         # Verify token and get payload
@@ -63,8 +72,155 @@ def get_current_user(
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
 
+    user.household_roles = _household_roles_from_claims(payload, user)
+    # Writes committed in this session keep the user on the primary
+    db.info["user_id"] = user.id
+
     return user
 
 
+def _household_roles_from_claims(
+    payload: Dict[str, Any], user: User
+) -> Optional[Dict[uuid.UUID, MemberRole]]:
+    """
+    Extract household roles from token claims.
+
+    Returns None when claims are disabled or absent, so callers fall back to
+    querying HouseholdMember.
+
+    Raises:
+        HTTPException: If the claims were issued for an older membership version
+    """
+    if not settings.JWT_EMBED_MEMBERSHIPS or "hh" not in payload:
+        return None
+
+    if payload.get("mv") != user.membership_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Household memberships have changed, please refresh your token",
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+
+    try:
+        return {
+            uuid.UUID(household_id): MemberRole(role)
+            for household_id, role in payload["hh"].items()
+        }
+    except (AttributeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def build_access_token_claims(user: User, db: Session) -> Dict[str, Any]:
+    """
+    Build the claims to encode in a user's access token.
+
+    Args:
+        user: User the token is issued for
+        db: Database session
+
+    Returns:
+        Token claims, including household memberships when enabled
+    """
+    claims: Dict[str, Any] = {"sub": str(user.id)}
+
+    if settings.JWT_EMBED_MEMBERSHIPS:
+        memberships = (
+            db.query(HouseholdMember.household_id, HouseholdMember.role)
+            .filter(HouseholdMember.user_id == user.id)
+            .all()
+        )
+        claims["hh"] = {str(household_id): role.value for household_id, role in memberships}
+        claims["mv"] = user.membership_version
+
+    return claims
+
+
+def get_claimed_membership(
+    household_id: uuid.UUID, current_user: User
+) -> Optional[HouseholdMember]:
+    """
+    Resolve household membership from the current user's token claims.
+
+    Args:
+        household_id: ID of the household
+        current_user: Current authenticated user
+
+    Returns:
+        Transient HouseholdMember built from the claims, or None if the token
+        carries no claims and membership must be checked in the database
+
+    Raises:
+        HTTPException: If the claims show the user is not a member
+    """
+    if current_user.household_roles is None:
+        return None
+
+    role = current_user.household_roles.get(household_id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this household",
+        )
+
+    return HouseholdMember(household_id=household_id, user_id=current_user.id, role=role)
+
+
+def get_member_household_ids(current_user: User, db: Session) -> List[uuid.UUID]:
+    """
+    IDs of the households the current user belongs to.
+
+    Read from the token claims when present, otherwise from the primary
+    database, so endpoints can resolve access before routing to a replica.
+
+    Args:
+        current_user: Current authenticated user
+        db: Database session
+
+    Returns:
+        Household IDs
+    """
+    if current_user.household_roles is not None:
+        return list(current_user.household_roles)
+
+    rows = db.query(HouseholdMember.household_id).filter(HouseholdMember.user_id == current_user.id)
+    return [row.household_id for row in rows]
+
+
+def bump_membership_version(db: Session, *user_ids: uuid.UUID) -> None:
+    """
+    Invalidate membership claims in existing tokens for the given users.
+
+    Must be called in the same transaction as the membership change.
+    """
+    db.query(User).filter(User.id.in_(user_ids)).update(
+        {User.membership_version: User.membership_version + 1},
+        synchronize_session="fetch",
+    )
+
+
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """
+    Get the current user, requiring them to be an admin (listed in ADMIN_EMAILS).
+
+    Raises:
+        HTTPException: If the user is not an admin
+    """
+    if current_user.email.lower() not in {email.lower() for email in settings.ADMIN_EMAILS}:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
+
+
 # Re-export commonly used dependencies
-__all__ = ["get_db", "get_current_user"]
+__all__ = [
+    "get_db",
+    "get_current_user",
+    "get_current_admin",
+    "get_member_household_ids",
+    "build_access_token_claims",
+    "get_claimed_membership",
+    "bump_membership_version",
+]
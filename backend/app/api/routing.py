@@ -0,0 +1,64 @@
+"""
+Route class that hands database connections back before responses are sent.
+
+FastAPI closes a get_db session only after the response has been
+serialized and sent, so every request held its pooled connection through
+serialization and the network write as well as the endpoint itself. With
+Neon's small pool that time decides how many requests can use the database
+at once. SessionReleasingRoute ends the session's transaction as soon as
+the endpoint returns, and the session itself is still closed by get_db as
+before.
+"""
+
+import functools
+import inspect
+from typing import Any, Callable, Dict
+
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+
+from app.core.database import release_connection
+
+
+def _release_sessions(values: Dict[str, Any]) -> None:
+    """Release the connection of every session among an endpoint's arguments."""
+    for value in values.values():
+        if isinstance(value, Session):
+            release_connection(value)
+
+
+def release_sessions_on_return(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap an endpoint so that its sessions release their connections when it returns.
+
+    Sessions are found among the endpoint's own arguments. The same session
+    reaches get_current_user too, because FastAPI caches get_db per
+    request. Streaming endpoints are returned unchanged because they use the
+    session while the response is being sent.
+    """
+    if inspect.isgeneratorfunction(endpoint) or inspect.isasyncgenfunction(endpoint):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(**values: Any) -> Any:
+            try:
+                return await endpoint(**values)
+            finally:
+                _release_sessions(values)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(**values: Any) -> Any:
+        try:
+            return endpoint(**values)
+        finally:
+            _release_sessions(values)
+    return wrapper
+
+
+class SessionReleasingRoute(APIRoute):
+    """APIRoute whose endpoint releases its database connection before the response is serialized."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, release_sessions_on_return(endpoint), **kwargs)
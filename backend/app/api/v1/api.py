@@ -4,7 +4,7 @@ API v1 router that includes all endpoint routers.
 
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, households, todos, expenses, shopping, sync
+from app.api.v1.endpoints import admin, auth, households, todos, expenses, shopping, sync
 
 api_router = APIRouter()
 
@@ -25,3 +25,6 @@ api_router.include_router(shopping.router, prefix="/shopping-lists", tags=["shop
 
 # Include sync endpoints
 api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+
+# Include admin endpoints
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,63 @@
+"""
+Admin-only endpoints for diagnosing production performance.
+"""
+
+import time
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import get_current_admin
+from app.core.profiling import PROFILE_HEADER, request_profiler, sign_profile_token
+from app.models.user import User
+from app.schemas.admin import ProfileSummary, ProfileTokenResponse
+
+router = APIRouter(route_class=SessionReleasingRoute)
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+def list_profiles(current_user: User = Depends(get_current_admin)):
+    """
+    List the request profiles kept by this worker, newest first.
+    """
+    return [
+        ProfileSummary(
+            id=profile.id,
+            started_at=profile.started_at,
+            method=profile.method,
+            endpoint=profile.endpoint,
+            path=profile.path,
+            status_code=profile.status_code,
+            duration_ms=profile.duration_ms,
+            samples=profile.samples,
+            forced=profile.forced,
+        )
+        for profile in reversed(request_profiler.profiles)
+    ]
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: int, current_user: User = Depends(get_current_admin)):
+    """
+    Get a profile's samples in collapsed stack format.
+
+    Each line is "outer;...;inner count"; feed it to flamegraph.pl,
+    speedscope or inferno to render a flamegraph.
+    """
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return Response(content=profile.collapsed(), media_type="text/plain")
+
+
+@router.post("/profiles/token", response_model=ProfileTokenResponse)
+def create_profile_token(
+    ttl_seconds: int = Query(900, ge=1, le=86400),
+    current_user: User = Depends(get_current_admin),
+):
+    """
+    Create a signed X-Profile header value; requests sending it are always profiled.
+    """
+    expires_at = int(time.time()) + ttl_seconds
+    return ProfileTokenResponse(header=PROFILE_HEADER, token=sign_profile_token(expires_at), expires_at=expires_at)
@@ -6,10 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
+from opentelemetry.trace import SpanKind
 
-from app.api.deps import get_db, get_current_user
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import get_db, get_current_user, build_access_token_claims
 from app.core.config import settings
 from app.core.security import create_access_token, decode_access_token
+from app.core.tracing import traced
 from app.models.user import User
 from app.schemas.auth import (
     GoogleTokenRequest,
@@ -20,7 +23,7 @@ from app.schemas.auth import (
     RefreshTokenResponse,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
 
 @router.post("/google/mobile", response_model=TokenResponse, status_code=status.HTTP_200_OK)
@@ -43,9 +46,10 @@ async def google_login_mobile(token_request: GoogleTokenRequest, db: Session = D
     """
     try:
         # Verify Google ID token
-        idinfo = id_token.verify_oauth2_token(
-            token_request.id_token, google_requests.Request(), settings.GOOGLE_CLIENT_ID
-        )
+        with traced("auth google.verify_token", kind=SpanKind.CLIENT):
+            idinfo = id_token.verify_oauth2_token(
+                token_request.id_token, google_requests.Request(), settings.GOOGLE_CLIENT_ID
+            )
 
         # Extract user information from token
         google_id = idinfo.get("sub")
@@ -88,7 +92,7 @@ async def google_login_mobile(token_request: GoogleTokenRequest, db: Session = D
                 db.refresh(user)
 
         # Create JWT access token (also serves as refresh token for simplicity)
-        access_token = create_access_token(data={"sub": str(user.id)})
+        access_token = create_access_token(data=build_access_token_claims(user, db))
         expires_in = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60  # Convert to seconds
 
         return TokenResponse(
@@ -143,7 +147,7 @@ async def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_
             )
         
         # Create new access token
-        new_access_token = create_access_token(data={"sub": str(user.id)})
+        new_access_token = create_access_token(data=build_access_token_claims(user, db))
         expires_in = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
         
         return RefreshTokenResponse(
@@ -6,14 +6,16 @@ import uuid
 from datetime import datetime, timedelta
 from typing import List, Optional
 from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, extract
+from sqlalchemy import func, or_, extract
 
-from app.api.deps import get_current_user, get_db
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import get_current_user, get_db, get_claimed_membership, get_member_household_ids
 from app.models.user import User
 from app.models.household import Household, HouseholdMember
 from app.models.expense import Expense, ExpenseSplit, ExpenseCategory, SplitType
+from app.models.receipt import ReceiptJob
 from app.schemas.expense import (
     ExpenseCreate,
     ExpenseUpdate,
@@ -28,10 +30,30 @@ from app.schemas.expense import (
     MonthlyExpenseStats,
     TaskSuggestionsResponse,
     TaskSuggestion,
+    CategorizeExpenseRequest,
+    CategorizeExpenseResponse,
+    CategorizeExpensesBatchRequest,
+    CategorizeExpensesBatchResponse,
+    ReceiptOCRResponse,
+    ReceiptJobResponse,
 )
+from app.schemas.base import schema_columns
+from app.core.config import settings
 from app.core.database import utc_now
+from app.core.replicas import replica_router
+from app.services.ai_service import AIService, get_ai_service
+from app.services.receipt_processing import ReceiptImageError
+from app.services.receipt_scanning import scan_receipt
+from app.services.receipt_jobs import (
+    ReceiptJobQueue,
+    WebhookURLError,
+    get_receipt_job_queue,
+    submit_receipt_job,
+    validate_webhook_url,
+)
+from app.services.task_suggestions import task_suggestion_cache
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
 
 def verify_household_membership(
@@ -53,6 +75,11 @@ def verify_household_membership(
     Raises:
         HTTPException: If user is not a member
     """
+    # Membership claims in the access token make the lookup unnecessary
+    claimed = get_claimed_membership(household_id, current_user)
+    if claimed is not None:
+        return claimed
+
     member = (
         db.query(HouseholdMember)
         .filter(
@@ -195,18 +222,27 @@ def list_expenses(
     - If is_personal=True, only personal expenses are returned
     - If is_personal=False, only shared expenses are returned
     """
-    query = db.query(Expense).join(
-        HouseholdMember,
-        and_(
-            HouseholdMember.household_id == Expense.household_id,
-            HouseholdMember.user_id == current_user.id,
-        ),
+    # Resolve access on the primary, then read the expenses from a replica
+    if household_id:
+        verify_household_membership(household_id, current_user, db)
+        household_ids = [household_id]
+    else:
+        household_ids = get_member_household_ids(current_user, db)
+    replica_router.route(db, current_user.id)
+
+    # Select plain rows (creator details joined in) that the response model
+    # validates directly, rather than loading Expense objects and copying them
+    query = db.query(
+        *schema_columns(ExpenseResponse, Expense),
+        User.full_name.label("creator_name"),
+        User.email.label("creator_email"),
+    ).join(
+        User, User.id == Expense.created_by,
+    ).filter(
+        Expense.household_id.in_(household_ids),
     )
 
     # Apply filters
-    if household_id:
-        verify_household_membership(household_id, current_user, db)
-        query = query.filter(Expense.household_id == household_id)
 
     if category:
         query = query.filter(Expense.category == category)
@@ -223,30 +259,7 @@ def list_expenses(
     # Order by date descending
     query = query.order_by(Expense.date.desc())
 
-    expenses = query.offset(skip).limit(limit).all()
-
-    # Enrich with creator details
-    result = []
-    for expense in expenses:
-        expense_dict = {
-            "id": expense.id,
-            "household_id": expense.household_id,
-            "created_by": expense.created_by,
-            "amount": expense.amount,
-            "description": expense.description,
-            "category": expense.category,
-            "payment_method": expense.payment_method,
-            "date": expense.date,
-            "split_type": expense.split_type,
-            "is_personal": expense.is_personal,
-            "created_at": expense.created_at,
-            "updated_at": expense.updated_at,
-            "creator_name": expense.creator.full_name,
-            "creator_email": expense.creator.email,
-        }
-        result.append(ExpenseResponse(**expense_dict))
-
-    return result
+    return query.offset(skip).limit(limit).all()
 
 
 @router.get("/{expense_id}", response_model=ExpenseWithSplits)
@@ -267,6 +280,7 @@ def get_expense(
     # Verify user is a member of the household
     verify_household_membership(expense.household_id, current_user, db)
 
+    replica_router.route(db, current_user.id)
     return get_expense_with_details(expense_id, db)
 
 
@@ -461,6 +475,7 @@ def get_household_summary(
     """Get expense summary for a household."""
     # Verify user is a member
     verify_household_membership(household_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Get all expenses for household (excluding personal)
     expenses = (
@@ -553,22 +568,21 @@ def get_personal_analytics(
     period_end = utc_now()
     period_start = period_end - timedelta(days=30 * months)
 
+    # Resolve access on the primary, then read the expenses from a replica
+    if household_id:
+        verify_household_membership(household_id, current_user, db)
+        household_ids = [household_id]
+    else:
+        household_ids = get_member_household_ids(current_user, db)
+    replica_router.route(db, current_user.id)
+
     # Build query
-    query = db.query(Expense).join(
-        HouseholdMember,
-        and_(
-            HouseholdMember.household_id == Expense.household_id,
-            HouseholdMember.user_id == current_user.id,
-        ),
-    ).filter(
+    query = db.query(Expense).filter(
+        Expense.household_id.in_(household_ids),
         Expense.date >= period_start,
         Expense.date <= period_end,
     )
 
-    if household_id:
-        verify_household_membership(household_id, current_user, db)
-        query = query.filter(Expense.household_id == household_id)
-
     expenses = query.all()
 
     # Calculate totals
@@ -652,17 +666,208 @@ def get_personal_analytics(
     )
 
 
+@router.post("/ai/categorize", response_model=CategorizeExpenseResponse)
+async def categorize_expense(
+    request: CategorizeExpenseRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ai_service: AIService = Depends(get_ai_service),
+):
+    """
+    Suggest a category for an expense.
+
+    Repeated descriptions are answered from the categorization cache; pass
+    household_id to use (and populate) that household's cache tier.
+    """
+    if request.household_id is not None:
+        verify_household_membership(request.household_id, current_user, db)
+
+    result = await ai_service.categorize_expense(
+        description=request.description,
+        amount=float(request.amount),
+        context=request.context,
+        household_id=request.household_id,
+        db=db,
+    )
+
+    return to_categorize_response(result)
+
+
+@router.post("/ai/categorize/batch", response_model=CategorizeExpensesBatchResponse)
+async def categorize_expenses_batch(
+    request: CategorizeExpensesBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ai_service: AIService = Depends(get_ai_service),
+):
+    """
+    Suggest categories for several expenses, e.g. for a bulk import.
+
+    Expenses that miss the cache and the local categorizer are sent to the
+    AI in batched calls rather than one call each.
+    """
+    if request.household_id is not None:
+        verify_household_membership(request.household_id, current_user, db)
+
+    results = await ai_service.categorize_expenses_batch(
+        [
+            {"description": item.description, "amount": float(item.amount), "context": item.context}
+            for item in request.expenses
+        ],
+        household_id=request.household_id,
+        db=db,
+    )
+
+    return CategorizeExpensesBatchResponse(
+        results=[to_categorize_response(result) for result in results]
+    )
+
+
+@router.post("/ai/ocr", response_model=ReceiptOCRResponse)
+async def scan_receipt_image(
+    file: UploadFile = File(..., description="Receipt image"),
+    household_id: Optional[uuid.UUID] = Query(
+        None, description="Household to check for earlier scans of the same receipt"
+    ),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    ai_service: AIService = Depends(get_ai_service),
+):
+    """
+    Extract expense data from a receipt image.
+
+    The image is auto-rotated, cropped, converted to grayscale and downsized
+    before it is sent to the AI. With household_id, a re-upload of a file
+    already scanned in the household is answered from the earlier scan, a
+    similar-looking receipt with the same details is reported as a duplicate
+    of it, and expenses probably entered from it are listed.
+    """
+    if household_id is not None:
+        verify_household_membership(household_id, current_user, db)
+
+    image_data = await read_receipt_upload(file)
+
+    try:
+        result = await scan_receipt(
+            ai_service, db, image_data, household_id=household_id, user_id=current_user.id
+        )
+    except ReceiptImageError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read receipt image",
+        )
+
+    return ReceiptOCRResponse(**{"success": False, **result})
+
+
+@router.post(
+    "/ai/ocr/jobs", response_model=ReceiptJobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def create_receipt_job(
+    file: UploadFile = File(..., description="Receipt image"),
+    household_id: Optional[uuid.UUID] = Query(
+        None, description="Household to check for earlier scans of the same receipt"
+    ),
+    webhook_url: Optional[str] = Form(None, description="URL to POST the job outcome to"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    job_queue: Optional[ReceiptJobQueue] = Depends(get_receipt_job_queue),
+):
+    """
+    Submit a receipt for OCR in the background.
+
+    Returns immediately with a job to poll via GET /ai/ocr/jobs/{job_id}.
+    If webhook_url is given, the outcome is also POSTed there, signed with
+    an X-Flatmates-Signature HMAC-SHA256 header keyed with
+    RECEIPT_WEBHOOK_SECRET. Its host must resolve to
+    public addresses only (and be in RECEIPT_WEBHOOK_ALLOWED_HOSTS, if set).
+    """
+    if household_id is not None:
+        verify_household_membership(household_id, current_user, db)
+
+    if webhook_url is not None:
+        try:
+            await validate_webhook_url(webhook_url)
+        except WebhookURLError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    image_data = await read_receipt_upload(file)
+    job = submit_receipt_job(
+        db, image_data, current_user.id, household_id=household_id, webhook_url=webhook_url
+    )
+    if job_queue is not None:
+        job_queue.notify(job.id)
+
+    return job
+
+
+@router.get("/ai/ocr/jobs/{job_id}", response_model=ReceiptJobResponse)
+def get_receipt_job(
+    job_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the status of a background receipt OCR job, and its result once completed.
+    """
+    job = db.query(ReceiptJob).filter(ReceiptJob.id == job_id).first()
+    if job is None or (job.household_id is None and job.submitted_by != current_user.id):
+        raise HTTPException(status_code=404, detail="Receipt job not found")
+
+    if job.household_id is not None:
+        verify_household_membership(job.household_id, current_user, db)
+
+    return job
+
+
+async def read_receipt_upload(file: UploadFile) -> bytes:
+    """
+    Read an uploaded receipt image.
+
+    Raises:
+        HTTPException: If the upload is not an image or is too large
+    """
+    if not (file.content_type or "").startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Receipt must be an image",
+        )
+
+    image_data = await file.read(settings.RECEIPT_MAX_UPLOAD_BYTES + 1)
+    if len(image_data) > settings.RECEIPT_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Receipt image is too large",
+        )
+    return image_data
+
+
+def to_categorize_response(result: dict) -> CategorizeExpenseResponse:
+    """Convert an AI service categorization to its response schema."""
+    return CategorizeExpenseResponse(
+        category=result.get("category", "Other"),
+        subcategory=result.get("subcategory"),
+        confidence=result.get("confidence", 0.0),
+        reasoning=result.get("reasoning") or "",
+        suggested_tags=result.get("suggested_tags") or [],
+        source=result["source"],
+    )
+
+
 @router.post("/ai/suggest-tasks", response_model=TaskSuggestionsResponse)
 async def get_task_suggestions(
     household_id: uuid.UUID = Query(..., description="Household ID to get suggestions for"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    ai_service: AIService = Depends(get_ai_service),
 ):
     """
     Get AI-powered task suggestions for a household.
 
     Uses AI to analyze the household context, existing tasks, and recent expenses
-    to suggest practical tasks for the flatmates.
+    to suggest practical tasks for the flatmates. Suggestions are cached per
+    household and refreshed in the background once its todos, expenses or
+    members change.
     """
     # Verify user is a member of the household
     verify_household_membership(household_id, current_user, db)
@@ -672,70 +877,9 @@ async def get_task_suggestions(
     if not household:
         raise HTTPException(status_code=404, detail="Household not found")
 
-    # Get member count
-    member_count = (
-        db.query(HouseholdMember)
-        .filter(HouseholdMember.household_id == household_id)
-        .count()
-    )
-
-    # Get existing todos (import Todo model at the top if not already)
-    from app.models.todo import Todo, TodoStatus
-
-    existing_tasks = (
-        db.query(Todo)
-        .filter(
-            Todo.household_id == household_id,
-            Todo.status != TodoStatus.COMPLETED,
-        )
-        .limit(10)
-        .all()
-    )
-
-    # Get recent expenses
-    recent_expenses = (
-        db.query(Expense)
-        .filter(Expense.household_id == household_id)
-        .order_by(Expense.created_at.desc())
-        .limit(10)
-        .all()
-    )
-
-    # Build context for AI
-    household_context = {
-        "name": household.name,
-        "member_count": member_count,
-    }
-
-    task_dicts = [
-        {
-            "title": t.title,
-            "description": t.description or "",
-            "status": t.status.value if hasattr(t.status, 'value') else str(t.status),
-            "priority": t.priority.value if hasattr(t.priority, 'value') else str(t.priority),
-        }
-        for t in existing_tasks
-    ]
-
-    expense_dicts = [
-        {
-            "amount": float(e.amount),
-            "description": e.description,
-            "category": e.category.value if hasattr(e.category, 'value') else str(e.category),
-        }
-        for e in recent_expenses
-    ]
-
-    # Try to get AI suggestions
+    # Try to get AI suggestions, reusing them while the household is unchanged
     try:
-        from app.services.ai_service import AIService
-
-        ai_service = AIService()
-        suggestions = await ai_service.suggest_tasks(
-            household_context=household_context,
-            existing_tasks=task_dicts,
-            recent_expenses=expense_dicts,
-        )
+        suggestions, cached = await task_suggestion_cache.get_suggestions(ai_service, db, household)
 
         # Convert to response format
         return TaskSuggestionsResponse(
@@ -748,7 +892,8 @@ async def get_task_suggestions(
                     reasoning=s.get("reasoning", "AI suggestion"),
                 )
                 for s in suggestions
-            ]
+            ],
+            cached=cached,
         )
     except Exception as e:
         # Return empty suggestions if AI is not available
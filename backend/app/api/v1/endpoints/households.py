@@ -9,7 +9,13 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_user, get_db
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import (
+    get_current_user,
+    get_db,
+    get_claimed_membership,
+    bump_membership_version,
+)
 from app.models.user import User
 from app.models.household import (
     Household,
@@ -29,8 +35,9 @@ from app.schemas.household import (
     MemberWithUser,
 )
 from app.core.database import utc_now
+from app.core.replicas import replica_router
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
 
 def get_current_household(
@@ -57,7 +64,7 @@ def get_current_household(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Household not found")
 
     # Check if user is a member
-    member = (
+    member = get_claimed_membership(household_id, current_user) or (
         db.query(HouseholdMember)
         .filter(
             HouseholdMember.household_id == household_id, HouseholdMember.user_id == current_user.id
@@ -92,7 +99,7 @@ def check_owner_permission(
     Raises:
         HTTPException: If user is not owner
     """
-    member = (
+    member = get_claimed_membership(household_id, current_user) or (
         db.query(HouseholdMember)
         .filter(
             HouseholdMember.household_id == household_id, HouseholdMember.user_id == current_user.id
@@ -142,6 +149,7 @@ def create_household(
         user_id=current_user.id, household_id=household.id, role=MemberRole.OWNER
     )
     db.add(member)
+    bump_membership_version(db, current_user.id)
     db.commit()
     db.refresh(household)
 
@@ -161,8 +169,10 @@ def list_my_households(
     """
     List all households for current user.
     """
-    # Get all household memberships for user
+    # Get all household memberships for user, from the primary so removed
+    # members don't see the household on a lagging replica
     memberships = db.query(HouseholdMember).filter(HouseholdMember.user_id == current_user.id).all()
+    replica_router.route(db, current_user.id)
 
     households = []
     for membership in memberships:
@@ -186,11 +196,15 @@ def list_my_households(
 
 @router.get("/{household_id}", response_model=HouseholdWithMembers)
 def get_household_details(
-    household: Household = Depends(get_current_household), db: Session = Depends(get_db)
+    household: Household = Depends(get_current_household),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ):
     """
     Get household details with members list.
     """
+    replica_router.route(db, current_user.id)
+
     # Get all members with user details
     members = db.query(HouseholdMember).filter(HouseholdMember.household_id == household.id).all()
 
@@ -229,6 +243,8 @@ def list_invites(
     List all pending invites for a household.
     Any member can view invites.
     """
+    replica_router.route(db, current_user.id)
+
     invites = (
         db.query(HouseholdInvite)
         .filter(
@@ -419,6 +435,7 @@ def join_household(
 
     # Mark invite as accepted
     invite.status = InviteStatus.ACCEPTED
+    bump_membership_version(db, current_user.id)
     db.commit()
 
     # Get household details
@@ -477,6 +494,7 @@ def update_member_role(
 
     # Update role
     member.role = role_data.role
+    bump_membership_version(db, member.user_id)
     db.commit()
     db.refresh(member)
 
@@ -533,6 +551,7 @@ def remove_member(
 
     # Remove member
     db.delete(member)
+    bump_membership_version(db, member.user_id)
     db.commit()
 
     return None
@@ -591,6 +610,7 @@ def leave_household(
 
     # Remove membership
     db.delete(member)
+    bump_membership_version(db, current_user.id)
 
     # If this was the last member, delete the household
     remaining_members = (
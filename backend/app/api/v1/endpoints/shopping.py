@@ -9,7 +9,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 from decimal import Decimal
 
-from app.api.deps import get_current_user, get_db
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import get_current_user, get_db, get_claimed_membership
 from app.models.user import User
 from app.models.household import HouseholdMember
 from app.models.shopping import ShoppingList, ShoppingListItem, ItemCategory, ShoppingListStatus
@@ -28,8 +29,9 @@ from app.schemas.shopping import (
     ShoppingListStats,
 )
 from app.core.database import utc_now
+from app.core.replicas import replica_router
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
 
 def verify_household_access(
@@ -51,6 +53,11 @@ def verify_household_access(
     Raises:
         HTTPException: If user is not a member
     """
+    # Membership claims in the access token make the lookup unnecessary
+    claimed = get_claimed_membership(household_id, current_user)
+    if claimed is not None:
+        return claimed
+
     member = (
         db.query(HouseholdMember)
         .filter(
@@ -143,6 +150,7 @@ def list_shopping_lists(
     """
     # Verify household access
     verify_household_access(household_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Build query
     query = db.query(ShoppingList).filter(ShoppingList.household_id == household_id)
@@ -171,6 +179,7 @@ def get_shopping_list(
     Get details of a specific shopping list with items.
     """
     shopping_list = verify_shopping_list_access(list_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Get creator details
     creator = db.query(User).filter(User.id == shopping_list.created_by).first()
@@ -301,6 +310,7 @@ def get_shopping_list_stats(
     Get statistics for a shopping list.
     """
     shopping_list = verify_shopping_list_access(list_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Get items
     items = db.query(ShoppingListItem).filter(ShoppingListItem.shopping_list_id == list_id).all()
@@ -392,6 +402,7 @@ def list_shopping_list_items(
     Get all items for a shopping list.
     """
     shopping_list = verify_shopping_list_access(list_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Build query
     query = db.query(ShoppingListItem).filter(ShoppingListItem.shopping_list_id == list_id)
@@ -573,12 +584,15 @@ def list_item_categories(
     """
     List all item categories (global + household-specific).
     """
+    if household_id:
+        verify_household_access(household_id, current_user, db)
+    replica_router.route(db, current_user.id)
+
     # Get global categories
     query = db.query(ItemCategory).filter(ItemCategory.household_id.is_(None))
 
     # Add household-specific categories if household_id provided
     if household_id:
-        verify_household_access(household_id, current_user, db)
         household_query = db.query(ItemCategory).filter(ItemCategory.household_id == household_id)
         categories = query.all() + household_query.all()
     else:
@@ -10,7 +10,9 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, get_current_user
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import get_db, get_current_user, get_claimed_membership
+from app.core.replicas import replica_router
 from app.models.user import User
 from app.models.household import HouseholdMember
 from app.models.todo import Todo
@@ -26,8 +28,9 @@ from app.schemas.sync import (
     ExpenseSyncDto,
     ExpenseSplitSyncDto,
 )
+from app.schemas.base import schema_columns
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
 
 def verify_household_membership(
@@ -36,6 +39,11 @@ def verify_household_membership(
     db: Session,
 ) -> HouseholdMember:
     """Verify user is a member of the household."""
+    # Membership claims in the access token make the lookup unnecessary
+    claimed = get_claimed_membership(household_id, current_user)
+    if claimed is not None:
+        return claimed
+
     member = (
         db.query(HouseholdMember)
         .filter(
@@ -125,7 +133,9 @@ async def sync_all(
     # Commit all changes
     db.commit()
     
-    # Fetch all data updated since last sync
+    # Fetch all data updated since last sync, from a read replica unless the
+    # user has just written (including in this request)
+    replica_router.route(db, current_user.id)
     todos = fetch_updated_todos(household_id, last_sync, db)
     shopping_lists = fetch_updated_shopping_lists(household_id, last_sync, db)
     shopping_items = fetch_updated_shopping_items(household_id, last_sync, db)
@@ -316,56 +326,28 @@ def process_expense_changes(changes, household_id, current_user, db) -> List[Syn
 
 def fetch_updated_todos(household_id, last_sync, db) -> List[TodoSyncDto]:
     """Fetch todos updated since last sync."""
-    todos = (
-        db.query(Todo)
+    rows = (
+        db.query(*schema_columns(TodoSyncDto, Todo))
         .filter(
             Todo.household_id == household_id,
             Todo.updated_at > last_sync
         )
         .all()
     )
-    return [
-        TodoSyncDto(
-            id=todo.id,
-            household_id=todo.household_id,
-            title=todo.title,
-            description=todo.description,
-            status=todo.status,
-            priority=todo.priority,
-            due_date=todo.due_date,
-            assigned_to_id=todo.assigned_to_id,
-            created_by=todo.created_by,
-            completed_at=todo.completed_at,
-            created_at=todo.created_at,
-            updated_at=todo.updated_at,
-        )
-        for todo in todos
-    ]
+    return [TodoSyncDto.model_validate(row) for row in rows]
 
 
 def fetch_updated_shopping_lists(household_id, last_sync, db) -> List[ShoppingListSyncDto]:
     """Fetch shopping lists updated since last sync."""
-    lists = (
-        db.query(ShoppingList)
+    rows = (
+        db.query(*schema_columns(ShoppingListSyncDto, ShoppingList))
         .filter(
             ShoppingList.household_id == household_id,
             ShoppingList.updated_at > last_sync
         )
         .all()
     )
-    return [
-        ShoppingListSyncDto(
-            id=sl.id,
-            household_id=sl.household_id,
-            name=sl.name,
-            description=sl.description,
-            status=sl.status,
-            created_by=sl.created_by,
-            created_at=sl.created_at,
-            updated_at=sl.updated_at,
-        )
-        for sl in lists
-    ]
+    return [ShoppingListSyncDto.model_validate(row) for row in rows]
 
 
 def fetch_updated_shopping_items(household_id, last_sync, db) -> List[ShoppingItemSyncDto]:
@@ -408,40 +390,26 @@ def fetch_updated_shopping_items(household_id, last_sync, db) -> List[ShoppingIt
 def fetch_updated_expenses(household_id, last_sync, db) -> List[ExpenseSyncDto]:
     """Fetch expenses updated since last sync."""
     expenses = (
-        db.query(Expense)
+        db.query(*schema_columns(ExpenseSyncDto, Expense))
         .filter(
             Expense.household_id == household_id,
             Expense.updated_at > last_sync
         )
         .all()
     )
-    
-    result = []
-    for expense in expenses:
-        splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == expense.id).all()
-        result.append(
-            ExpenseSyncDto(
-                id=expense.id,
-                household_id=expense.household_id,
-                created_by=expense.created_by,
-                amount=expense.amount,
-                description=expense.description,
-                category=expense.category,
-                split_type=expense.split_type,
-                date=expense.date,
-                created_at=expense.created_at,
-                updated_at=expense.updated_at,
-                splits=[
-                    ExpenseSplitSyncDto(
-                        id=split.id,
-                        expense_id=split.expense_id,
-                        user_id=split.user_id,
-                        amount_owed=split.amount_owed,
-                        is_settled=split.is_settled,
-                        settled_at=split.settled_at,
-                    )
-                    for split in splits
-                ],
-            )
-        )
-    return result
+    if not expenses:
+        return []
+
+    # Load all their splits in one query
+    splits = {}
+    for split in (
+        db.query(*schema_columns(ExpenseSplitSyncDto, ExpenseSplit))
+        .filter(ExpenseSplit.expense_id.in_([expense.id for expense in expenses]))
+        .all()
+    ):
+        splits.setdefault(split.expense_id, []).append(split)
+
+    return [
+        ExpenseSyncDto.model_validate({**expense._mapping, "splits": splits.get(expense.id, [])})
+        for expense in expenses
+    ]
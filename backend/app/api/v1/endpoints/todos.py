@@ -8,7 +8,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 
-from app.api.deps import get_current_user, get_db
+from app.api.routing import SessionReleasingRoute
+from app.api.deps import get_current_user, get_db, get_claimed_membership
 from app.models.user import User
 from app.models.household import HouseholdMember
 from app.models.todo import Todo, TodoStatus
@@ -19,9 +20,11 @@ from app.schemas.todo import (
     TodoResponse,
     TodoWithDetails,
 )
+from app.schemas.base import schema_columns
 from app.core.database import utc_now
+from app.core.replicas import replica_router
 
-router = APIRouter()
+router = APIRouter(route_class=SessionReleasingRoute)
 
 
 def verify_household_access(
@@ -43,6 +46,11 @@ def verify_household_access(
     Raises:
         HTTPException: If user is not a member
     """
+    # Membership claims in the access token make the lookup unnecessary
+    claimed = get_claimed_membership(household_id, current_user)
+    if claimed is not None:
+        return claimed
+
     member = (
         db.query(HouseholdMember)
         .filter(
@@ -155,9 +163,10 @@ def list_todos(
     """
     # Verify household access
     verify_household_access(household_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
-    # Build query
-    query = db.query(Todo).filter(Todo.household_id == household_id)
+    # Build query; plain rows are validated directly by the response model
+    query = db.query(*schema_columns(TodoResponse, Todo)).filter(Todo.household_id == household_id)
 
     # Apply filters
     if status_filter:
@@ -194,6 +203,7 @@ def get_todo(
     Get details of a specific todo with user information.
     """
     todo = verify_todo_access(todo_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Get creator details
     creator = db.query(User).filter(User.id == todo.created_by).first()
@@ -334,6 +344,7 @@ def get_todo_stats(
     """
     # Verify household access
     verify_household_access(household_id, current_user, db)
+    replica_router.route(db, current_user.id)
 
     # Get counts by status
     pending_count = db.query(Todo).filter(
@@ -3,7 +3,7 @@ Configuration settings for the Flatmates App API.
 Uses Pydantic Settings for environment variable management.
 """
 
-from typing import List
+from typing import Dict, List
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import json
@@ -20,9 +20,30 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"  # development, staging, production
     DEBUG: bool = False
     LOG_LEVEL: str = "INFO"
+    # Log records waiting for the writer thread; more are dropped
+    LOG_QUEUE_SIZE: int = 10000
+    # Share of successful requests logged, overridable per route template,
+    # e.g. {"/health": 0.01}; failed requests are always logged
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = {}
 
     # Database
     DATABASE_URL: str
+    # Connections opened at startup (readiness reports "warming" until done),
+    # and UTC hours (e.g. "7-23", empty to disable) during which an idle
+    # database is pinged every DB_KEEPALIVE_INTERVAL_SECONDS so it stays awake
+    DB_POOL_PREWARM: int = 2
+    DB_KEEPALIVE_HOURS: str = ""
+    DB_KEEPALIVE_INTERVAL_SECONDS: int = 240
+    # Read replicas for read-only endpoints and sync pulls. A replica is
+    # skipped while its lag (checked at most every REPLICA_LAG_CHECK_SECONDS)
+    # exceeds REPLICA_MAX_LAG_SECONDS. After a write the client gets a signed
+    # X-Read-After token, honoured for REPLICA_STICKY_SECONDS: until then the
+    # user only reads replicas that have replayed past their write
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_STICKY_SECONDS: float = 30.0
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_LAG_CHECK_SECONDS: float = 15.0
 
     # Redis (optional)
     REDIS_URL: str = ""
@@ -31,6 +52,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    # Embed household ids/roles in access tokens so household-scoped endpoints
+    # can authorize without a HouseholdMember lookup. Tokens are rejected once
+    # the user's memberships change and must be refreshed.
+    JWT_EMBED_MEMBERSHIPS: bool = False
 
     # Google OAuth
     GOOGLE_CLIENT_ID: str = ""
@@ -45,20 +70,130 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o"  # Default model
 
     # AI Provider Selection
-    AI_PROVIDER: str = "gemini"  # Options: "gemini", "openai", "auto"
+    AI_PROVIDERS: List[str] = ["gemini", "openai"]  # Providers calls are routed between
+    AI_PROVIDER: str = "gemini"  # Preferred provider: "gemini", "openai", "stub" or "auto"
+
+    # Offline stub provider (AI_PROVIDERS=["stub"]) for load and latency tests:
+    # simulated latency in ms, share of calls that fail, and random seed
+    AI_STUB_LATENCY_MS: float = 200.0
+    AI_STUB_JITTER_MS: float = 50.0
+    AI_STUB_FAILURE_RATE: float = 0.0
+    AI_STUB_SEED: int = 0
+
+    # AI HTTP connection pool (shared by all requests in a worker)
+    AI_HTTP_MAX_CONNECTIONS: int = 20
+    AI_HTTP_TIMEOUT_SECONDS: float = 30.0
+
+    # Concurrent AI calls allowed per provider per worker; extra calls queue
+    # for up to AI_QUEUE_TIMEOUT_SECONDS before failing
+    AI_MAX_CONCURRENCY: int = 4
+    AI_QUEUE_TIMEOUT_SECONDS: float = 10.0
+
+    # Expense categorizations packed into one LLM call, and how long a single
+    # request waits for concurrent ones to join its batch (0 disables coalescing)
+    AI_BATCH_MAX_SIZE: int = 20
+    AI_BATCH_WINDOW_MS: int = 10
+
+    # Task suggestions are reused while the household is unchanged and younger
+    # than the TTL; outdated ones up to the max stale age are served while a
+    # refresh runs in the background
+    TASK_SUGGESTIONS_CACHE_TTL_SECONDS: int = 86400  # 1 day
+    TASK_SUGGESTIONS_MAX_STALE_SECONDS: int = 604800  # 7 days
+
+    # Provider routing: a provider is skipped for AI_CIRCUIT_RESET_SECONDS
+    # after AI_CIRCUIT_FAILURE_THRESHOLD consecutive failures, and each call
+    # fails over to the next provider once its time budget runs out
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    AI_CIRCUIT_RESET_SECONDS: float = 30.0
+    AI_GEMINI_TIMEOUT_SECONDS: float = 20.0
+    AI_OPENAI_TIMEOUT_SECONDS: float = 20.0
+    # Providers are ordered by a moving average of their latency; AI_PROVIDER
+    # stays first unless another provider is this many times faster
+    AI_LATENCY_EWMA_ALPHA: float = 0.2
+    AI_LATENCY_PREFERENCE_FACTOR: float = 1.5
+    # Start a backup request on the next provider when the first one runs
+    # past its p95 latency (costs extra provider calls)
+    AI_HEDGING_ENABLED: bool = False
+
+    # Receipt images are downsized and re-encoded before OCR
+    RECEIPT_MAX_UPLOAD_BYTES: int = 10485760  # 10 MB
+    RECEIPT_MAX_DIMENSION: int = 1600
+    RECEIPT_JPEG_QUALITY: int = 75
+    RECEIPT_PREPROCESS_WORKERS: int = 2  # process pool size; 0 runs in a thread
+    # Scans within this many bits (of 256) of an earlier scan in the same
+    # household are checked against its extraction as probable duplicates
+    RECEIPT_DEDUP_MAX_DISTANCE: int = 24
+    RECEIPT_DEDUP_WINDOW_DAYS: int = 90
+
+    # Background receipt OCR jobs: "database" (durable, shared by all app
+    # processes) or "memory" (in-process, for tests and development)
+    RECEIPT_JOB_BACKEND: str = "database"
+    RECEIPT_JOB_WORKERS: int = 2  # worker tasks per process; 0 disables processing
+    RECEIPT_JOB_MAX_ATTEMPTS: int = 3
+    RECEIPT_JOB_RETRY_BASE_SECONDS: float = 5.0
+    # Poll interval after an empty poll, doubling up to the maximum while the
+    # queue stays empty; submissions and retries wake this process's workers
+    RECEIPT_JOB_POLL_SECONDS: float = 2.0
+    RECEIPT_JOB_MAX_POLL_SECONDS: float = 600.0
+    # Processing jobs older than this are retried, or failed if on their last attempt
+    RECEIPT_JOB_LEASE_SECONDS: int = 300
+    RECEIPT_JOB_REQUEUE_SECONDS: float = 600.0  # how often to look for them
+    # Hosts job webhooks may be sent to; empty allows any host that resolves
+    # to public addresses only
+    RECEIPT_WEBHOOK_ALLOWED_HOSTS: List[str] = []
+    # Key for the X-Flatmates-Signature HMAC on webhook bodies, shared with
+    # receivers (never SECRET_KEY); webhooks are sent unsigned while empty
+    RECEIPT_WEBHOOK_SECRET: str = ""
+
+    # Expense categorization cache (per-worker LRU in front of the database)
+    CATEGORIZATION_CACHE_TTL_SECONDS: int = 2592000  # 30 days
+    CATEGORIZATION_CACHE_MAX_ENTRIES: int = 10000
+    # Minimum confidence for a result to be shared across all households
+    CATEGORIZATION_CACHE_GLOBAL_MIN_CONFIDENCE: float = 0.8
+
+    # Local categorizer (keyword rules + per-household naive Bayes) tried
+    # before the LLM; it answers on its own at or above the minimum confidence
+    LOCAL_CATEGORIZER_ENABLED: bool = True
+    LOCAL_CATEGORIZER_MIN_CONFIDENCE: float = 0.8
+    LOCAL_CATEGORIZER_MIN_SAMPLES: int = 10  # categorized expenses needed to train
+    LOCAL_CATEGORIZER_RETRAIN_SECONDS: int = 3600
     
     # Observability
     ENABLE_METRICS: bool = True
     ENABLE_TRACING: bool = False  # For OpenTelemetry
+    TRACING_EXPORTER: str = "console"  # "console", "memory" or "otlp"
+    TRACING_SAMPLE_RATE: float = 1.0  # share of new traces recorded
     SENTRY_DSN: str = ""
+    # N+1 query detection: "off", "log" (warn with the call site; for staging)
+    # or "raise" (fail the request; for tests). A request is flagged when one
+    # statement shape runs more than N_PLUS_ONE_THRESHOLD times.
+    N_PLUS_ONE_DETECTION: str = "off"
+    N_PLUS_ONE_THRESHOLD: int = 10
+    # Readiness checks (/health/ready) are cached this long; a stale result is
+    # refreshed in the background, so the database is probed at most once per
+    # window and only while something polls readiness
+    HEALTH_CACHE_SECONDS: int = 30
+    # Sampling profiler: with PROFILING_ENABLED requests slower than
+    # PROFILE_SLOW_REQUEST_MS are kept (requests with a signed X-Profile
+    # header always are); the last PROFILE_BUFFER_SIZE are kept per worker
+    PROFILING_ENABLED: bool = False
+    PROFILE_SLOW_REQUEST_MS: float = 1000.0
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_BUFFER_SIZE: int = 20
+
+    # Emails of users allowed to use the admin endpoints
+    ADMIN_EMAILS: List[str] = []
 
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = []
 
-    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @field_validator(
+        "BACKEND_CORS_ORIGINS", "AI_PROVIDERS", "ADMIN_EMAILS", "DATABASE_REPLICA_URLS",
+        "RECEIPT_WEBHOOK_ALLOWED_HOSTS", mode="before",
+    )
     @classmethod
     def parse_cors_origins(cls, v):
-        """Parse CORS origins from JSON string or list."""
+        """Parse list settings from a JSON string, comma-separated string or list."""
         if isinstance(v, str):
             try:
                 return json.loads(v)
@@ -5,13 +5,14 @@ Optimized for Neon serverless PostgreSQL with retry logic for cold starts.
 """
 
 from datetime import datetime, timezone
-from sqlalchemy import create_engine, text
+from sqlalchemy import Delete, Insert, Update, create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 from sqlalchemy.exc import OperationalError, InterfaceError
 from typing import Generator
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.core.config import settings
+from app.core.db_metrics import InstrumentedQueuePool, instrument_engine
 
 
 def utc_now() -> datetime:
@@ -48,6 +49,7 @@ if not settings.DATABASE_URL.startswith("sqlite"):
         "max_overflow": 10,         # Allow burst connections
         "pool_recycle": 300,        # Recycle connections every 5 min
         "pool_timeout": 30,         # Wait up to 30s for connection
+        "poolclass": InstrumentedQueuePool,  # Times connection checkouts
     }
 
 # Create SQLAlchemy engine
@@ -58,9 +60,30 @@ engine = create_engine(
     connect_args=connect_args,
     **pool_settings,
 )
+instrument_engine(engine)
+
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from a read replica once one has been assigned.
+
+    app.core.replicas assigns a replica engine to ``info["replica"]`` for
+    read-only work, until the transaction ends. Flushes and bulk writes
+    always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, **kw):
+        """Engine for a query: the assigned replica for reads, otherwise the primary."""
+        replica = self.info.get("replica")
+        writes = self._flushing or isinstance(kw.get("clause"), (Insert, Update, Delete))
+        if replica is not None and not writes:
+            return replica
+        return super().get_bind(mapper, **kw)
+
 
 # Create SessionLocal class for database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 # Create Base class for declarative models
 Base = declarative_base()
@@ -104,6 +127,10 @@ def get_db() -> Generator:
         def read_items(db: Session = Depends(get_db)):
             ...
 
+    The session checks out a connection on its first query, not here, so
+    requests that fail before touching the database never take one. Routes
+    using SessionReleasingRoute return it as soon as the endpoint returns.
+
     Yields:
         Database session that automatically closes after use
     """
@@ -114,6 +141,24 @@ def get_db() -> Generator:
         db.close()
 
 
+def release_connection(db: Session) -> None:
+    """
+    Return a session's connection to the pool without closing the session.
+
+    Ends the open transaction the way close() would (rolling back anything
+    not committed) but keeps the identity map, so objects already loaded
+    stay readable. An attribute that still needs loading checks out a new
+    connection on access. Sessions in a SAVEPOINT are left alone.
+
+    Args:
+        db: Database session
+    """
+    transaction = db.get_transaction()
+    if transaction is None or db.in_nested_transaction():
+        return
+    transaction.close()
+
+
 def get_db_resilient() -> Generator:
     """
     Dependency function to get database session with retry logic.
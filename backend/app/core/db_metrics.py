@@ -0,0 +1,315 @@
+"""
+Database instrumentation.
+
+Engine and pool event hooks that time every SQL statement (labelled by
+operation and table), export connection pool usage, and keep a per-request
+tally of queries so slow or chatty endpoints show up in the request log.
+
+The per-request tally also drives N+1 detection: statements are reduced to
+their shape (literals and placeholders stripped) and a request that runs
+one shape more than N_PLUS_ONE_THRESHOLD times is reported together with
+the application code that issued it.
+"""
+
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import (
+    DB_CONNECTIONS_ACTIVE,
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_OVERFLOW,
+    DB_QUERY_DURATION_SECONDS,
+)
+from app.core.tracing import start_span, tracing_enabled
+
+_OPERATIONS = {"select", "insert", "update", "delete"}
+_OPERATION = re.compile(r"^\s*(\w+)")
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+[\"`]?(\w+)", re.IGNORECASE)
+
+# Literals and bind placeholders (?, %s, %(name)s, :name, $1), and the
+# parenthesised lists they form once IN clauses are expanded
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|\?|%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = get_logger(__name__)
+
+# When the last statement on the primary database completed successfully
+# (monotonic clock) and how long it took
+_last_query: Optional[Tuple[float, float]] = None
+
+
+class NPlusOneError(Exception):
+    """Raised in "raise" detection mode when a request repeats a query too often."""
+
+
+@dataclass
+class QueryStats:
+    """Queries run on behalf of one request."""
+
+    count: int = 0
+    seconds: float = 0.0
+    # Statement shape -> times run, and where the shape crossed the threshold
+    shapes: Counter = field(default_factory=Counter)
+    call_sites: Dict[str, str] = field(default_factory=dict)
+
+    def repeated(self) -> List[Tuple[str, int, str]]:
+        """Statement shapes run more than N_PLUS_ONE_THRESHOLD times, with count and call site."""
+        return [
+            (shape, self.shapes[shape], call_site)
+            for shape, call_site in self.call_sites.items()
+        ]
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """
+    Start counting the queries of the current request.
+
+    Sessions used by the request's route run in the same (copied) context,
+    so their statements are added to the returned stats.
+
+    Returns:
+        Stats updated as the request's queries complete
+    """
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+@lru_cache(maxsize=1024)
+def statement_labels(statement: str) -> Tuple[str, str]:
+    """
+    Get the operation and main table of a SQL statement for metric labels.
+
+    Tables that aren't part of the models are reported as "other" so odd
+    statements can't create new time series.
+
+    Args:
+        statement: SQL statement text
+
+    Returns:
+        (operation, table), e.g. ("select", "todos")
+    """
+    from app.core.database import Base
+
+    match = _OPERATION.match(statement)
+    operation = match.group(1).lower() if match else ""
+    if operation not in _OPERATIONS:
+        operation = "other"
+
+    match = _TABLE.search(statement)
+    table = match.group(1).lower() if match else "none"
+    if match and table not in Base.metadata.tables:
+        table = "other"
+    return operation, table
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """
+    Reduce a SQL statement to its shape, so repeats with other values match.
+
+    Args:
+        statement: SQL statement text
+
+    Returns:
+        Statement with literals and placeholders replaced by "?"
+    """
+    shape = _LITERAL.sub("?", statement)
+    shape = _VALUE_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _call_site() -> str:
+    """Innermost application frame (outside this module) on the current stack."""
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(_APP_DIR) and frame.filename != __file__:
+            return f"{os.path.relpath(frame.filename, os.path.dirname(_APP_DIR))}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+def report_repeated_queries(stats: QueryStats, endpoint: str) -> None:
+    """
+    Report N+1 query patterns found in a request.
+
+    Args:
+        stats: The request's query stats
+        endpoint: Route template of the request, for the log
+
+    Raises:
+        NPlusOneError: If N_PLUS_ONE_DETECTION is "raise" and a statement
+            shape ran more than N_PLUS_ONE_THRESHOLD times
+    """
+    repeated = stats.repeated()
+    for shape, count, call_site in repeated:
+        logger.warning(
+            "Repeated query (possible N+1)",
+            endpoint=endpoint,
+            count=count,
+            call_site=call_site,
+            statement=shape,
+        )
+
+    if repeated and settings.N_PLUS_ONE_DETECTION == "raise":
+        shape, count, call_site = repeated[0]
+        raise NPlusOneError(f"{endpoint} ran the same query {count} times from {call_site}: {shape}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Remember when the statement started, and open its span when tracing."""
+    if tracing_enabled():
+        operation, table = statement_labels(statement)
+        context._query_span = start_span(
+            f"{operation} {table}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": conn.dialect.name,
+                "db.operation": operation,
+                "db.sql.table": table,
+                "db.statement": statement,
+            },
+        )
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Record the statement's duration."""
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+
+    span = getattr(context, "_query_span", None)
+    if span is not None:
+        span.end()
+
+    context._query_elapsed = elapsed
+
+    operation, table = statement_labels(statement)
+    DB_QUERY_DURATION_SECONDS.labels(operation=operation, table=table).observe(elapsed)
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        if settings.N_PLUS_ONE_DETECTION != "off":
+            shape = statement_shape(statement)
+            stats.shapes[shape] += 1
+            if stats.shapes[shape] == settings.N_PLUS_ONE_THRESHOLD + 1:
+                stats.call_sites[shape] = _call_site()
+
+
+def _record_last_query(conn, cursor, statement, parameters, context, executemany):
+    """Remember when the primary database last completed a statement."""
+    elapsed = getattr(context, "_query_elapsed", None)
+    if elapsed is not None:
+        global _last_query
+        _last_query = (time.monotonic(), elapsed)
+
+
+def last_query() -> Optional[Tuple[float, float]]:
+    """
+    The statement the primary database completed most recently.
+
+    Read replica traffic doesn't count, as it says nothing about whether the
+    primary is reachable or its connections are warm.
+
+    Returns:
+        (seconds since it completed, its duration in seconds), or None if
+        no statement has completed yet
+    """
+    if _last_query is None:
+        return None
+    completed_at, duration = _last_query
+    return time.monotonic() - completed_at, duration
+
+
+def _handle_error(exception_context) -> None:
+    """Fail the span of a statement that raised."""
+    span = getattr(exception_context.execution_context, "_query_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR))
+        span.end()
+
+
+def _update_overflow(pool, name: str, returning: bool = False) -> None:
+    """
+    Export how far an engine's pool has grown beyond its size.
+
+    Checkin events fire before the pool takes the connection back; if the
+    pool is already full, that connection is about to be closed and no
+    longer counts as overflow.
+    """
+    if not isinstance(pool, QueuePool):
+        return
+    overflow = pool.overflow()
+    if returning and pool.checkedin() >= pool.size():
+        overflow -= 1
+    DB_POOL_OVERFLOW.labels(engine=name).set(max(0, overflow))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """Queue pool that records how long getting a connection takes."""
+
+    def connect(self):
+        """Get a connection, timing the wait for a free one (or a new connection)."""
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """
+    Attach query and pool instrumentation to an engine.
+
+    Safe to call more than once for the same engine.
+
+    Args:
+        engine: Engine to instrument
+        name: "primary", or "replica-<n>" for a read replica. Labels the
+            pool gauges, so replica pools don't add to the primary's; only
+            the primary's statements update last_query()
+    """
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if name == "primary":
+        event.listen(engine, "after_cursor_execute", _record_last_query)
+    event.listen(engine, "handle_error", _handle_error)
+
+    connections_active = DB_CONNECTIONS_ACTIVE.labels(engine=name)
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connections_active.inc()
+        _update_overflow(engine.pool, name)
+
+    def on_checkin(dbapi_connection, connection_record):
+        connections_active.dec()
+        _update_overflow(engine.pool, name, returning=True)
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
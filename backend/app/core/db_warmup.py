@@ -0,0 +1,166 @@
+"""
+Connection pool warming for serverless databases.
+
+Neon suspends idle databases and takes 2-5 seconds to wake, which used to
+land on the first request after a deploy or a quiet spell. On startup the
+warmer opens DB_POOL_PREWARM connections (at least one, so a broken
+DATABASE_URL shows up in the logs straight away), retrying while the
+database wakes, and readiness reports "warming" until it is done.
+
+During DB_KEEPALIVE_HOURS (UTC, e.g. "7-23"; empty to disable) it runs
+SELECT 1 every DB_KEEPALIVE_INTERVAL_SECONDS and tops the pool back up,
+unless real traffic queried the database within the interval. Outside
+those hours the database is left to suspend, so it isn't billed overnight.
+"""
+
+import asyncio
+import contextlib
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.pool import QueuePool
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.db_metrics import last_query
+from app.core.logging import get_logger
+from app.core.sentry import capture_exception
+
+logger = get_logger(__name__)
+
+
+def parse_active_hours(spec: str) -> Optional[Tuple[int, int]]:
+    """
+    Parse a DB_KEEPALIVE_HOURS value.
+
+    Args:
+        spec: "<start>-<end>" in whole UTC hours, end exclusive; wraps past
+            midnight when start > end (e.g. "22-6")
+
+    Returns:
+        (start, end), or None if spec is empty
+
+    Raises:
+        ValueError: If spec isn't a valid range
+    """
+    if not spec.strip():
+        return None
+    try:
+        start, end = (int(part) for part in spec.split("-"))
+    except ValueError:
+        raise ValueError(f"DB_KEEPALIVE_HOURS must look like '7-23', got {spec!r}") from None
+    if not (0 <= start <= 23 and 0 <= end <= 24) or start == end:
+        raise ValueError(f"DB_KEEPALIVE_HOURS must be a range of UTC hours, got {spec!r}")
+    return start, end
+
+
+def in_active_hours(hours: Optional[Tuple[int, int]], now: datetime) -> bool:
+    """Whether ``now`` falls in the (start, end) UTC hour range."""
+    if hours is None:
+        return False
+    start, end = hours
+    if start < end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=10),
+    retry=retry_if_exception_type((OperationalError, InterfaceError)),
+    reraise=True
+)
+def warm_pool(connections: int) -> int:
+    """
+    Open connections and return them to the pool.
+
+    All connections are checked out at once so that each is a different
+    one, and each runs SELECT 1 so that stale or recycled connections are
+    replaced now rather than on a request.
+
+    Args:
+        connections: Connections to warm, at least one; capped at the pool size
+
+    Returns:
+        Number of connections warmed
+    """
+    # Pools other than QueuePool (e.g. SQLite's) hold one connection per thread
+    size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+    opened = []
+    try:
+        for _ in range(max(1, min(connections, size))):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+class ConnectionWarmer:
+    """Warms the pool on startup and keeps the database awake during active hours."""
+
+    COLD = "cold"
+    WARMING = "warming"
+    WARM = "warm"
+    FAILED = "failed"
+
+    def __init__(self):
+        """Create a warmer; nothing happens until start()."""
+        self.state = self.COLD
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def warming(self) -> bool:
+        """Whether startup warming is still in progress."""
+        return self.state == self.WARMING
+
+    async def start(self) -> None:
+        """Start warming in the background (called on startup)."""
+        hours = parse_active_hours(settings.DB_KEEPALIVE_HOURS)
+        self.state = self.WARMING
+        self._task = asyncio.create_task(self._run(hours), name="connection-warmer")
+
+    async def stop(self) -> None:
+        """Stop warming and the keepalive loop (called on shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def warm(self) -> None:
+        """Warm the pool to DB_POOL_PREWARM connections, recording the outcome."""
+        try:
+            warmed = await asyncio.to_thread(warm_pool, settings.DB_POOL_PREWARM)
+        except Exception as e:
+            self.state = self.FAILED
+            logger.error("Database connection failed", error=str(e))
+            capture_exception(e, context="database_warmup")
+            return
+        if self.state != self.WARM:
+            logger.info("Database connection successful", connections=warmed)
+        self.state = self.WARM
+
+    async def _run(self, hours: Optional[Tuple[int, int]]) -> None:
+        """Warm once, then keep the pool warm during active hours."""
+        await self.warm()
+        if hours is None or settings.DB_KEEPALIVE_INTERVAL_SECONDS <= 0:
+            return
+
+        interval = settings.DB_KEEPALIVE_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            if not in_active_hours(hours, datetime.now(timezone.utc)):
+                continue
+            recent = last_query()
+            if recent is not None and recent[0] < interval:
+                continue
+            await self.warm()
+
+
+connection_warmer = ConnectionWarmer()
@@ -1,30 +1,85 @@
 """
 Structured logging configuration for Flatmates App.
 Uses structlog for structured JSON logging with context.
+
+Log calls only build the event (adding the request context and timestamp)
+and put it on a queue; a listener thread renders it (JSON via orjson in
+production) and writes it to stdout, so slow log output never blocks the
+event loop. Successful request logs can be sampled per route.
 """
 
+import atexit
 import logging
+import queue
+import random
 import sys
-from typing import Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional, TextIO
 
+import orjson
 import structlog
 from structlog.types import Processor
 
 from app.core.config import settings
 
+_listener: Optional[QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+def _orjson_dumps(event: Any, **kwargs: Any) -> str:
+    """Serialize a log event with orjson, falling back to str() for unknown types."""
+    return orjson.dumps(event, default=str).decode()
+
+
+def _capture_exc_info(logger: Any, method_name: str, event_dict: dict) -> dict:
+    """Resolve exc_info=True while still on the thread handling the exception."""
+    if event_dict.get("exc_info") is True:
+        event_dict["exc_info"] = sys.exc_info()
+    return event_dict
 
-def setup_logging() -> None:
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that hands records to the listener unformatted.
+
+    The stock handler formats records before queueing them, which would
+    render on the calling thread and flatten structlog's event dicts.
+    Records are dropped rather than blocking when the queue is full.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Queue the record as it is; the listener's formatter renders it."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue a record, dropping it if the listener has fallen behind."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            from app.core.metrics import LOG_RECORDS_DROPPED_TOTAL
+
+            LOG_RECORDS_DROPPED_TOTAL.inc()
+
+
+def setup_logging(stream: Optional[TextIO] = None, use_queue: bool = True) -> None:
     """
     Configure structured logging for the application.
     
     In production: JSON output for log aggregation
     In development: Pretty colored console output
+
+    Args:
+        stream: Where logs are written (defaults to stdout)
+        use_queue: Write logs from a listener thread (set False to write
+            synchronously, e.g. to compare in benchmarks)
     """
+    global _listener, _handler
+
     # Determine if we're in development mode
     is_dev = settings.ENVIRONMENT == "development"
     log_level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
 
-    # Shared processors for all environments
+    # Shared processors for all environments, run where the log call is made
     shared_processors: list[Processor] = [
         structlog.contextvars.merge_contextvars,
         structlog.stdlib.add_logger_name,
@@ -37,34 +92,59 @@ def setup_logging() -> None:
 
     if is_dev:
         # Development: Pretty console output
-        processors: list[Processor] = [
-            *shared_processors,
-            structlog.processors.ExceptionPrettyPrinter(),
+        renderers: list[Processor] = [
             structlog.dev.ConsoleRenderer(colors=True),
         ]
     else:
         # Production: JSON output for log aggregation
-        processors = [
-            *shared_processors,
+        renderers = [
             structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer(),
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps),
         ]
 
-    # Configure structlog
+    # Configure structlog; rendering is left to the handler's formatter
     structlog.configure(
-        processors=processors,
+        processors=[
+            *shared_processors,
+            _capture_exc_info,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
         wrapper_class=structlog.stdlib.BoundLogger,
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
         cache_logger_on_first_use=True,
     )
 
-    # Configure standard library logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=log_level,
+    # Renders structlog events and plain stdlib records alike
+    formatter = structlog.stdlib.ProcessorFormatter(
+        foreign_pre_chain=shared_processors,
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            *renderers,
+        ],
     )
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    if use_queue:
+        records: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        handler: logging.Handler = _NonBlockingQueueHandler(records)
+    else:
+        handler = output
+
+    # Configure standard library logging
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    _handler = handler
+    root.addHandler(handler)
+    root.setLevel(log_level)
 
     # Reduce noise from third-party libraries
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -72,6 +152,40 @@ def setup_logging() -> None:
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
 
+def shutdown_logging() -> None:
+    """Write out queued log records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def should_log_request(endpoint: str, status_code: int) -> Optional[float]:
+    """
+    Decide whether to log a completed request.
+
+    Failed requests (status 400 and above) are always logged. Successful
+    ones are sampled at LOG_ROUTE_SAMPLE_RATES[endpoint], defaulting to
+    LOG_SUCCESS_SAMPLE_RATE.
+
+    Args:
+        endpoint: Route template of the request
+        status_code: Response status code
+
+    Returns:
+        The sample rate the request was logged at, or None to skip it
+    """
+    if status_code >= 400:
+        return 1.0
+    rate = settings.LOG_ROUTE_SAMPLE_RATES.get(endpoint, settings.LOG_SUCCESS_SAMPLE_RATE)
+    if rate >= 1.0 or random.random() < rate:
+        return rate
+    return None
+
+
 def get_logger(name: str | None = None) -> structlog.stdlib.BoundLogger:
     """
     Get a structured logger instance.
@@ -1,19 +1,34 @@
 """
 Prometheus metrics for Flatmates App.
 Exposes application metrics for monitoring and alerting.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers (wiped before they start). Each worker then
+writes its metrics to files there and /metrics aggregates all of them, so a
+scrape doesn't just see whichever worker answered. Gauges declare how their
+per-worker values are combined (multiprocess_mode); it is ignored when
+running in a single process.
 """
 
-from prometheus_client import Counter, Histogram, Gauge, Info
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from fastapi import Response
+import os
+import re
+import sys
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, Gauge, REGISTRY
+from prometheus_client import generate_latest, multiprocess, CONTENT_TYPE_LATEST
+from fastapi import Request, Response
 
 # =============================================================================
 # Application Info
 # =============================================================================
 
-APP_INFO = Info(
-    "flatmates_app",
-    "Flatmates App information"
+# A gauge fixed at 1 rather than an Info metric, which multiprocess mode
+# doesn't support; exports the same flatmates_app_info series
+APP_INFO = Gauge(
+    "flatmates_app_info",
+    "Flatmates App information",
+    ["version", "name", "python_version"],
+    multiprocess_mode="max"
 )
 
 # =============================================================================
@@ -36,9 +51,63 @@ HTTP_REQUEST_DURATION_SECONDS = Histogram(
 HTTP_REQUESTS_IN_PROGRESS = Gauge(
     "http_requests_in_progress",
     "Number of HTTP requests currently in progress",
-    ["method", "endpoint"]
+    ["method", "endpoint"],
+    multiprocess_mode="livesum"
 )
 
+# Endpoint label for requests that match no route, so probes of random URLs
+# can't create new time series
+UNMATCHED_ROUTE = "<unmatched>"
+
+_PATH_PARAM = re.compile(r"{([^}:]+)(?::[^}]*)?}")
+
+
+def route_template(scope) -> str:
+    """
+    Get the route template a routed request matched, for use as the endpoint label.
+
+    Labelling by the raw path would create a time series for every ID in
+    a URL; the template (e.g. "/api/v1/todos/{todo_id}") keeps the number
+    of series bounded by the number of routes. Must be called after the
+    request has been routed.
+
+    Routes of included routers may only know their template relative to
+    the router prefix, so the prefix is recovered from the raw path by
+    filling the template with the request's path parameters.
+
+    Args:
+        scope: ASGI scope of the request
+
+    Returns:
+        Template of the matched route, or UNMATCHED_ROUTE
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+
+    params = scope.get("path_params", {})
+    filled = _PATH_PARAM.sub(lambda match: str(params.get(match.group(1), match.group(0))), template)
+    path = scope.get("path", "")
+    if filled != path and path.endswith(filled):
+        return path[: len(path) - len(filled)] + template
+    return template
+
+
+async def track_request_in_progress(request: Request):
+    """
+    Count the request in HTTP_REQUESTS_IN_PROGRESS while its route runs.
+
+    Used as an application-wide dependency rather than in the middleware,
+    as the route template is only known once the request has been routed.
+    """
+    labels = HTTP_REQUESTS_IN_PROGRESS.labels(method=request.method, endpoint=route_template(request.scope))
+    labels.inc()
+    try:
+        yield
+    finally:
+        labels.dec()
+
 # =============================================================================
 # Database Metrics
 # =============================================================================
@@ -50,9 +119,25 @@ DB_QUERY_DURATION_SECONDS = Histogram(
     buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
 )
 
+# Pool gauges are labelled by engine: "primary", or "replica-<n>" for read replicas
 DB_CONNECTIONS_ACTIVE = Gauge(
     "db_connections_active",
-    "Number of active database connections"
+    "Number of active database connections",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond the pool size",
+    ["engine"],
+    multiprocess_mode="livesum"
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a database connection from the pool, including waiting for a free one",
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0]
 )
 
 # =============================================================================
@@ -61,12 +146,14 @@ DB_CONNECTIONS_ACTIVE = Gauge(
 
 USERS_TOTAL = Gauge(
     "users_total",
-    "Total number of registered users"
+    "Total number of registered users",
+    multiprocess_mode="mostrecent"
 )
 
 HOUSEHOLDS_TOTAL = Gauge(
     "households_total",
-    "Total number of households"
+    "Total number of households",
+    multiprocess_mode="mostrecent"
 )
 
 EXPENSES_TOTAL = Counter(
@@ -108,6 +195,88 @@ AI_REQUEST_DURATION_SECONDS = Histogram(
     buckets=[0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
 )
 
+AI_QUEUE_DEPTH = Gauge(
+    "ai_queue_depth",
+    "Number of AI calls waiting for a provider concurrency slot",
+    ["provider"],
+    multiprocess_mode="livesum"
+)
+
+AI_REQUESTS_IN_FLIGHT = Gauge(
+    "ai_requests_in_flight",
+    "Number of AI calls currently running against a provider",
+    ["provider"],
+    multiprocess_mode="livesum"
+)
+
+AI_TASK_SUGGESTIONS_CACHE_TOTAL = Counter(
+    "ai_task_suggestions_cache_total",
+    "Task suggestion cache lookups (hit, stale or miss)",
+    ["result"]
+)
+
+AI_CIRCUIT_STATE = Gauge(
+    "ai_circuit_state",
+    "AI provider circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["provider"],
+    multiprocess_mode="livemax"
+)
+
+AI_HEDGED_REQUESTS_TOTAL = Counter(
+    "ai_hedged_requests_total",
+    "Backup AI requests started because the first provider was slow",
+    ["provider", "operation"]
+)
+
+RECEIPT_IMAGE_BYTES = Histogram(
+    "receipt_image_bytes",
+    "Receipt image size before and after preprocessing",
+    ["stage"],
+    buckets=[50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000, 10_000_000]
+)
+
+RECEIPT_PREPROCESS_DURATION_SECONDS = Histogram(
+    "receipt_preprocess_duration_seconds",
+    "Time spent preprocessing a receipt image, including pool overhead",
+    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+RECEIPT_DEDUP_TOTAL = Counter(
+    "receipt_dedup_total",
+    "Household receipt scans checked against earlier scans of the same receipt",
+    ["result"]
+)
+
+RECEIPT_JOBS_TOTAL = Counter(
+    "receipt_jobs_total",
+    "Receipt OCR jobs by lifecycle event",
+    ["status"]
+)
+
+AI_CATEGORIZATION_BATCH_SIZE = Histogram(
+    "ai_categorization_batch_size",
+    "Number of expenses categorized per batched provider call",
+    ["provider"],
+    buckets=[2, 5, 10, 20, 50]
+)
+
+AI_CATEGORIZATIONS_TOTAL = Counter(
+    "ai_categorizations_total",
+    "Expense categorizations by where the answer came from",
+    ["source"]
+)
+
+AI_CATEGORIZATION_CACHE_TOTAL = Counter(
+    "ai_categorization_cache_total",
+    "Expense categorization cache lookups by tier and result",
+    ["tier", "result"]
+)
+
+LOG_RECORDS_DROPPED_TOTAL = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log writer thread fell behind"
+)
+
 # =============================================================================
 # Authentication Metrics
 # =============================================================================
@@ -120,7 +289,8 @@ AUTH_ATTEMPTS_TOTAL = Counter(
 
 ACTIVE_SESSIONS = Gauge(
     "active_sessions_total",
-    "Number of active user sessions"
+    "Number of active user sessions",
+    multiprocess_mode="livesum"
 )
 
 
@@ -131,12 +301,19 @@ ACTIVE_SESSIONS = Gauge(
 def get_metrics() -> Response:
     """
     Generate Prometheus metrics response.
+
+    In multiprocess mode the metrics of all workers are aggregated from
+    PROMETHEUS_MULTIPROC_DIR.
     
     Returns:
         Response with Prometheus metrics in text format
     """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
     return Response(
-        content=generate_latest(),
+        content=generate_latest(registry),
         media_type=CONTENT_TYPE_LATEST
     )
 
@@ -148,8 +325,19 @@ def initialize_metrics(app_version: str = "1.0.0") -> None:
     Args:
         app_version: Current application version
     """
-    APP_INFO.info({
-        "version": app_version,
-        "name": "flatmates-backend",
-        "python_version": "3.11"
-    })
+    APP_INFO.labels(
+        version=app_version,
+        name="flatmates-backend",
+        python_version=f"{sys.version_info.major}.{sys.version_info.minor}"
+    ).set(1)
+
+
+def shutdown_metrics() -> None:
+    """
+    Drop this worker's live gauge values in multiprocess mode.
+
+    Called when a worker exits so that "live" gauges (such as requests in
+    progress) stop counting it; counters and histograms keep its totals.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,143 @@
+"""
+Request middleware for Flatmates App.
+
+A plain ASGI middleware rather than an ``@app.middleware("http")`` function:
+Starlette's call_next wrapper runs the app in a separate task and pipes the
+response body through a memory stream on every request, and a plain
+middleware avoids both.
+"""
+
+import time
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db_metrics import report_repeated_queries, start_query_stats
+from app.core.logging import clear_log_context, get_logger, log_context, should_log_request
+from app.core.metrics import HTTP_REQUEST_DURATION_SECONDS, HTTP_REQUESTS_TOTAL, route_template
+from app.core.profiling import PROFILE_HEADER, request_profiler
+from app.core.replicas import (
+    READ_AFTER_COOKIE,
+    READ_AFTER_HEADER,
+    read_after_cookie,
+    replica_router,
+    start_replica_writes,
+)
+from app.core.tracing import begin_request_span, end_request_span
+
+logger = get_logger(__name__)
+
+
+class RequestLoggingMiddleware:
+    """
+    Per-request ID, log context, logging, metrics, tracing and profiling.
+
+    Every response gets an X-Request-ID header (and X-DB-Queries outside
+    production), and responses to requests that committed a write get an
+    X-Read-After token and cookie while read replicas are configured.
+    Metrics are labelled by route template.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Wrap an ASGI application."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle one ASGI connection; non-HTTP scopes pass straight through."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Generate request ID
+        request_id = str(uuid.uuid4())[:8]
+        method = scope["method"]
+        path = scope["path"]
+        headers = Headers(scope=scope)
+
+        # Add context for all logs in this request
+        log_context(request_id=request_id, method=method, path=path)
+
+        # Count the database queries the request makes
+        query_stats = start_query_stats()
+
+        # Keep the client's reads on the primary until a replica has their writes
+        replica_writes = start_replica_writes(
+            headers.get(READ_AFTER_HEADER)
+            or cookie_parser(headers.get("cookie", "")).get(READ_AFTER_COOKIE)
+        )
+
+        # Sample stacks if profiling is on or a signed X-Profile header is sent
+        profile = request_profiler.begin(headers.get(PROFILE_HEADER))
+
+        # Trace the request, continuing the caller's trace if one is propagated
+        span, span_token = begin_request_span(method, path, headers)
+
+        status_code = 500
+        error = None
+        start_time = time.perf_counter()
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                report_repeated_queries(query_stats, route_template(scope))
+
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Request-ID"] = request_id
+                if not settings.is_production:
+                    response_headers["X-DB-Queries"] = str(query_stats.count)
+                read_after = replica_writes.response_token() if replica_router.replicas else None
+                if read_after is not None:
+                    response_headers[READ_AFTER_HEADER] = read_after
+                    response_headers.append("set-cookie", read_after_cookie(read_after))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        except Exception as e:
+            error = e
+            duration = time.perf_counter() - start_time
+            logger.error(
+                "Request failed",
+                error=str(e),
+                duration_ms=round(duration * 1000, 2),
+            )
+            raise
+        else:
+            duration = time.perf_counter() - start_time
+
+            # Label metrics by route template, not raw path, to bound cardinality
+            endpoint = route_template(scope)
+
+            HTTP_REQUESTS_TOTAL.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+            HTTP_REQUEST_DURATION_SECONDS.labels(method=method, endpoint=endpoint).observe(duration)
+
+            log_context(
+                db_queries=query_stats.count,
+                db_time_ms=round(query_stats.seconds * 1000, 2),
+            )
+
+            # Log request (skip health checks in production, sample per route)
+            sample_rate = should_log_request(endpoint, status_code)
+            if sample_rate is not None and not (settings.is_production and endpoint.startswith("/health")):
+                logger.info(
+                    "Request completed",
+                    status_code=status_code,
+                    duration_ms=round(duration * 1000, 2),
+                    **({"sample_rate": sample_rate} if sample_rate < 1.0 else {}),
+                )
+        finally:
+            endpoint = route_template(scope)
+            end_request_span(span, span_token, method, endpoint, status_code, error)
+            request_profiler.end(
+                profile,
+                method=method,
+                endpoint=endpoint,
+                path=path,
+                status_code=status_code,
+                duration=time.perf_counter() - start_time,
+            )
+            clear_log_context()
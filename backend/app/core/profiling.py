@@ -0,0 +1,205 @@
+"""
+Sampling profiler for slow requests.
+
+While a request is being profiled, a background thread samples the stacks
+of the process's threads every PROFILE_SAMPLE_INTERVAL_MS and counts them
+in collapsed ("folded") form, one "frame;frame;frame count" line per stack,
+which flamegraph.pl, speedscope and inferno read directly.
+
+With PROFILING_ENABLED every request is sampled and kept only if it took at
+least PROFILE_SLOW_REQUEST_MS. A request carrying a valid signed X-Profile
+header is always sampled and kept. The last PROFILE_BUFFER_SIZE profiles
+are kept in memory per worker.
+
+Samples cover every busy thread of the worker, so profiles of concurrent
+requests include each other's work; threads idling in waits are skipped.
+"""
+
+import hashlib
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import utc_now
+
+PROFILE_HEADER = "X-Profile"
+
+# Deepest stack recorded per sample
+_MAX_DEPTH = 128
+
+# Innermost frames of threads that are blocked waiting for work
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def sign_profile_token(expires_at: int) -> str:
+    """
+    Create an X-Profile header value valid until the given time.
+
+    Args:
+        expires_at: Unix timestamp after which the token is rejected
+
+    Returns:
+        "<expires_at>.<HMAC-SHA256 signature keyed with SECRET_KEY>"
+    """
+    signature = hmac.new(
+        settings.SECRET_KEY.encode(), f"profile:{expires_at}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def verify_profile_token(token: Optional[str]) -> bool:
+    """Check that an X-Profile header value is correctly signed and not expired."""
+    if not token or "." not in token:
+        return False
+    expires_at, _ = token.split(".", 1)
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(token, sign_profile_token(int(expires_at)))
+
+
+@dataclass
+class Profile:
+    """Stack samples collected for one request."""
+
+    id: int
+    started_at: datetime
+    forced: bool
+    stacks: Counter = field(default_factory=Counter)
+    method: str = ""
+    endpoint: str = ""
+    path: str = ""
+    status_code: int = 0
+    duration_ms: float = 0.0
+
+    @property
+    def samples(self) -> int:
+        """Number of stack samples taken."""
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        """Samples in collapsed stack format, most frequent first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _fold(frame) -> Optional[str]:
+    """Fold a thread's stack into "outer;...;inner" form, or None if the thread is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+        return None
+
+    names: List[str] = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfiler:
+    """Samples stacks while requests are profiled and keeps the latest slow ones."""
+
+    def __init__(self):
+        """Create a profiler; its sampling thread starts with the first profile."""
+        self._lock = threading.Lock()
+        self._active: Dict[int, Profile] = {}
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ids = itertools.count(1)
+        self.profiles: Deque[Profile] = deque(maxlen=settings.PROFILE_BUFFER_SIZE)
+
+    def begin(self, token: Optional[str] = None) -> Optional[Profile]:
+        """
+        Start profiling a request if it should be.
+
+        Args:
+            token: The request's X-Profile header, if any
+
+        Returns:
+            Profile being collected, or None if the request isn't profiled
+        """
+        forced = verify_profile_token(token)
+        if not (forced or settings.PROFILING_ENABLED):
+            return None
+
+        profile = Profile(id=next(self._ids), started_at=utc_now(), forced=forced)
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+        return profile
+
+    def end(
+        self,
+        profile: Optional[Profile],
+        method: str,
+        endpoint: str,
+        path: str,
+        status_code: int,
+        duration: float,
+    ) -> None:
+        """
+        Stop profiling a request, keeping the profile if it was slow or requested.
+
+        Args:
+            profile: Profile returned by begin()
+            method: HTTP method
+            endpoint: Route template
+            path: Request path
+            status_code: Response status code
+            duration: Request duration in seconds
+        """
+        if profile is None:
+            return
+        with self._lock:
+            self._active.pop(profile.id, None)
+
+        profile.method = method
+        profile.endpoint = endpoint
+        profile.path = path
+        profile.status_code = status_code
+        profile.duration_ms = round(duration * 1000, 2)
+        if profile.forced or profile.duration_ms >= settings.PROFILE_SLOW_REQUEST_MS:
+            self.profiles.append(profile)
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        """Get a kept profile by ID."""
+        return next((profile for profile in self.profiles if profile.id == profile_id), None)
+
+    def _sample(self) -> None:
+        """Sampling loop; sleeps while no request is being profiled."""
+        own_id = threading.get_ident()
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                if not self._active:
+                    self._wakeup.clear()
+                    continue
+
+            stacks = [
+                _fold(frame) for thread_id, frame in sys._current_frames().items()
+                if thread_id != own_id
+            ]
+            with self._lock:
+                for profile in self._active.values():
+                    profile.stacks.update(stack for stack in stacks if stack is not None)
+
+            time.sleep(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+
+request_profiler = RequestProfiler()
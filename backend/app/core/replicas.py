@@ -0,0 +1,398 @@
+"""
+Read replica routing.
+
+Read-only endpoints and sync pulls call ``replica_router.route()`` to send
+the rest of the request's queries to a replica from DATABASE_REPLICA_URLS.
+They call it only after checking household access, so membership checks
+always read the primary and a removed member can't read a household from
+a replica that hasn't caught up.
+The request stays on the primary when:
+
+- no replicas are configured
+- every replica lags the primary by more than REPLICA_MAX_LAG_SECONDS, or
+  can't be reached
+- the user committed a write within REPLICA_STICKY_SECONDS that no replica
+  has replayed yet, so they read their own writes
+
+Read-your-writes state travels with the client rather than living in a
+worker process, so it holds whichever worker serves the next request. After
+a request commits a write, the primary's WAL position (LSN) is read, and the
+response carries it in a signed X-Read-After token (also set as a cookie).
+The client sends it back, and a replica is only used for that user once it
+has replayed WAL up to that position. Positions, unlike timestamps, don't
+depend on clocks agreeing, and another transaction committing at the same
+moment can't make a replica look further along than it is.
+
+A replica's lag and replay position are checked at most once every
+REPLICA_LAG_CHECK_SECONDS and only when a request wants a replica, so idle
+replicas can still suspend. The check runs in a background thread, one at a
+time per replica, and requests use the last measurement meanwhile: a
+request never waits on a replica connection, even from an async endpoint.
+Until a replica's first check completes, or while a check is stuck, the
+replica isn't used.
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import RoutingSession, connect_args, pool_settings, release_connection
+from app.core.db_metrics import instrument_engine
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+READ_AFTER_HEADER = "X-Read-After"
+READ_AFTER_COOKIE = "read_after"
+
+# WAL positions as byte offsets, so they can be compared as integers
+CURRENT_LSN_QUERY = text("SELECT pg_current_wal_lsn() - '0/0'::pg_lsn")
+
+# Seconds the replica is behind the primary: zero when it has replayed
+# everything it has received (an idle primary sends nothing) or isn't a
+# standby at all. Then the WAL position it has replayed up to, or its own
+# current position if it isn't a standby
+LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+    " END,"
+    " CASE"
+    " WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn()"
+    " ELSE pg_current_wal_lsn()"
+    " END - '0/0'::pg_lsn"
+)
+
+# Stands in for a write whose WAL position couldn't be read: no replica has
+# replayed this far, so the user reads the primary until the token expires
+UNKNOWN_LSN = 2 ** 64 - 1
+
+
+def current_lsn(primary: Engine) -> Optional[int]:
+    """
+    WAL position of the primary; after a commit, one the commit is at or before.
+
+    Returns:
+        Position in bytes, or None if the primary isn't PostgreSQL
+    """
+    if primary.dialect.name != "postgresql":
+        return None
+    try:
+        with primary.connect() as connection:
+            return int(connection.execute(CURRENT_LSN_QUERY).scalar())
+    except Exception as e:
+        logger.warning("Primary WAL position unavailable", error=str(e))
+        return UNKNOWN_LSN
+
+
+def sign_read_after(user_id: uuid.UUID, lsn: int, issued_at: float) -> str:
+    """
+    Create an X-Read-After token for a user's write.
+
+    Args:
+        user_id: User who wrote
+        lsn: Primary's WAL position after the write committed
+        issued_at: Unix time the token is issued, for expiry
+
+    Returns:
+        "<lsn>.<issued_at in ms>.<HMAC-SHA256 signature keyed with SECRET_KEY>"
+    """
+    issued_ms = int(issued_at * 1000)
+    signature = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"read-after:{user_id}:{lsn}:{issued_ms}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
+    return f"{lsn}.{issued_ms}.{signature}"
+
+
+def verify_read_after(token: Optional[str], user_id: uuid.UUID) -> Optional[int]:
+    """
+    WAL position of a user's last write from their X-Read-After token.
+
+    Returns:
+        Position in bytes, or None if the token is missing, signed for
+        another user, tampered with or older than REPLICA_STICKY_SECONDS
+    """
+    parts = (token or "").split(".")
+    if len(parts) != 3 or not (parts[0].isdigit() and parts[1].isdigit()):
+        return None
+    lsn, issued_at = int(parts[0]), int(parts[1]) / 1000
+    if time.time() - issued_at >= settings.REPLICA_STICKY_SECONDS:
+        return None
+    if not hmac.compare_digest(token, sign_read_after(user_id, lsn, issued_at)):
+        return None
+    return lsn
+
+
+def read_after_cookie(token: str) -> str:
+    """Set-Cookie header value that keeps an X-Read-After token for REPLICA_STICKY_SECONDS."""
+    cookie = (
+        f"{READ_AFTER_COOKIE}={token}; Max-Age={int(settings.REPLICA_STICKY_SECONDS)};"
+        " Path=/; HttpOnly; SameSite=Lax"
+    )
+    return cookie + "; Secure" if settings.is_production else cookie
+
+
+@dataclass
+class ReplicaWrites:
+    """Read-your-writes state of one request."""
+
+    # X-Read-After token the client sent, if any
+    token: Optional[str] = None
+    # User and primary WAL position of a write the request itself committed
+    user_id: Optional[uuid.UUID] = None
+    lsn: Optional[int] = None
+
+    def read_after(self, user_id: uuid.UUID) -> Optional[int]:
+        """WAL position of the user's last write that reads must see, or None."""
+        if self.lsn is not None and self.user_id == user_id:
+            return self.lsn
+        return verify_read_after(self.token, user_id)
+
+    def response_token(self) -> Optional[str]:
+        """X-Read-After token to send back, if the request committed a write."""
+        if self.lsn is None or self.user_id is None:
+            return None
+        return sign_read_after(self.user_id, self.lsn, time.time())
+
+
+_replica_writes: ContextVar[Optional[ReplicaWrites]] = ContextVar("replica_writes", default=None)
+
+
+def start_replica_writes(token: Optional[str]) -> ReplicaWrites:
+    """
+    Start tracking the writes of the current request.
+
+    Sessions used by the request's route run in the same (copied) context,
+    so writes they commit are recorded on the returned object.
+
+    Args:
+        token: X-Read-After token sent by the client, if any
+    """
+    writes = ReplicaWrites(token=token)
+    _replica_writes.set(writes)
+    return writes
+
+
+def create_replica_engine(url: str, index: int = 0) -> Engine:
+    """
+    Create an engine for a replica, configured like the primary's.
+
+    Args:
+        url: Replica database URL
+        index: Position in DATABASE_REPLICA_URLS, labelling its pool metrics
+    """
+    replica = create_engine(
+        url, pool_pre_ping=True, echo=False, connect_args=connect_args, **pool_settings
+    )
+    instrument_engine(replica, name=f"replica-{index}")
+    return replica
+
+
+def measure_lag(replica: Engine) -> Tuple[float, Optional[int]]:
+    """
+    Replication lag of a replica in seconds, and how far it has replayed.
+
+    Returns:
+        Lag, and the WAL position replayed up to (None if it has replayed
+        nothing since starting, or isn't PostgreSQL)
+
+    Raises:
+        SQLAlchemyError: If the replica can't be reached
+    """
+    if replica.dialect.name != "postgresql":
+        return 0.0, None
+    with replica.connect() as connection:
+        lag, replayed_lsn = connection.execute(LAG_QUERY).one()
+    return float(lag or 0), None if replayed_lsn is None else int(replayed_lsn)
+
+
+class ReplicaRouter:
+    """Chooses a replica for read-only sessions, or the primary when none is fit."""
+
+    def __init__(self, replicas: List[Engine]):
+        """
+        Create a router.
+
+        Args:
+            replicas: Replica engines, tried in turn
+        """
+        self.replicas = replicas
+        # Per replica: (monotonic time of the last check, lag or None if
+        # unreachable, WAL position it had replayed up to)
+        self._lag: Dict[int, Tuple[float, Optional[float], Optional[int]]] = {}
+        # Replicas being checked, and when their check started
+        self._measuring: Dict[int, float] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def lag(self, index: int) -> Optional[float]:
+        """
+        Last measured lag of a replica, starting a new check once it is REPLICA_LAG_CHECK_SECONDS old.
+
+        Never blocks on the replica; the check runs in a background thread
+        unless one is already running for this replica.
+
+        Returns:
+            Lag in seconds, or None if the replica couldn't be reached, hasn't
+            been checked yet or its check is taking too long
+        """
+        with self._lock:
+            checked_at = self._lag.get(index, (None, None, None))[0]
+            start = index not in self._measuring and (
+                checked_at is None
+                or time.monotonic() - checked_at >= settings.REPLICA_LAG_CHECK_SECONDS
+            )
+            if start:
+                self._measuring[index] = time.monotonic()
+        if start:
+            threading.Thread(target=self._measure, args=(index,), daemon=True).start()
+
+        with self._lock:
+            # A check running for longer than the interval is stuck on a
+            # replica that isn't answering
+            started = self._measuring.get(index)
+            if started is not None and time.monotonic() - started > settings.REPLICA_LAG_CHECK_SECONDS:
+                return None
+            return self._lag.get(index, (None, None, None))[1]
+
+    def replayed_lsn(self, index: int) -> Optional[int]:
+        """WAL position a replica had replayed up to when it was last checked, or None."""
+        with self._lock:
+            return self._lag.get(index, (None, None, None))[2]
+
+    def _measure(self, index: int) -> None:
+        """Measure a replica's lag and record it; runs in a background thread."""
+        try:
+            lag, replayed_lsn = measure_lag(self.replicas[index])
+        except Exception as e:
+            logger.warning("Read replica unreachable", replica=index, error=str(e))
+            lag, replayed_lsn = None, None
+        if lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Read replica lagging", replica=index, lag_seconds=round(lag, 2))
+        with self._lock:
+            self._lag[index] = (time.monotonic(), lag, replayed_lsn)
+            self._measuring.pop(index, None)
+
+    def pick(self, read_after: Optional[int] = None) -> Optional[Engine]:
+        """
+        Next replica within REPLICA_MAX_LAG_SECONDS of the primary, or None.
+
+        Args:
+            read_after: WAL position of a write the reads must see; replicas
+                that hadn't replayed up to it when last checked are skipped
+        """
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self.replicas), 1)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            lag = self.lag(index)
+            if lag is None or lag > settings.REPLICA_MAX_LAG_SECONDS:
+                continue
+            if read_after is not None:
+                replayed_lsn = self.replayed_lsn(index)
+                if replayed_lsn is None or replayed_lsn < read_after:
+                    continue
+            return self.replicas[index]
+        return None
+
+    def route(self, db: Session, user_id: uuid.UUID) -> bool:
+        """
+        Send a session's reads to a replica until its transaction ends.
+
+        The open transaction, if any, is ended first (see release_connection),
+        so the primary connection isn't held while the replica is in use. A
+        replica must have replayed the user's last write, made in this
+        request or carried by their X-Read-After token.
+
+        Args:
+            db: Session of a request that only reads from here on
+            user_id: User the request is made for
+
+        Returns:
+            Whether a replica was assigned
+        """
+        if not self.replicas:
+            return False
+        writes = _replica_writes.get()
+        replica = self.pick(writes.read_after(user_id) if writes is not None else None)
+        if replica is None:
+            return False
+        release_connection(db)
+        db.info["replica"] = replica
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Last measured lag of each replica, without touching the database."""
+        with self._lock:
+            return {
+                "replicas": len(self.replicas),
+                "lag_seconds": [
+                    self._lag.get(index, (None, None, None))[1] for index in range(len(self.replicas))
+                ],
+            }
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flushed(session: Session, flush_context) -> None:
+    """Note that the session's transaction wrote something."""
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state) -> None:
+    """Note bulk UPDATE and DELETE statements, which bypass the flush."""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _mark_committed(session: Session) -> None:
+    """Note that the session's writes, if any, were committed."""
+    session.info["committed"] = True
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session: Session, transaction) -> None:
+    """
+    Go back to the primary, and forget writes, when the transaction ends.
+
+    A committed write is recorded on the request with the primary's WAL
+    position, so the response tells the client to read after it. This runs
+    once the transaction's connection is back in the pool, so reading the
+    position reuses it rather than needing a second one.
+    """
+    if transaction.parent is not None:
+        return
+    session.info.pop("replica", None)
+    wrote = session.info.pop("wrote", None)
+    committed = session.info.pop("committed", None)
+
+    writes = _replica_writes.get()
+    user_id = session.info.get("user_id")
+    if not (wrote and committed and writes is not None and user_id is not None):
+        return
+    if not replica_router.replicas:
+        return
+    lsn = current_lsn(session.get_bind())
+    if lsn is not None:
+        writes.user_id = user_id
+        writes.lsn = lsn
+
+
+replica_router = ReplicaRouter(
+    [create_replica_engine(url, index) for index, url in enumerate(settings.DATABASE_REPLICA_URLS)]
+)
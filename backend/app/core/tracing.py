@@ -0,0 +1,164 @@
+"""
+OpenTelemetry tracing.
+
+With ENABLE_TRACING every request gets a server span (continuing the
+caller's trace when a W3C traceparent header is sent), with child spans for
+each SQL statement, AI provider call and Google token verification, so the
+latency of one request can be split across database, AI and auth.
+
+Spans are sampled per trace (TRACING_SAMPLE_RATE, following the caller's
+decision when there is one) and exported to the console, kept in memory
+(for local runs and tests, see ``memory_exporter``) or sent over OTLP/HTTP
+(needs opentelemetry-exporter-otlp-proto-http; configured with the standard
+OTEL_EXPORTER_OTLP_* variables).
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.trace import Span, SpanKind, Status, StatusCode
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_tracer: trace.Tracer = trace.NoOpTracer()
+_enabled = False
+
+# Finished spans when TRACING_EXPORTER is "memory"
+memory_exporter = None
+
+
+def init_tracing() -> bool:
+    """
+    Set up span export if ENABLE_TRACING is on.
+
+    Returns:
+        bool: True if tracing was initialized, False otherwise
+    """
+    global _tracer, _enabled, memory_exporter
+
+    if not settings.ENABLE_TRACING:
+        return False
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    exporter_name = settings.TRACING_EXPORTER.lower()
+    if exporter_name == "console":
+        processor = SimpleSpanProcessor(ConsoleSpanExporter())
+    elif exporter_name == "memory":
+        memory_exporter = InMemorySpanExporter()
+        processor = SimpleSpanProcessor(memory_exporter)
+    elif exporter_name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.error("OTLP trace exporter not installed, tracing disabled")
+            return False
+        processor = BatchSpanProcessor(OTLPSpanExporter())
+    else:
+        logger.error("Unknown trace exporter, tracing disabled", exporter=settings.TRACING_EXPORTER)
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({
+            "service.name": "flatmates-backend",
+            "service.version": settings.VERSION,
+            "deployment.environment": settings.ENVIRONMENT,
+        }),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+    )
+    provider.add_span_processor(processor)
+
+    _tracer = provider.get_tracer("flatmates-backend", settings.VERSION)
+    _enabled = True
+    return True
+
+
+def tracing_enabled() -> bool:
+    """Whether spans are being recorded."""
+    return _enabled
+
+
+def start_span(
+    name: str, kind: SpanKind = SpanKind.INTERNAL, attributes: Optional[Dict[str, Any]] = None
+) -> Span:
+    """
+    Start a span under the current one without making it current.
+
+    For leaf operations such as SQL statements; the caller must end it.
+    """
+    return _tracer.start_span(name, kind=kind, attributes=attributes)
+
+
+@contextmanager
+def traced(
+    name: str, kind: SpanKind = SpanKind.INTERNAL, attributes: Optional[Dict[str, Any]] = None
+) -> Iterator[Span]:
+    """
+    Run a block in a span made current for its duration.
+
+    Exceptions are recorded on the span and mark it as failed.
+    """
+    with _tracer.start_as_current_span(name, kind=kind, attributes=attributes) as span:
+        yield span
+
+
+def begin_request_span(method: str, path: str, headers: Mapping[str, str]) -> Tuple[Span, object]:
+    """
+    Start the server span of a request and make it current.
+
+    Args:
+        method: HTTP method
+        path: Request path
+        headers: Request headers, read for W3C trace context
+
+    Returns:
+        (span, token for end_request_span)
+    """
+    parent = propagate.extract(headers)
+    span = _tracer.start_span(
+        f"{method} {path}",
+        context=parent,
+        kind=SpanKind.SERVER,
+        attributes={"http.request.method": method, "url.path": path},
+    )
+    token = otel_context.attach(trace.set_span_in_context(span, parent))
+    return span, token
+
+
+def end_request_span(
+    span: Span,
+    token: object,
+    method: str,
+    route: str,
+    status_code: int,
+    error: Optional[BaseException] = None,
+) -> None:
+    """
+    Name the request span after its route, record the outcome and end it.
+
+    Args:
+        span: Span from begin_request_span
+        token: Token from begin_request_span
+        method: HTTP method
+        route: Route template of the request
+        status_code: Response status code
+        error: Exception the request failed with, if any
+    """
+    span.update_name(f"{method} {route}")
+    span.set_attribute("http.route", route)
+    span.set_attribute("http.response.status_code", status_code)
+    if error is not None:
+        span.record_exception(error)
+    if error is not None or status_code >= 500:
+        span.set_status(Status(StatusCode.ERROR))
+    otel_context.detach(token)
+    span.end()
@@ -3,7 +3,6 @@ Main FastAPI application for Flatmates App.
 """
 
 import asyncio
-import time
 import traceback
 import uuid
 from contextlib import asynccontextmanager
@@ -13,26 +12,32 @@ from fastapi import FastAPI, Depends, Request, Response, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.core.config import settings
-from app.core.database import get_db, get_db_resilient
-from app.core.logging import setup_logging, get_logger, log_context, clear_log_context
+from app.core.db_warmup import connection_warmer
+from app.core.logging import setup_logging, get_logger
 from app.core.metrics import (
     get_metrics,
     initialize_metrics,
-    HTTP_REQUESTS_TOTAL,
-    HTTP_REQUEST_DURATION_SECONDS,
-    HTTP_REQUESTS_IN_PROGRESS,
+    shutdown_metrics,
+    track_request_in_progress,
 )
+from app.core.middleware import RequestLoggingMiddleware
 from app.core.sentry import init_sentry, capture_exception
+from app.core.tracing import init_tracing
+from app.services.ai_service import close_ai_service
+from app.services.health import readiness_monitor
+from app.services.receipt_processing import shutdown_receipt_executor
+from app.services.receipt_jobs import start_receipt_job_queue, stop_receipt_job_queue
 from app.api.v1.api import api_router
 
 # Initialize Sentry FIRST (before anything else)
 sentry_enabled = init_sentry()
 
+# Initialize OpenTelemetry tracing (if enabled)
+tracing_enabled = init_tracing()
+
 # Setup structured logging
 setup_logging()
 logger = get_logger(__name__)
@@ -49,25 +54,28 @@ async def lifespan(app: FastAPI):
         version=settings.VERSION, 
         environment=settings.ENVIRONMENT,
         sentry_enabled=sentry_enabled,
+        tracing_enabled=tracing_enabled,
     )
     
     # Initialize metrics
     initialize_metrics(settings.VERSION)
     
-    # Test database connection
-    try:
-        db = next(get_db())
-        db.execute(text("SELECT 1"))
-        logger.info("Database connection successful")
-        db.close()
-    except Exception as e:
-        logger.error("Database connection failed", error=str(e))
-        capture_exception(e, context="database_startup")
+    # Open pool connections (waking the database) without blocking startup
+    await connection_warmer.start()
+
+    await start_receipt_job_queue()
+    await readiness_monitor.start()
 
     yield
 
     # Shutdown
     logger.info("Shutting down Flatmates App API")
+    await readiness_monitor.stop()
+    await connection_warmer.stop()
+    await stop_receipt_job_queue()
+    await close_ai_service()
+    shutdown_receipt_executor()
+    shutdown_metrics()
 
 
 # Create FastAPI app instance
@@ -79,6 +87,7 @@ app = FastAPI(
     redoc_url="/redoc" if settings.is_development else None,
     openapi_url=f"{settings.API_V1_STR}/openapi.json" if settings.is_development else None,
     lifespan=lifespan,
+    dependencies=[Depends(track_request_in_progress)],
 )
 
 
@@ -86,72 +95,8 @@ app = FastAPI(
 # Middleware
 # =============================================================================
 
-@app.middleware("http")
-async def logging_middleware(request: Request, call_next):
-    """Add request logging and metrics."""
-    # Generate request ID
-    request_id = str(uuid.uuid4())[:8]
-    
-    # Add context for all logs in this request
-    log_context(
-        request_id=request_id,
-        method=request.method,
-        path=request.url.path,
-    )
-    
-    # Get endpoint for metrics (normalize path parameters)
-    endpoint = request.url.path
-    method = request.method
-    
-    # Track request in progress
-    HTTP_REQUESTS_IN_PROGRESS.labels(method=method, endpoint=endpoint).inc()
-    
-    start_time = time.perf_counter()
-    
-    try:
-        response = await call_next(request)
-        
-        # Calculate duration
-        duration = time.perf_counter() - start_time
-        
-        # Record metrics
-        HTTP_REQUESTS_TOTAL.labels(
-            method=method,
-            endpoint=endpoint,
-            status_code=response.status_code
-        ).inc()
-        
-        HTTP_REQUEST_DURATION_SECONDS.labels(
-            method=method,
-            endpoint=endpoint
-        ).observe(duration)
-        
-        # Log request (skip health checks in production)
-        if not (settings.is_production and endpoint == "/health"):
-            logger.info(
-                "Request completed",
-                status_code=response.status_code,
-                duration_ms=round(duration * 1000, 2),
-            )
-        
-        # Add request ID to response headers
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
-        
-    except Exception as e:
-        duration = time.perf_counter() - start_time
-        logger.error(
-            "Request failed",
-            error=str(e),
-            duration_ms=round(duration * 1000, 2),
-        )
-        raise
-        
-    finally:
-        HTTP_REQUESTS_IN_PROGRESS.labels(method=method, endpoint=endpoint).dec()
-        clear_log_context()
-
+# Request ID, logging, metrics, tracing and profiling
+app.add_middleware(RequestLoggingMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -282,80 +227,73 @@ def with_timeout(seconds: int = 30):
 # Core Endpoints
 # =============================================================================
 
+@app.get("/health/live")
+async def liveness_check():
+    """
+    Liveness probe: the worker is up and serving requests.
+
+    Does no I/O, so container health checks can poll it freely.
+
+    Returns:
+        JSON response with liveness status
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: database, connection pool, AI providers and cache.
+
+    Served from a result cached for HEALTH_CACHE_SECONDS and refreshed in
+    the background, so probes don't add database load.
+
+    Returns:
+        JSON response with component checks; 503 if the database is down
+    """
+    readiness = await readiness_monitor.status()
+    status_code = status.HTTP_200_OK if readiness["status"] == "healthy" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=readiness)
+
+
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db_resilient)):
+async def health_check():
     """
     Health check endpoint to verify API and database status.
-    
-    Uses resilient database connection with retry logic for serverless
-    database cold starts (e.g., Neon PostgreSQL).
+
+    Summarizes the cached readiness result (see /health/ready).
 
     Returns:
         JSON response with health status
     """
+    readiness = await readiness_monitor.status()
+    checks = readiness["checks"]
+
     health = {
-        "status": "healthy",
+        "status": "healthy" if readiness["status"] == "healthy" else "degraded",
         "version": settings.VERSION,
         "environment": settings.ENVIRONMENT,
+        "database": "connected" if checks["database"] == "healthy" else "disconnected",
     }
-    
-    try:
-        # Test database connection and measure latency
-        start = time.perf_counter()
-        db.execute(text("SELECT 1"))
-        latency = (time.perf_counter() - start) * 1000
-        health["database"] = "connected"
-        health["latency_ms"] = round(latency, 2)
-    except Exception:
-        health["database"] = "disconnected"
-        health["status"] = "degraded"
-
+    if checks["database_latency_ms"] is not None:
+        health["latency_ms"] = checks["database_latency_ms"]
     return health
 
 
 @app.get("/health/deep")
-async def deep_health_check(db: Session = Depends(get_db_resilient)):
+async def deep_health_check():
     """
-    Deep health check including database connectivity with detailed diagnostics.
-    
-    Uses resilient database connection with retry logic for serverless
-    database cold starts (e.g., Neon PostgreSQL).
-    
+    Deep health check with the status of each component.
+
+    Same cached result as /health/ready, but always answered with 200.
+
     Returns:
         JSON response with detailed health information including:
         - Overall status
         - Individual component checks
         - Database latency metrics
     """
-    checks = {
-        "api": "healthy",
-        "database": "unknown",
-        "database_latency_ms": None
-    }
-    
-    try:
-        start = time.perf_counter()
-        db.execute(text("SELECT 1"))
-        latency = (time.perf_counter() - start) * 1000
-        
-        checks["database"] = "healthy"
-        checks["database_latency_ms"] = round(latency, 2)
-    except Exception as e:
-        checks["database"] = "unhealthy"
-        checks["database_error"] = str(e)
-    
-    # Determine overall status
-    overall_status = "healthy" if all(
-        v == "healthy" for k, v in checks.items() 
-        if k == "database" or k == "api"
-    ) else "unhealthy"
-    
-    return {
-        "status": overall_status,
-        "version": settings.VERSION,
-        "environment": settings.ENVIRONMENT,
-        "checks": checks
-    }
+    return await readiness_monitor.status()
 
 
 @app.get("/")
@@ -24,6 +24,8 @@ from app.models.shopping import (
     ItemCategory,
     ShoppingListStatus,
 )
+from app.models.ai_cache import CategorizationCacheEntry, TaskSuggestionCacheEntry
+from app.models.receipt import ReceiptScan, ReceiptJob, ReceiptJobStatus
 
 __all__ = [
     "User",
@@ -44,4 +46,9 @@ __all__ = [
     "ShoppingListItem",
     "ItemCategory",
     "ShoppingListStatus",
+    "CategorizationCacheEntry",
+    "TaskSuggestionCacheEntry",
+    "ReceiptScan",
+    "ReceiptJob",
+    "ReceiptJobStatus",
 ]
@@ -0,0 +1,65 @@
+"""
+Cache models for persisting AI results across workers and restarts.
+"""
+
+import uuid
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Index
+
+from app.models.base import Base
+from app.models.user import GUID
+from app.core.database import utc_now
+
+
+class CategorizationCacheEntry(Base):
+    """Cached expense categorization for a normalized description and amount bucket.
+
+    Rows with a household_id form the per-household tier; rows without one
+    form the global tier shared by every household.
+    """
+
+    __tablename__ = "expense_categorization_cache"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    household_id = Column(
+        GUID(), ForeignKey("households.id", ondelete="CASCADE"), nullable=True
+    )
+    cache_key = Column(String, nullable=False)
+    result = Column(JSON, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=utc_now, nullable=False)
+
+    # One row per key and tier; household_id is NULL in the global tier and
+    # NULLs never conflict, so each tier gets its own partial unique index
+    __table_args__ = (
+        Index(
+            "ix_categorization_cache_key_household", "cache_key", "household_id", unique=True,
+            postgresql_where=household_id.isnot(None), sqlite_where=household_id.isnot(None),
+        ),
+        Index(
+            "ix_categorization_cache_key_global", "cache_key", unique=True,
+            postgresql_where=household_id.is_(None), sqlite_where=household_id.is_(None),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<CategorizationCacheEntry(cache_key={self.cache_key}, household_id={self.household_id})>"
+
+
+class TaskSuggestionCacheEntry(Base):
+    """Last task suggestions generated for a household.
+
+    The fingerprint summarises the household state the suggestions were
+    generated from; a different fingerprint means they may be out of date.
+    """
+
+    __tablename__ = "task_suggestion_cache"
+
+    household_id = Column(
+        GUID(), ForeignKey("households.id", ondelete="CASCADE"), primary_key=True
+    )
+    fingerprint = Column(String(64), nullable=False)
+    suggestions = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=utc_now, nullable=False)
+
+    def __repr__(self):
+        return f"<TaskSuggestionCacheEntry(household_id={self.household_id}, fingerprint={self.fingerprint})>"
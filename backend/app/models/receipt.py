@@ -0,0 +1,89 @@
+"""
+Receipt scan models for deduplicating receipt OCR.
+"""
+
+import uuid
+from sqlalchemy import (
+    Column, String, DateTime, ForeignKey, JSON, Integer, LargeBinary, Enum as SQLEnum, Index,
+)
+from sqlalchemy.orm import relationship
+import enum
+
+from app.models.base import Base
+from app.models.user import GUID
+from app.core.database import utc_now
+
+
+class ReceiptJobStatus(str, enum.Enum):
+    """Enum for receipt OCR job statuses."""
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ReceiptScan(Base):
+    """A processed receipt, indexed by file and perceptual hash within its household."""
+
+    __tablename__ = "receipt_scans"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    household_id = Column(
+        GUID(), ForeignKey("households.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    scanned_by = Column(GUID(), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    # 256-bit difference hash of the preprocessed image, as 64 hex digits
+    image_hash = Column(String(64), nullable=False)
+    # SHA-256 of the uploaded file, to recognise the exact same upload
+    content_hash = Column(String(64), nullable=False)
+    result = Column(JSON, nullable=False)  # Extraction returned by the AI
+
+    created_at = Column(DateTime(timezone=True), default=utc_now, nullable=False, index=True)
+
+    # Relationships
+    scanner = relationship("User")
+
+    # Re-uploads of the same file are looked up directly
+    __table_args__ = (
+        Index("ix_receipt_scans_household_content_hash", "household_id", "content_hash"),
+    )
+
+    def __repr__(self):
+        return f"<ReceiptScan(id={self.id}, household_id={self.household_id}, image_hash={self.image_hash})>"
+
+
+class ReceiptJob(Base):
+    """A receipt submitted for OCR in the background."""
+
+    __tablename__ = "receipt_jobs"
+
+    id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    household_id = Column(
+        GUID(), ForeignKey("households.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    submitted_by = Column(GUID(), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    status = Column(SQLEnum(ReceiptJobStatus), nullable=False, default=ReceiptJobStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), default=utc_now, nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)  # When a worker claimed it
+
+    # Uploaded image, cleared once the job finishes
+    image_data = Column(LargeBinary, nullable=True)
+    webhook_url = Column(String, nullable=True)
+
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=utc_now, nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Workers poll for due pending jobs
+    __table_args__ = (
+        Index("ix_receipt_jobs_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<ReceiptJob(id={self.id}, status={self.status}, attempts={self.attempts})>"
@@ -3,7 +3,7 @@ User model for authentication.
 """
 
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.types import TypeDecorator, CHAR
 
@@ -58,8 +58,14 @@ class User(Base):
     google_id = Column(String, unique=True, index=True, nullable=False)
     profile_picture_url = Column(String, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
+    # Incremented whenever the user's household memberships change
+    membership_version = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime(timezone=True), default=utc_now, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=utc_now, onupdate=utc_now, nullable=False)
 
+    # Household roles taken from the access token claims, keyed by household id.
+    # Populated per request by get_current_user; not persisted.
+    household_roles = None
+
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email})>"
@@ -0,0 +1,26 @@
+"""
+Pydantic schemas for admin endpoints.
+"""
+
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class ProfileSummary(BaseModel):
+    """A kept request profile, without its samples."""
+    id: int
+    started_at: datetime
+    method: str
+    endpoint: str
+    path: str
+    status_code: int
+    duration_ms: float
+    samples: int
+    forced: bool
+
+
+class ProfileTokenResponse(BaseModel):
+    """Signed X-Profile header value for profiling chosen requests."""
+    header: str
+    token: str
+    expires_at: int
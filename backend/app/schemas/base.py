@@ -0,0 +1,29 @@
+"""
+Shared helpers for response schemas.
+"""
+
+from functools import lru_cache
+from typing import Tuple, Type
+
+from pydantic import BaseModel
+
+
+@lru_cache(maxsize=None)
+def schema_columns(schema: Type[BaseModel], model: type) -> Tuple:
+    """
+    Columns of an ORM model that a response schema reads.
+
+    Querying these instead of the whole entity returns plain rows that skip
+    ORM object construction and the identity map; the response_model then
+    validates them once, from attributes, in pydantic-core. Fields the model
+    has no column for (e.g. joined data) must be selected separately and
+    labelled with the field name.
+
+    Args:
+        schema: Response schema with ``from_attributes`` enabled
+        model: ORM model the rows come from
+
+    Returns:
+        Column attributes in schema field order
+    """
+    return tuple(getattr(model, name) for name in schema.model_fields if name in model.__table__.columns)
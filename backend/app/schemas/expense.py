@@ -9,6 +9,7 @@ from uuid import UUID
 from pydantic import BaseModel, Field, ConfigDict
 
 from app.models.expense import ExpenseCategory, SplitType, PaymentMethod
+from app.models.receipt import ReceiptJobStatus
 
 
 # Split schemas
@@ -181,6 +182,100 @@ class PersonalExpenseAnalytics(BaseModel):
     monthly_stats: List[MonthlyExpenseStats]
 
 
+# AI Categorization schemas
+class CategorizeExpenseItem(BaseModel):
+    """Schema for an expense to categorize."""
+
+    description: str = Field(..., min_length=1, max_length=500, description="Expense description")
+    amount: Decimal = Field(..., gt=0, description="Expense amount")
+    context: Optional[str] = Field(None, max_length=500, description="Additional context for the AI")
+
+
+class CategorizeExpenseRequest(CategorizeExpenseItem):
+    """Schema for requesting an AI expense categorization."""
+
+    household_id: Optional[UUID] = Field(
+        None, description="Household the expense belongs to, for household-specific results"
+    )
+
+
+class CategorizeExpensesBatchRequest(BaseModel):
+    """Schema for categorizing several expenses at once."""
+
+    household_id: Optional[UUID] = Field(
+        None, description="Household the expenses belong to, for household-specific results"
+    )
+    expenses: List[CategorizeExpenseItem] = Field(..., min_length=1, max_length=100)
+
+
+class CategorizeExpenseResponse(BaseModel):
+    """Schema for an AI expense categorization."""
+
+    category: str
+    subcategory: Optional[str] = None
+    confidence: float = Field(..., ge=0, le=1)
+    reasoning: str = ""
+    suggested_tags: List[str] = []
+    source: str = Field(..., description="Where the result came from: cache, local or ai")
+
+
+class CategorizeExpensesBatchResponse(BaseModel):
+    """Schema for batched categorization results, in request order."""
+
+    results: List[CategorizeExpenseResponse]
+
+
+# Receipt OCR schemas
+class ReceiptLineItem(BaseModel):
+    """Schema for a line item read from a receipt."""
+
+    description: str
+    amount: Optional[float] = None
+
+
+class ReceiptDuplicateInfo(BaseModel):
+    """Schema for the earlier scan a receipt was recognised as."""
+
+    scan_id: UUID
+    scanned_by: Optional[UUID] = None
+    scanned_at: datetime
+
+
+class ReceiptOCRResponse(BaseModel):
+    """Schema for data extracted from a receipt image."""
+
+    success: bool
+    merchant: Optional[str] = None
+    date: Optional[str] = None
+    total: Optional[float] = None
+    currency: Optional[str] = None
+    items: List[ReceiptLineItem] = []
+    tax: Optional[float] = None
+    payment_method: Optional[str] = None
+    confidence: Optional[float] = None
+    notes: Optional[str] = None
+    error: Optional[str] = None
+    # Populated when scanning for a household
+    scan_id: Optional[UUID] = None
+    duplicate_of: Optional[ReceiptDuplicateInfo] = None
+    possible_duplicate_expenses: List[UUID] = []
+
+
+class ReceiptJobResponse(BaseModel):
+    """Schema for a background receipt OCR job."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    household_id: Optional[UUID] = None
+    status: ReceiptJobStatus
+    attempts: int
+    result: Optional[ReceiptOCRResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+
 # AI Suggestion schemas
 class TaskSuggestion(BaseModel):
     """Schema for a single task suggestion from AI."""
@@ -196,3 +291,4 @@ class TaskSuggestionsResponse(BaseModel):
     """Schema for task suggestions response."""
 
     suggestions: List[TaskSuggestion]
+    cached: bool = False  # served from the suggestion cache
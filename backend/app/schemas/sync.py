@@ -5,7 +5,7 @@ Pydantic schemas for sync operations.
 from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from decimal import Decimal
 
 from app.models.todo import TodoStatus, TodoPriority
@@ -16,6 +16,9 @@ from app.models.expense import ExpenseCategory, SplitType, PaymentMethod
 # Entity schemas for sync
 class TodoSyncDto(BaseModel):
     """Todo data for sync."""
+
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID
     household_id: UUID
     title: str
@@ -32,6 +35,9 @@ class TodoSyncDto(BaseModel):
 
 class ShoppingListSyncDto(BaseModel):
     """Shopping list data for sync."""
+
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID
     household_id: UUID
     name: str
@@ -44,6 +50,9 @@ class ShoppingListSyncDto(BaseModel):
 
 class ShoppingItemSyncDto(BaseModel):
     """Shopping item data for sync."""
+
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID
     shopping_list_id: UUID
     name: str
@@ -59,6 +68,9 @@ class ShoppingItemSyncDto(BaseModel):
 
 class ExpenseSplitSyncDto(BaseModel):
     """Expense split data for sync."""
+
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID
     expense_id: UUID
     user_id: UUID
@@ -69,6 +81,9 @@ class ExpenseSplitSyncDto(BaseModel):
 
 class ExpenseSyncDto(BaseModel):
     """Expense data for sync."""
+
+    model_config = ConfigDict(from_attributes=True)
+
     id: UUID
     household_id: UUID
     created_by: UUID
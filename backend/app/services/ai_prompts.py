@@ -0,0 +1,322 @@
+"""
+Prompt templates and response parsing shared by every AI provider.
+
+Providers only differ in how they send a prompt and get text back; what is
+asked and how the answer is validated lives here so all providers behave
+the same.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+EXPENSE_CATEGORIES = [
+    "Groceries", "Utilities", "Rent", "Transportation", "Entertainment",
+    "Dining", "Healthcare", "Shopping", "Home Maintenance", "Other"
+]
+
+TASK_PRIORITIES = ["low", "medium", "high"]
+
+CATEGORIZATION_SYSTEM_PROMPT = (
+    "You are a helpful expense categorization assistant. Always respond with valid JSON only."
+)
+RECEIPT_SYSTEM_PROMPT = (
+    "You are a helpful receipt OCR assistant. Always respond with valid JSON only."
+)
+TASK_SUGGESTIONS_SYSTEM_PROMPT = (
+    "You are a helpful household management assistant. Always respond with valid JSON only."
+)
+
+RECEIPT_OCR_PROMPT = """You are a receipt OCR assistant for a flatmates expense tracking app.
+
+Analyze this receipt image and extract the following information:
+1. Store/merchant name
+2. Date of purchase (in YYYY-MM-DD format)
+3. Total amount
+4. Individual line items with descriptions and amounts
+5. Payment method if visible
+6. Tax amount if shown
+
+Provide a JSON response with this structure:
+{
+    "success": true,
+    "merchant": "Store Name",
+    "date": "2025-11-17",
+    "total": 45.67,
+    "currency": "USD",
+    "items": [
+        {"description": "Item 1", "amount": 10.00},
+        {"description": "Item 2", "amount": 35.67}
+    ],
+    "tax": 3.45,
+    "payment_method": "Credit Card",
+    "confidence": 0.95,
+    "notes": "Any additional relevant information"
+}
+
+If you cannot read the receipt clearly, set success to false and explain in the error field.
+Respond ONLY with the JSON object, no additional text."""
+
+
+def build_categorization_prompt(description: str, amount: float, context: Optional[str] = None) -> str:
+    """
+    Build the prompt categorizing one expense.
+
+    Args:
+        description: Expense description
+        amount: Expense amount
+        context: Optional additional context
+
+    Returns:
+        Prompt asking for a single JSON categorization
+    """
+    return f"""You are an expense categorization assistant for a flatmates expense tracking app.
+
+Analyze the following expense and categorize it:
+- Description: {description}
+- Amount: ${amount:.2f}
+{f"- Context: {context}" if context else ""}
+
+Categories available: {', '.join(EXPENSE_CATEGORIES)}
+
+Provide a JSON response with:
+1. category: Main category from the list above
+2. subcategory: More specific subcategory if applicable (or null)
+3. confidence: Confidence score between 0.0 and 1.0
+4. reasoning: Brief explanation for the categorization
+5. suggested_tags: Array of 1-3 relevant tags for filtering
+
+Respond ONLY with the JSON object, no additional text."""
+
+
+def build_batch_categorization_prompt(items: List[Dict[str, Any]]) -> str:
+    """
+    Build a single prompt categorizing several expenses.
+
+    Args:
+        items: Expenses with "description", "amount" and optional "context"
+
+    Returns:
+        Prompt asking for a JSON object with one result per expense index
+    """
+    lines = []
+    for index, item in enumerate(items):
+        line = f"{index}. Description: {item['description']} | Amount: ${item['amount']:.2f}"
+        if item.get("context"):
+            line += f" | Context: {item['context']}"
+        lines.append(line)
+
+    return f"""You are an expense categorization assistant for a flatmates expense tracking app.
+
+Categorize each of the following expenses:
+{chr(10).join(lines)}
+
+Categories available: {', '.join(EXPENSE_CATEGORIES)}
+
+Provide a JSON object with a "results" array containing one entry per expense:
+{{
+    "results": [
+        {{
+            "index": 0,
+            "category": "Main category from the list above",
+            "subcategory": "More specific subcategory or null",
+            "confidence": 0.0 to 1.0,
+            "reasoning": "Brief explanation",
+            "suggested_tags": ["1-3 relevant tags"]
+        }}
+    ]
+}}
+
+Respond ONLY with the JSON object, no additional text."""
+
+
+def build_task_suggestions_prompt(
+    household_context: Dict[str, Any],
+    existing_tasks: List[Dict[str, Any]],
+    recent_expenses: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Build the prompt suggesting tasks for a household.
+
+    Args:
+        household_context: Household details such as "member_count"
+        existing_tasks: Open tasks with "title" and "status"
+        recent_expenses: Recent expenses with "amount" and "description"
+
+    Returns:
+        Prompt asking for a JSON array of task suggestions
+    """
+    context_parts = [f"Household members: {household_context.get('member_count', 0)}"]
+
+    if existing_tasks:
+        context_parts.append(f"\nCurrent tasks ({len(existing_tasks)}):")
+        for task in existing_tasks[:5]:
+            context_parts.append(f"- {task.get('title')} (Status: {task.get('status')})")
+
+    if recent_expenses:
+        context_parts.append(f"\nRecent expenses ({len(recent_expenses)}):")
+        for expense in recent_expenses[:5]:
+            context_parts.append(f"- ${expense.get('amount', 0):.2f} for {expense.get('description', 'unknown')}")
+
+    return f"""You are a helpful assistant for a flatmates household management app.
+
+Based on the following context, suggest 3-5 practical tasks for the household:
+
+{chr(10).join(context_parts)}
+
+Consider:
+1. Recurring household chores
+2. Maintenance tasks based on the season
+3. Financial tasks (bill payments, expense reviews)
+4. Shopping needs
+5. General household organization
+
+Provide a JSON array of task suggestions with this structure:
+[
+    {{
+        "title": "Task title (clear and concise)",
+        "description": "Detailed description of what needs to be done",
+        "priority": "low" | "medium" | "high",
+        "category": "chores" | "financial" | "shopping" | "maintenance" | "other",
+        "reasoning": "Why this task is suggested"
+    }}
+]
+
+Make suggestions practical, actionable, and relevant to a shared living situation.
+Respond ONLY with the JSON array, no additional text."""
+
+
+def clean_json_response(text: str) -> str:
+    """Remove markdown code blocks from JSON response."""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def default_categorization(error: str = "AI categorization unavailable") -> Dict[str, Any]:
+    """Categorization returned when no provider could answer."""
+    return {
+        "category": "Other",
+        "subcategory": None,
+        "confidence": 0.0,
+        "reasoning": error,
+        "suggested_tags": []
+    }
+
+
+def parse_categorization(text: str) -> Dict[str, Any]:
+    """
+    Parse and validate a single categorization response.
+
+    Unknown categories become "Other" and the confidence is clamped to [0, 1].
+
+    Args:
+        text: Raw response text
+
+    Returns:
+        Categorization
+
+    Raises:
+        ValueError: If the response is not a JSON object
+    """
+    result = json.loads(clean_json_response(text))
+    if not isinstance(result, dict):
+        raise ValueError("Categorization response is not a JSON object")
+
+    if result.get("category") not in EXPENSE_CATEGORIES:
+        result["category"] = "Other"
+    result["confidence"] = max(0.0, min(1.0, result.get("confidence", 0.5)))
+    return result
+
+
+def parse_batch_categorization(text: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Parse a batched categorization response.
+
+    Entries that are missing, duplicated or malformed come back as None so
+    the caller can retry just those expenses.
+
+    Args:
+        text: Raw response text
+        count: Number of expenses in the prompt
+
+    Returns:
+        One categorization (or None) per expense, in prompt order
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    try:
+        payload = json.loads(clean_json_response(text))
+    except ValueError:
+        return results
+
+    entries = payload.get("results") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return results
+
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        if not isinstance(index, int) or not 0 <= index < count or results[index] is not None:
+            continue
+        try:
+            confidence = max(0.0, min(1.0, float(entry.get("confidence", 0.5))))
+        except (TypeError, ValueError):
+            continue
+        results[index] = {
+            "category": entry.get("category") if entry.get("category") in EXPENSE_CATEGORIES else "Other",
+            "subcategory": entry.get("subcategory"),
+            "confidence": confidence,
+            "reasoning": entry.get("reasoning") or "",
+            "suggested_tags": entry.get("suggested_tags") or [],
+        }
+    return results
+
+
+def parse_receipt(text: str) -> Dict[str, Any]:
+    """
+    Parse a receipt OCR response.
+
+    Args:
+        text: Raw response text
+
+    Returns:
+        Extracted receipt data
+
+    Raises:
+        ValueError: If the response is not a JSON object
+    """
+    result = json.loads(clean_json_response(text))
+    if not isinstance(result, dict):
+        raise ValueError("Receipt response is not a JSON object")
+    return result
+
+
+def parse_task_suggestions(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse a task suggestions response.
+
+    Accepts a bare array or one wrapped in {"suggestions": [...]}, as JSON
+    mode APIs can only return objects. Unknown priorities become "medium".
+
+    Args:
+        text: Raw response text
+
+    Returns:
+        Up to five suggestions
+    """
+    result = json.loads(clean_json_response(text))
+    if isinstance(result, dict):
+        result = result.get("suggestions", [])
+    if not isinstance(result, list):
+        return []
+
+    suggestions = [suggestion for suggestion in result if isinstance(suggestion, dict)]
+    for suggestion in suggestions:
+        if suggestion.get("priority") not in TASK_PRIORITIES:
+            suggestion["priority"] = "medium"
+    return suggestions[:5]
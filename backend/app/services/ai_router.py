@@ -0,0 +1,357 @@
+"""
+Runtime routing of AI calls across providers.
+
+Every call goes to the healthiest provider first: providers whose circuit
+breaker is open are skipped, the rest are ordered by a moving average of
+their recent latency (with a head start for the configured AI_PROVIDER).
+A call that fails or runs past its provider's timeout budget fails over to
+the next provider, and with hedging enabled a backup request is started
+once the first one has taken longer than its provider's p95 latency.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import (
+    AI_CIRCUIT_STATE,
+    AI_HEDGED_REQUESTS_TOTAL,
+    AI_REQUEST_DURATION_SECONDS,
+    AI_REQUESTS_TOTAL,
+)
+from app.core.tracing import traced
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Latencies kept per provider and operation for the p95 estimate
+_LATENCY_WINDOW = 200
+
+# Samples needed before a provider's p95 is trusted as a hedging threshold
+_HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    After AI_CIRCUIT_FAILURE_THRESHOLD consecutive failures the circuit opens
+    and the provider is skipped for AI_CIRCUIT_RESET_SECONDS. It is then
+    half-open: a single trial call is let through, and while it runs the
+    provider is still skipped. Its success closes the circuit again, its
+    failure reopens it.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    _GAUGE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, provider: str):
+        """Create a closed breaker for the named provider."""
+        self.provider = provider
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._set_state(self.CLOSED)
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the reset period has passed."""
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= settings.AI_CIRCUIT_RESET_SECONDS:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def allows_requests(self) -> bool:
+        """Whether calls may be sent to the provider: closed, or half-open with no trial call running."""
+        state = self.state
+        return state == self.CLOSED or (state == self.HALF_OPEN and not self._trial_running)
+
+    def acquire(self) -> bool:
+        """
+        Claim a call to the provider, just before making it.
+
+        Returns:
+            Whether the call may go ahead; while half-open only the first
+            caller gets to make the trial call
+        """
+        if not self.allows_requests():
+            return False
+        if self._state == self.HALF_OPEN:
+            self._trial_running = True
+        return True
+
+    def release(self) -> None:
+        """Give up a claimed call that ended without an outcome, such as a cancelled one."""
+        self._trial_running = False
+
+    def record_success(self) -> None:
+        """Reset the failure count and close the circuit."""
+        self._trial_running = False
+        self.failures = 0
+        if self._state != self.CLOSED:
+            logger.info("AI provider circuit closed", provider=self.provider)
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit when the threshold is reached."""
+        self._trial_running = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (
+            self._state == self.CLOSED and self.failures >= settings.AI_CIRCUIT_FAILURE_THRESHOLD
+        ):
+            logger.warning("AI provider circuit opened", provider=self.provider, failures=self.failures)
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: str) -> None:
+        """Change state and export it."""
+        self._state = state
+        AI_CIRCUIT_STATE.labels(provider=self.provider).set(self._GAUGE_VALUES[state])
+
+
+class LatencyTracker:
+    """Exponentially weighted moving average and recent p95 of call latencies."""
+
+    def __init__(self):
+        """Create an empty tracker."""
+        self.ewma: Optional[float] = None
+        self._samples: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        """Record one call's latency."""
+        alpha = settings.AI_LATENCY_EWMA_ALPHA
+        self.ewma = seconds if self.ewma is None else alpha * seconds + (1 - alpha) * self.ewma
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency below which ``fraction`` of recent calls finished, or None without enough samples."""
+        if len(self._samples) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class AIRouter:
+    """Sends each AI call to the best provider, failing over and hedging as needed."""
+
+    def __init__(self, providers: Sequence, preferred: Optional[str] = None):
+        """
+        Create a router over the given providers.
+
+        Args:
+            providers: Providers to route between, in fallback order
+            preferred: Name of the provider favoured when latencies are
+                similar (defaults to AI_PROVIDER)
+        """
+        self.providers = list(providers)
+        preferred = (preferred or settings.AI_PROVIDER).lower()
+        if preferred == "auto":
+            # "auto" has always meant OpenAI first, then Gemini
+            preferred = "openai"
+        self.providers.sort(key=lambda provider: provider.name != preferred)
+        self.breakers: Dict[str, CircuitBreaker] = {
+            provider.name: CircuitBreaker(provider.name) for provider in self.providers
+        }
+        self._latency: Dict[Tuple[str, str], LatencyTracker] = {}
+
+    def is_available(self) -> bool:
+        """Check if any provider is configured."""
+        return any(provider.is_available() for provider in self.providers)
+
+    def latency(self, provider_name: str, operation: str) -> LatencyTracker:
+        """Latency tracker for one provider and operation."""
+        key = (provider_name, operation)
+        if key not in self._latency:
+            self._latency[key] = LatencyTracker()
+        return self._latency[key]
+
+    def candidates(self, operation: str) -> List:
+        """
+        Providers to try for an operation, best first.
+
+        Providers that aren't configured or whose circuit is open are left
+        out. The rest are ordered by latency EWMA; the preferred provider's
+        average is divided by AI_LATENCY_PREFERENCE_FACTOR so it keeps first
+        place unless another provider is clearly faster. Providers without
+        samples yet count as instant so they get tried.
+        """
+        def score(ranked: Tuple[int, object]) -> Tuple[float, int]:
+            rank, provider = ranked
+            ewma = self.latency(provider.name, operation).ewma or 0.0
+            if rank == 0:
+                ewma /= settings.AI_LATENCY_PREFERENCE_FACTOR
+            return ewma, rank
+
+        usable = [
+            (rank, provider) for rank, provider in enumerate(self.providers)
+            if provider.is_available() and self.breakers[provider.name].allows_requests()
+        ]
+        return [provider for _, provider in sorted(usable, key=score)]
+
+    @staticmethod
+    def timeout_for(provider_name: str) -> float:
+        """Time budget for one call to a provider."""
+        budgets = {
+            "gemini": settings.AI_GEMINI_TIMEOUT_SECONDS,
+            "openai": settings.AI_OPENAI_TIMEOUT_SECONDS,
+        }
+        return budgets.get(provider_name, settings.AI_HTTP_TIMEOUT_SECONDS)
+
+    async def call(
+        self,
+        operation: str,
+        call: Callable[[object], Awaitable[T]],
+        failed: Callable[[T], bool],
+        default: Callable[[], T],
+    ) -> T:
+        """
+        Run an operation against the best available provider.
+
+        Providers swallow their own errors and return a fallback result, so
+        ``failed`` decides whether a result counts as a failure.
+
+        Args:
+            operation: Operation name used in metrics and latency tracking
+            call: Runs the operation against one provider
+            failed: Whether a result is a failure that should fail over
+            default: Result returned when no provider can be called
+
+        Returns:
+            The first successful result, else the last failed one
+        """
+        remaining = self.candidates(operation)
+        if not remaining:
+            return default()
+
+        last: Optional[T] = None
+        while remaining:
+            primary = remaining.pop(0)
+            backup = remaining[0] if settings.AI_HEDGING_ENABLED and remaining else None
+            delay = self.latency(primary.name, operation).percentile(0.95) if backup else None
+
+            if delay is None:
+                result, ok = await self._call_provider(operation, primary, call, failed)
+            else:
+                result, ok, hedged = await self._call_hedged(
+                    operation, primary, backup, delay, call, failed
+                )
+                if hedged:
+                    remaining.pop(0)
+
+            if ok:
+                return result
+            if result is not None:
+                last = result
+
+        return last if last is not None else default()
+
+    async def _call_hedged(
+        self,
+        operation: str,
+        primary,
+        backup,
+        delay: float,
+        call: Callable[[object], Awaitable[T]],
+        failed: Callable[[T], bool],
+    ) -> Tuple[Optional[T], bool, bool]:
+        """
+        Call the primary provider, adding a backup request if it is slow.
+
+        Returns:
+            (result, whether it succeeded, whether the backup was called)
+        """
+        tasks = [asyncio.ensure_future(self._call_provider(operation, primary, call, failed))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                result, ok = tasks[0].result()
+                return result, ok, False
+
+            AI_HEDGED_REQUESTS_TOTAL.labels(provider=backup.name, operation=operation).inc()
+            logger.debug("Hedging AI request", operation=operation, primary=primary.name, backup=backup.name)
+            tasks.append(asyncio.ensure_future(self._call_provider(operation, backup, call, failed)))
+
+            last: Optional[T] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result, ok = task.result()
+                    if ok:
+                        return result, True, True
+                    if result is not None:
+                        last = result
+            return last, False, True
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    async def _call_provider(
+        self,
+        operation: str,
+        provider,
+        call: Callable[[object], Awaitable[T]],
+        failed: Callable[[T], bool],
+    ) -> Tuple[Optional[T], bool]:
+        """
+        Call one provider within its time budget and record the outcome.
+
+        Returns:
+            (result or None if the call raised, timed out or wasn't made
+            because another call is already trying a half-open circuit,
+            whether it succeeded)
+        """
+        breaker = self.breakers[provider.name]
+        if not breaker.acquire():
+            return None, False
+
+        result: Optional[T] = None
+        started = time.perf_counter()
+        try:
+            with traced(
+                f"ai {operation}",
+                kind=SpanKind.CLIENT,
+                attributes={"ai.provider": provider.name, "ai.operation": operation},
+            ) as span:
+                try:
+                    result = await asyncio.wait_for(call(provider), timeout=self.timeout_for(provider.name))
+                except asyncio.TimeoutError:
+                    status = "timeout"
+                except Exception as e:
+                    logger.warning("AI provider call failed", provider=provider.name, operation=operation, error=str(e))
+                    status = "error"
+                else:
+                    status = "error" if failed(result) else "success"
+                span.set_attribute("ai.status", status)
+                if status != "success":
+                    span.set_status(Status(StatusCode.ERROR))
+        except asyncio.CancelledError:
+            # A hedged call that lost; it says nothing about the provider
+            breaker.release()
+            raise
+        elapsed = time.perf_counter() - started
+
+        AI_REQUESTS_TOTAL.labels(provider=provider.name, operation=operation, status=status).inc()
+        AI_REQUEST_DURATION_SECONDS.labels(provider=provider.name, operation=operation).observe(elapsed)
+
+        if status == "success":
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        # Fast errors would make a failing provider look quick, so only
+        # completed calls and timeouts count towards its latency
+        if status != "error":
+            self.latency(provider.name, operation).observe(elapsed)
+
+        return result, status == "success"
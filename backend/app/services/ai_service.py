@@ -1,159 +1,276 @@
 """
-Unified AI service supporting multiple providers (Gemini and OpenAI).
+Unified AI service supporting multiple providers (Gemini, OpenAI and a local stub).
+
+Providers register themselves by name and only implement sending a request
+to their model; prompts and response parsing are shared (see ai_prompts).
+AI_PROVIDERS selects which registered providers the service routes between.
 """
 
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Type
 from abc import ABC, abstractmethod
-import json
-from PIL import Image
-import io
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date
+import asyncio
 import base64
+import json
+import random
+import threading
+import uuid
+import zlib
+
+import httpx
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import (
+    AI_CATEGORIZATION_BATCH_SIZE,
+    AI_CATEGORIZATIONS_TOTAL,
+    AI_QUEUE_DEPTH,
+    AI_REQUESTS_IN_FLIGHT,
+)
+from app.services.ai_prompts import (
+    CATEGORIZATION_SYSTEM_PROMPT,
+    EXPENSE_CATEGORIES,
+    RECEIPT_OCR_PROMPT,
+    RECEIPT_SYSTEM_PROMPT,
+    TASK_SUGGESTIONS_SYSTEM_PROMPT,
+    build_batch_categorization_prompt,
+    build_categorization_prompt,
+    build_task_suggestions_prompt,
+    default_categorization,
+    parse_batch_categorization,
+    parse_categorization,
+    parse_receipt,
+    parse_task_suggestions,
+)
+from app.services.ai_router import AIRouter
+from app.services.categorization_cache import CategorizationCache, categorization_cache
+from app.services.local_categorizer import LocalCategorizer, local_categorizer, match_keywords
+from app.services.receipt_processing import preprocess_receipt
+
+logger = get_logger(__name__)
+
+
+class AIProviderBusyError(Exception):
+    """Raised when a provider call waits too long for a concurrency slot."""
+
+
+class StubProviderError(Exception):
+    """Raised by the stub provider to simulate a failed call."""
+
+
+def _categorization_failed(result: Dict[str, Any]) -> bool:
+    """Providers report failures as zero-confidence categorizations."""
+    return result.get("confidence", 0.0) <= 0
+
+
+@dataclass
+class AIRequest:
+    """One prompt to send to a provider's model."""
+
+    operation: str  # "categorize", "categorize_batch", "receipt_ocr" or "suggest_tasks"
+    prompt: str
+    system: str
+    temperature: float
+    image: Optional[bytes] = None
+    mime_type: str = "image/jpeg"
+    # Inputs the prompt was built from, for providers that don't read prompts
+    payload: Dict[str, Any] = field(default_factory=dict)
+
+
+PROVIDER_REGISTRY: Dict[str, Type["AIProvider"]] = {}
+
+
+def register_provider(provider_class: Type["AIProvider"]) -> Type["AIProvider"]:
+    """Class decorator making a provider selectable by name in AI_PROVIDERS."""
+    PROVIDER_REGISTRY[provider_class.name] = provider_class
+    return provider_class
+
+
+def create_providers(names: Optional[List[str]] = None) -> List["AIProvider"]:
+    """
+    Instantiate registered providers.
+
+    Args:
+        names: Provider names (defaults to AI_PROVIDERS); unknown names are
+            logged and skipped
+
+    Returns:
+        One provider per known name, in the given order
+    """
+    providers = []
+    for name in names if names is not None else settings.AI_PROVIDERS:
+        provider_class = PROVIDER_REGISTRY.get(name.lower())
+        if provider_class is None:
+            logger.error("Unknown AI provider", provider=name, registered=sorted(PROVIDER_REGISTRY))
+            continue
+        providers.append(provider_class())
+    return providers
 
 
 class AIProvider(ABC):
-    """Abstract base class for AI providers."""
+    """
+    Abstract base class for AI providers.
+
+    Subclasses implement ``_complete`` to send one request to their model and
+    return its raw text; building prompts, parsing responses and falling
+    back on errors is shared.
+    """
+
+    name: str = "base"
+
+    def __init__(self):
+        """Set up the per-provider concurrency limit."""
+        self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+
+    @asynccontextmanager
+    async def _concurrency_slot(self) -> AsyncIterator[None]:
+        """
+        Hold one of the provider's concurrency slots for the duration of a call.
+
+        Callers beyond AI_MAX_CONCURRENCY wait (counted in the queue depth
+        gauge) so a burst of slow AI calls can't monopolise the worker.
+
+        Raises:
+            AIProviderBusyError: If no slot frees up within AI_QUEUE_TIMEOUT_SECONDS
+        """
+        queue_depth = AI_QUEUE_DEPTH.labels(provider=self.name)
+        queue_depth.inc()
+        try:
+            await asyncio.wait_for(
+                self._semaphore.acquire(), timeout=settings.AI_QUEUE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            raise AIProviderBusyError(f"{self.name} provider is at capacity")
+        finally:
+            queue_depth.dec()
+
+        in_flight = AI_REQUESTS_IN_FLIGHT.labels(provider=self.name)
+        in_flight.inc()
+        try:
+            yield
+        finally:
+            in_flight.dec()
+            self._semaphore.release()
 
     @abstractmethod
     def is_available(self) -> bool:
         """Check if the provider is configured and available."""
         pass
 
-    @abstractmethod
-    async def categorize_expense(
-        self, description: str, amount: float, context: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Categorize an expense using AI."""
-        pass
+    async def aclose(self) -> None:
+        """Release any network resources held by the provider."""
+        return None
 
     @abstractmethod
-    async def extract_receipt_data(
-        self, image_data: bytes, mime_type: str = "image/jpeg"
-    ) -> Dict[str, Any]:
-        """Extract data from a receipt image using OCR."""
-        pass
-
-    @abstractmethod
-    async def suggest_tasks(
-        self,
-        household_context: Dict[str, Any],
-        existing_tasks: List[Dict[str, Any]],
-        recent_expenses: Optional[List[Dict[str, Any]]] = None,
-    ) -> List[Dict[str, Any]]:
-        """Generate smart task suggestions based on household context."""
+    async def _complete(self, request: AIRequest) -> str:
+        """Send one request to the model and return the raw response text."""
         pass
 
-
-class GeminiProvider(AIProvider):
-    """Google Gemini AI provider."""
-
-    def __init__(self):
-        """Initialize Gemini AI with API key."""
-        self.model = None
-        if settings.GEMINI_API_KEY:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-            except Exception as e:
-                print(f"Failed to initialize Gemini: {e}")
-
-    def is_available(self) -> bool:
-        """Check if Gemini AI is configured and available."""
-        return self.model is not None
+    async def _call(self, request: AIRequest) -> str:
+        """Send a request while holding a concurrency slot."""
+        async with self._concurrency_slot():
+            return await self._complete(request)
 
     async def categorize_expense(
         self, description: str, amount: float, context: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Categorize an expense using Gemini AI."""
+        """Categorize an expense using AI."""
         if not self.is_available():
-            return self._get_default_categorization()
-
-        categories = [
-            "Groceries", "Utilities", "Rent", "Transportation", "Entertainment",
-            "Dining", "Healthcare", "Shopping", "Home Maintenance", "Other"
-        ]
-
-        prompt = f"""You are an expense categorization assistant for a flatmates expense tracking app.
+            return default_categorization()
+
+        request = AIRequest(
+            operation="categorize",
+            prompt=build_categorization_prompt(description, amount, context),
+            system=CATEGORIZATION_SYSTEM_PROMPT,
+            temperature=0.7,
+            payload={"items": [{"description": description, "amount": amount, "context": context}]},
+        )
+        try:
+            return parse_categorization(await self._call(request))
+        except Exception as e:
+            logger.warning("AI categorization failed", provider=self.name, error=str(e))
+            return default_categorization(str(e))
 
-Analyze the following expense and categorize it:
-- Description: {description}
-- Amount: ${amount:.2f}
-{f"- Context: {context}" if context else ""}
+    async def categorize_expenses_batch(
+        self, items: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Categorize several expenses, packing up to AI_BATCH_MAX_SIZE into each call.
 
-Categories available: {', '.join(categories)}
+        Expenses the batched response doesn't cover are retried one by one.
 
-Provide a JSON response with:
-1. category: Main category from the list above
-2. subcategory: More specific subcategory if applicable (or null)
-3. confidence: Confidence score between 0.0 and 1.0
-4. reasoning: Brief explanation for the categorization
-5. suggested_tags: Array of 1-3 relevant tags for filtering
+        Args:
+            items: Expenses with "description", "amount" and optional "context"
 
-Respond ONLY with the JSON object, no additional text."""
+        Returns:
+            One categorization per expense, in order
+        """
+        size = max(1, settings.AI_BATCH_MAX_SIZE)
+        chunks = [items[start:start + size] for start in range(0, len(items), size)]
 
-        try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            result_text = self._clean_json_response(result_text)
-            result = json.loads(result_text)
+        async def run_chunk(chunk: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+            if len(chunk) < 2 or not self.is_available():
+                return [None] * len(chunk)
+            AI_CATEGORIZATION_BATCH_SIZE.labels(provider=self.name).observe(len(chunk))
+            try:
+                return await self._categorize_batch_chunk(chunk)
+            except Exception as e:
+                logger.warning("Batch categorization failed", provider=self.name, size=len(chunk), error=str(e))
+                return [None] * len(chunk)
 
-            if result.get("category") not in categories:
-                result["category"] = "Other"
-            result["confidence"] = max(0.0, min(1.0, result.get("confidence", 0.5)))
+        results = [
+            result for chunk_results in await asyncio.gather(*(run_chunk(c) for c in chunks))
+            for result in chunk_results
+        ]
 
-            return result
-        except Exception as e:
-            print(f"Error in Gemini categorization: {str(e)}")
-            return self._get_default_categorization(str(e))
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            retried = await asyncio.gather(*(
+                self.categorize_expense(
+                    items[index]["description"], items[index]["amount"], items[index].get("context")
+                )
+                for index in missing
+            ))
+            for index, result in zip(missing, retried):
+                results[index] = result
+
+        return results
+
+    async def _categorize_batch_chunk(
+        self, items: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Categorize one chunk in a single call; None entries are retried individually."""
+        request = AIRequest(
+            operation="categorize_batch",
+            prompt=build_batch_categorization_prompt(items),
+            system=CATEGORIZATION_SYSTEM_PROMPT,
+            temperature=0.7,
+            payload={"items": items},
+        )
+        return parse_batch_categorization(await self._call(request), len(items))
 
     async def extract_receipt_data(
         self, image_data: bytes, mime_type: str = "image/jpeg"
     ) -> Dict[str, Any]:
-        """Extract data from a receipt image using Gemini Vision."""
+        """Extract data from a receipt image using OCR."""
         if not self.is_available():
             return {"success": False, "error": "AI service unavailable", "expenses": []}
 
-        prompt = """You are a receipt OCR assistant for a flatmates expense tracking app.
-
-Analyze this receipt image and extract the following information:
-1. Store/merchant name
-2. Date of purchase (in YYYY-MM-DD format)
-3. Total amount
-4. Individual line items with descriptions and amounts
-5. Payment method if visible
-6. Tax amount if shown
-
-Provide a JSON response with this structure:
-{
-    "success": true,
-    "merchant": "Store Name",
-    "date": "2025-11-17",
-    "total": 45.67,
-    "currency": "USD",
-    "items": [
-        {"description": "Item 1", "amount": 10.00},
-        {"description": "Item 2", "amount": 35.67}
-    ],
-    "tax": 3.45,
-    "payment_method": "Credit Card",
-    "confidence": 0.95,
-    "notes": "Any additional relevant information"
-}
-
-If you cannot read the receipt clearly, set success to false and explain in the error field.
-Respond ONLY with the JSON object, no additional text."""
-
+        request = AIRequest(
+            operation="receipt_ocr",
+            prompt=RECEIPT_OCR_PROMPT,
+            system=RECEIPT_SYSTEM_PROMPT,
+            temperature=0.3,
+            image=image_data,
+            mime_type=mime_type,
+        )
         try:
-            image = Image.open(io.BytesIO(image_data))
-            response = self.model.generate_content([prompt, image])
-            result_text = response.text.strip()
-            result_text = self._clean_json_response(result_text)
-            result = json.loads(result_text)
-            return result
+            return parse_receipt(await self._call(request))
         except Exception as e:
-            print(f"Error in Gemini OCR: {str(e)}")
+            logger.warning("AI OCR failed", provider=self.name, error=str(e))
             return {"success": False, "error": f"Failed to process receipt: {str(e)}", "expenses": []}
 
     async def suggest_tasks(
@@ -162,384 +279,539 @@ Respond ONLY with the JSON object, no additional text."""
         existing_tasks: List[Dict[str, Any]],
         recent_expenses: Optional[List[Dict[str, Any]]] = None,
     ) -> List[Dict[str, Any]]:
-        """Generate smart task suggestions using Gemini."""
+        """
+        Generate smart task suggestions based on household context.
+
+        Unlike the other operations, errors are raised rather than answered
+        with a fallback: an empty list is a valid answer, so the router can
+        only tell a failure by its exception.
+
+        Raises:
+            Exception: If the provider call fails or its answer can't be parsed
+        """
         if not self.is_available():
             return []
 
-        context_parts = [f"Household members: {household_context.get('member_count', 0)}"]
-
-        if existing_tasks:
-            context_parts.append(f"\nCurrent tasks ({len(existing_tasks)}):")
-            for task in existing_tasks[:5]:
-                context_parts.append(f"- {task.get('title')} (Status: {task.get('status')})")
+        request = AIRequest(
+            operation="suggest_tasks",
+            prompt=build_task_suggestions_prompt(household_context, existing_tasks, recent_expenses),
+            system=TASK_SUGGESTIONS_SYSTEM_PROMPT,
+            temperature=0.8,
+            payload={
+                "household_context": household_context,
+                "existing_tasks": existing_tasks,
+                "recent_expenses": recent_expenses or [],
+            },
+        )
+        return parse_task_suggestions(await self._call(request))
+
+
+@register_provider
+class GeminiProvider(AIProvider):
+    """Google Gemini AI provider."""
 
-        if recent_expenses:
-            context_parts.append(f"\nRecent expenses ({len(recent_expenses)}):")
-            for expense in recent_expenses[:5]:
-                context_parts.append(f"- ${expense.get('amount', 0):.2f} for {expense.get('description', 'unknown')}")
+    name = "gemini"
 
-        prompt = f"""You are a helpful assistant for a flatmates household management app.
+    def __init__(self):
+        """Create the provider; the SDK is configured on first use."""
+        super().__init__()
+        self._model = None
+        self._init_failed = False
+        self._init_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Gemini model, configured once and reused for every call."""
+        if self._model is None and not self._init_failed and settings.GEMINI_API_KEY:
+            with self._init_lock:
+                if self._model is None and not self._init_failed:
+                    try:
+                        import google.generativeai as genai
+                        genai.configure(api_key=settings.GEMINI_API_KEY)
+                        self._model = genai.GenerativeModel('gemini-1.5-flash')
+                    except Exception as e:
+                        self._init_failed = True
+                        logger.error("Failed to initialize Gemini", error=str(e))
+        return self._model
 
-Based on the following context, suggest 3-5 practical tasks for the household:
+    def is_available(self) -> bool:
+        """Check if Gemini AI is configured and available."""
+        return bool(settings.GEMINI_API_KEY) and not self._init_failed
 
-{chr(10).join(context_parts)}
+    async def _complete(self, request: AIRequest) -> str:
+        """Send a request to Gemini (which has no separate system prompt)."""
+        content: Any = request.prompt
+        if request.image is not None:
+            # Pass the encoded bytes straight through; decoding with PIL here
+            # would only burn event loop time before the SDK re-encodes them
+            content = [request.prompt, {"mime_type": request.mime_type, "data": request.image}]
+        response = await self.model.generate_content_async(content)
+        return response.text
 
-Consider:
-1. Recurring household chores
-2. Maintenance tasks based on the season
-3. Financial tasks (bill payments, expense reviews)
-4. Shopping needs
-5. General household organization
 
-Provide a JSON array of task suggestions with this structure:
-[
-    {{
-        "title": "Task title (clear and concise)",
-        "description": "Detailed description of what needs to be done",
-        "priority": "low" | "medium" | "high",
-        "category": "chores" | "financial" | "shopping" | "maintenance" | "other",
-        "reasoning": "Why this task is suggested"
-    }}
-]
+@register_provider
+class OpenAIProvider(AIProvider):
+    """OpenAI / GitHub Models provider."""
 
-Make suggestions practical, actionable, and relevant to a shared living situation.
-Respond ONLY with the JSON array, no additional text."""
+    name = "openai"
 
-        try:
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            result_text = self._clean_json_response(result_text)
-            suggestions = json.loads(result_text)
+    def __init__(self):
+        """Create the provider; the client is built on first use."""
+        super().__init__()
+        self.model = settings.OPENAI_MODEL
+        self._client = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._init_failed = False
+        self._init_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """OpenAI client backed by a single pooled HTTP client."""
+        if self._client is None and not self._init_failed and settings.OPENAI_API_KEY:
+            with self._init_lock:
+                if self._client is None and not self._init_failed:
+                    try:
+                        from openai import AsyncOpenAI
+                        self._http_client = httpx.AsyncClient(
+                            limits=httpx.Limits(
+                                max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                            ),
+                            timeout=settings.AI_HTTP_TIMEOUT_SECONDS,
+                        )
+                        self._client = AsyncOpenAI(
+                            api_key=settings.OPENAI_API_KEY,
+                            base_url=settings.OPENAI_BASE_URL,
+                            http_client=self._http_client,
+                        )
+                    except Exception as e:
+                        self._init_failed = True
+                        logger.error("Failed to initialize OpenAI", error=str(e))
+        return self._client
 
-            valid_priorities = ["low", "medium", "high"]
-            for suggestion in suggestions:
-                if suggestion.get("priority") not in valid_priorities:
-                    suggestion["priority"] = "medium"
+    def is_available(self) -> bool:
+        """Check if OpenAI is configured and available."""
+        return bool(settings.OPENAI_API_KEY) and not self._init_failed
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+
+    async def _complete(self, request: AIRequest) -> str:
+        """Send a request as a JSON-mode chat completion."""
+        content: Any = request.prompt
+        if request.image is not None:
+            base64_image = base64.b64encode(request.image).decode('utf-8')
+            content = [
+                {"type": "text", "text": request.prompt},
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:{request.mime_type};base64,{base64_image}"}
+                }
+            ]
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": request.system},
+                {"role": "user", "content": content}
+            ],
+            temperature=request.temperature,
+            response_format={"type": "json_object"}
+        )
+        return response.choices[0].message.content
+
+
+@register_provider
+class StubProvider(AIProvider):
+    """
+    Deterministic offline provider for load and latency testing.
+
+    Answers every request without network access after a simulated latency
+    of AI_STUB_LATENCY_MS (plus or minus AI_STUB_JITTER_MS), and fails a
+    share AI_STUB_FAILURE_RATE of calls. Latencies and failures come from a
+    generator seeded with AI_STUB_SEED, and answers depend only on the
+    request, so runs are reproducible. Enable with AI_PROVIDERS=["stub"].
+    """
+
+    name = "stub"
 
-            return suggestions[:5]
-        except Exception as e:
-            print(f"Error in Gemini task suggestions: {str(e)}")
-            return []
+    def __init__(self):
+        """Create the provider with its seeded generator."""
+        super().__init__()
+        self._random = random.Random(settings.AI_STUB_SEED)
 
-    @staticmethod
-    def _clean_json_response(text: str) -> str:
-        """Remove markdown code blocks from JSON response."""
-        if text.startswith("```json"):
-            text = text[7:]
-        if text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        return text.strip()
+    def is_available(self) -> bool:
+        """The stub needs no configuration."""
+        return True
+
+    async def _complete(self, request: AIRequest) -> str:
+        """Wait for the simulated latency, then fail or answer."""
+        jitter = self._random.uniform(-settings.AI_STUB_JITTER_MS, settings.AI_STUB_JITTER_MS)
+        await asyncio.sleep(max(0.0, settings.AI_STUB_LATENCY_MS + jitter) / 1000)
+        if self._random.random() < settings.AI_STUB_FAILURE_RATE:
+            raise StubProviderError(f"Simulated {request.operation} failure")
+        return json.dumps(self._respond(request))
+
+    def _respond(self, request: AIRequest) -> Any:
+        """Build the response a model would give to the request."""
+        if request.operation == "categorize":
+            return self._categorize(request.payload["items"][0])
+        if request.operation == "categorize_batch":
+            return {"results": [
+                {"index": index, **self._categorize(item)}
+                for index, item in enumerate(request.payload["items"])
+            ]}
+        if request.operation == "receipt_ocr":
+            total = zlib.crc32(request.image or b"") % 10000 / 100
+            return {
+                "success": True,
+                "merchant": "Stub Store",
+                "date": date.today().isoformat(),
+                "total": total,
+                "currency": "USD",
+                "items": [{"description": "Stub item", "amount": total}],
+                "confidence": 0.9,
+            }
+        if request.operation == "suggest_tasks":
+            return self._suggest(request.payload)
+        raise StubProviderError(f"Unsupported operation {request.operation}")
 
     @staticmethod
-    def _get_default_categorization(error: str = "AI categorization unavailable") -> Dict[str, Any]:
-        """Return default categorization when AI is unavailable."""
+    def _categorize(item: Dict[str, Any]) -> Dict[str, Any]:
+        """Categorize by keyword, else by a stable hash of the description."""
+        description = item["description"]
+        category = match_keywords(description)
+        confidence = 0.9
+        if category is None:
+            category = EXPENSE_CATEGORIES[zlib.crc32(description.lower().encode()) % len(EXPENSE_CATEGORIES)]
+            confidence = 0.6
         return {
-            "category": "Other",
+            "category": category,
             "subcategory": None,
-            "confidence": 0.0,
-            "reasoning": error,
-            "suggested_tags": []
+            "confidence": confidence,
+            "reasoning": "Stub categorization",
+            "suggested_tags": [],
         }
 
-
-class OpenAIProvider(AIProvider):
-    """OpenAI / GitHub Models provider."""
-
-    def __init__(self):
-        """Initialize OpenAI with API key."""
-        self.client = None
-        if settings.OPENAI_API_KEY:
-            try:
-                from openai import AsyncOpenAI
-                self.client = AsyncOpenAI(
-                    api_key=settings.OPENAI_API_KEY,
-                    base_url=settings.OPENAI_BASE_URL,
-                )
-                self.model = settings.OPENAI_MODEL
-            except Exception as e:
-                print(f"Failed to initialize OpenAI: {e}")
-
-    def is_available(self) -> bool:
-        """Check if OpenAI is configured and available."""
-        return self.client is not None
-
-    async def categorize_expense(
+    @staticmethod
+    def _suggest(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Suggest a fixed set of tasks shaped by the household context."""
+        suggestions = [
+            {
+                "title": "Clean shared kitchen",
+                "description": "Wipe counters, clean the hob and empty the bins",
+                "priority": "medium",
+                "category": "chores",
+                "reasoning": f"Shared by {payload['household_context'].get('member_count', 0)} flatmates",
+            },
+            {
+                "title": "Restock household supplies",
+                "description": "Check cleaning products, toilet paper and bin bags",
+                "priority": "low",
+                "category": "shopping",
+                "reasoning": "Regular restocking",
+            },
+        ]
+        if payload["recent_expenses"]:
+            suggestions.append({
+                "title": "Review recent expenses",
+                "description": f"Settle up the last {len(payload['recent_expenses'])} shared expenses",
+                "priority": "high",
+                "category": "financial",
+                "reasoning": "There are recent shared expenses",
+            })
+        return suggestions
+
+
+class CategorizationBatcher:
+    """
+    Coalesces concurrent single categorizations into batched provider calls.
+
+    The first request opens a window of AI_BATCH_WINDOW_MS; every request
+    arriving before it closes (or until AI_BATCH_MAX_SIZE is reached) is sent
+    to the provider in the same call.
+    """
+
+    def __init__(self, provider: AIProvider):
+        """Create a batcher in front of the given provider."""
+        self.provider = provider
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+
+    async def categorize(
         self, description: str, amount: float, context: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Categorize an expense using OpenAI."""
-        if not self.is_available():
-            return self._get_default_categorization()
-
-        categories = [
-            "Groceries", "Utilities", "Rent", "Transportation", "Entertainment",
-            "Dining", "Healthcare", "Shopping", "Home Maintenance", "Other"
-        ]
-
-        prompt = f"""You are an expense categorization assistant for a flatmates expense tracking app.
-
-Analyze the following expense and categorize it:
-- Description: {description}
-- Amount: ${amount:.2f}
-{f"- Context: {context}" if context else ""}
-
-Categories available: {', '.join(categories)}
-
-Provide a JSON response with:
-1. category: Main category from the list above
-2. subcategory: More specific subcategory if applicable (or null)
-3. confidence: Confidence score between 0.0 and 1.0
-4. reasoning: Brief explanation for the categorization
-5. suggested_tags: Array of 1-3 relevant tags for filtering
-
-Respond ONLY with the JSON object, no additional text."""
-
+        """Queue one categorization and wait for its batch to complete."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(({"description": description, "amount": amount, "context": context}, future))
+
+        if len(self._pending) >= settings.AI_BATCH_MAX_SIZE:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._spawn(self._run(self._take_pending()))
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+
+        return await future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Start a task and keep a reference to it until it finishes."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _take_pending(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        """Detach the requests collected so far."""
+        batch, self._pending = self._pending, []
+        return batch
+
+    async def _flush_later(self) -> None:
+        """Send the collected requests once the window closes."""
+        await asyncio.sleep(settings.AI_BATCH_WINDOW_MS / 1000)
+        self._timer = None
+        await self._run(self._take_pending())
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Call the provider for a batch and resolve its waiters."""
+        if not batch:
+            return
+        items = [item for item, _ in batch]
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful expense categorization assistant. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
-
-            result_text = response.choices[0].message.content
-            result = json.loads(result_text)
-
-            if result.get("category") not in categories:
-                result["category"] = "Other"
-            result["confidence"] = max(0.0, min(1.0, result.get("confidence", 0.5)))
-
-            return result
+            if len(items) == 1:
+                results = [await self.provider.categorize_expense(
+                    items[0]["description"], items[0]["amount"], items[0]["context"]
+                )]
+            else:
+                results = await self.provider.categorize_expenses_batch(items)
         except Exception as e:
-            print(f"Error in OpenAI categorization: {str(e)}")
-            return self._get_default_categorization(str(e))
-
-    async def extract_receipt_data(
-        self, image_data: bytes, mime_type: str = "image/jpeg"
-    ) -> Dict[str, Any]:
-        """Extract data from a receipt image using OpenAI Vision."""
-        if not self.is_available():
-            return {"success": False, "error": "AI service unavailable", "expenses": []}
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
 
-        # Convert image to base64
-        base64_image = base64.b64encode(image_data).decode('utf-8')
-
-        prompt = """You are a receipt OCR assistant for a flatmates expense tracking app.
-
-Analyze this receipt image and extract the following information:
-1. Store/merchant name
-2. Date of purchase (in YYYY-MM-DD format)
-3. Total amount
-4. Individual line items with descriptions and amounts
-5. Payment method if visible
-6. Tax amount if shown
-
-Provide a JSON response with this structure:
-{
-    "success": true,
-    "merchant": "Store Name",
-    "date": "2025-11-17",
-    "total": 45.67,
-    "currency": "USD",
-    "items": [
-        {"description": "Item 1", "amount": 10.00},
-        {"description": "Item 2", "amount": 35.67}
-    ],
-    "tax": 3.45,
-    "payment_method": "Credit Card",
-    "confidence": 0.95,
-    "notes": "Any additional relevant information"
-}
-
-If you cannot read the receipt clearly, set success to false and explain in the error field.
-Respond ONLY with the JSON object, no additional text."""
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
 
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful receipt OCR assistant. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:{mime_type};base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
 
-            result_text = response.choices[0].message.content
-            result = json.loads(result_text)
-            return result
-        except Exception as e:
-            print(f"Error in OpenAI OCR: {str(e)}")
-            return {"success": False, "error": f"Failed to process receipt: {str(e)}", "expenses": []}
+class AIService:
+    """Unified AI service that routes calls across the configured providers."""
 
-    async def suggest_tasks(
+    def __init__(
         self,
-        household_context: Dict[str, Any],
-        existing_tasks: List[Dict[str, Any]],
-        recent_expenses: Optional[List[Dict[str, Any]]] = None,
-    ) -> List[Dict[str, Any]]:
-        """Generate smart task suggestions using OpenAI."""
-        if not self.is_available():
-            return []
-
-        context_parts = [f"Household members: {household_context.get('member_count', 0)}"]
-
-        if existing_tasks:
-            context_parts.append(f"\nCurrent tasks ({len(existing_tasks)}):")
-            for task in existing_tasks[:5]:
-                context_parts.append(f"- {task.get('title')} (Status: {task.get('status')})")
+        cache: Optional[CategorizationCache] = None,
+        local: Optional[LocalCategorizer] = None,
+        providers: Optional[List[AIProvider]] = None,
+    ):
+        """
+        Initialize AI service with configured providers.
+
+        Args:
+            cache: Categorization cache (defaults to the shared one)
+            local: Local categorizer (defaults to the shared one)
+            providers: Providers to route between (defaults to AI_PROVIDERS)
+        """
+        self.providers = providers if providers is not None else create_providers()
+        self.router = AIRouter(self.providers)
+        self.cache = cache or categorization_cache
+        self.local = local or local_categorizer
+        self._batchers: Dict[str, CategorizationBatcher] = {}
 
-        if recent_expenses:
-            context_parts.append(f"\nRecent expenses ({len(recent_expenses)}):")
-            for expense in recent_expenses[:5]:
-                context_parts.append(f"- ${expense.get('amount', 0):.2f} for {expense.get('description', 'unknown')}")
-
-        prompt = f"""You are a helpful assistant for a flatmates household management app.
-
-Based on the following context, suggest 3-5 practical tasks for the household:
+    def is_available(self) -> bool:
+        """Check if any AI provider is available."""
+        return self.router.is_available()
 
-{chr(10).join(context_parts)}
+    async def aclose(self) -> None:
+        """Release network resources held by all providers."""
+        for provider in self.providers:
+            await provider.aclose()
 
-Consider:
-1. Recurring household chores
-2. Maintenance tasks based on the season
-3. Financial tasks (bill payments, expense reviews)
-4. Shopping needs
-5. General household organization
+    async def categorize_expense(
+        self,
+        description: str,
+        amount: float,
+        context: Optional[str] = None,
+        household_id: Optional[uuid.UUID] = None,
+        db: Optional[Session] = None,
+    ) -> Dict[str, Any]:
+        """
+        Categorize an expense, trying the cache and the local categorizer first.
+
+        The LLM is only called when neither has a confident answer. If it is
+        unavailable or fails, the local categorizer's best guess is returned
+        instead of a zero-confidence "Other".
+
+        Args:
+            description: Expense description
+            amount: Expense amount
+            context: Optional additional context for the AI
+            household_id: Household whose cache tier and past expenses to use, if any
+            db: Database session; without one the cache and household model are bypassed
+
+        Returns:
+            Categorization with a "source" key of "cache", "local" or "ai"
+        """
+        result, local = await asyncio.to_thread(
+            self._categorize_without_llm, description, amount, context, household_id, db
+        )
+        if result is not None:
+            return result
 
-Provide a JSON array of task suggestions with this structure:
-[
-    {{
-        "title": "Task title (clear and concise)",
-        "description": "Detailed description of what needs to be done",
-        "priority": "low" | "medium" | "high",
-        "category": "chores" | "financial" | "shopping" | "maintenance" | "other",
-        "reasoning": "Why this task is suggested"
-    }}
-]
+        async def categorize(provider: AIProvider) -> Dict[str, Any]:
+            if settings.AI_BATCH_WINDOW_MS > 0:
+                return await self._get_batcher(provider).categorize(description, amount, context)
+            return await provider.categorize_expense(description, amount, context)
 
-Make suggestions practical, actionable, and relevant to a shared living situation.
-Respond ONLY with the JSON array, no additional text."""
+        fresh = await self.router.call(
+            "categorize", categorize, _categorization_failed, default_categorization
+        )
+        return await asyncio.to_thread(
+            self._finish_categorization, fresh, local, description, amount, context, household_id, db
+        )
 
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful household management assistant. Always respond with valid JSON only."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,
-                response_format={"type": "json_object"}
+    async def categorize_expenses_batch(
+        self,
+        items: List[Dict[str, Any]],
+        household_id: Optional[uuid.UUID] = None,
+        db: Optional[Session] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Categorize several expenses, sending the ones that need the LLM in batched calls.
+
+        Args:
+            items: Expenses with "description", "amount" and optional "context"
+            household_id: Household whose cache tier and past expenses to use, if any
+            db: Database session; without one the cache and household model are bypassed
+
+        Returns:
+            One categorization per expense, in order, each with a "source" key
+        """
+        def without_llm() -> List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]:
+            return [
+                self._categorize_without_llm(
+                    item["description"], item["amount"], item.get("context"), household_id, db
+                )
+                for item in items
+            ]
+
+        results: List[Optional[Dict[str, Any]]] = []
+        locals_: List[Optional[Dict[str, Any]]] = []
+        for result, local in await asyncio.to_thread(without_llm):
+            results.append(result)
+            locals_.append(local)
+
+        pending = [index for index, result in enumerate(results) if result is None]
+        if pending:
+            batch = [items[index] for index in pending]
+            fresh = await self.router.call(
+                "categorize_batch",
+                lambda provider: provider.categorize_expenses_batch(batch),
+                lambda results: all(_categorization_failed(result) for result in results),
+                lambda: [default_categorization() for _ in batch],
             )
 
-            result_text = response.choices[0].message.content
-            # OpenAI might wrap array in an object, handle both cases
-            result = json.loads(result_text)
-            if isinstance(result, dict) and "suggestions" in result:
-                suggestions = result["suggestions"]
-            elif isinstance(result, list):
-                suggestions = result
-            else:
-                suggestions = []
-
-            valid_priorities = ["low", "medium", "high"]
-            for suggestion in suggestions:
-                if suggestion.get("priority") not in valid_priorities:
-                    suggestion["priority"] = "medium"
-
-            return suggestions[:5]
-        except Exception as e:
-            print(f"Error in OpenAI task suggestions: {str(e)}")
-            return []
+            def finish() -> None:
+                for index, result in zip(pending, fresh):
+                    item = items[index]
+                    results[index] = self._finish_categorization(
+                        result, locals_[index], item["description"], item["amount"],
+                        item.get("context"), household_id, db,
+                    )
 
-    @staticmethod
-    def _get_default_categorization(error: str = "AI categorization unavailable") -> Dict[str, Any]:
-        """Return default categorization when AI is unavailable."""
-        return {
-            "category": "Other",
-            "subcategory": None,
-            "confidence": 0.0,
-            "reasoning": error,
-            "suggested_tags": []
-        }
+            await asyncio.to_thread(finish)
 
+        return results
 
-class AIService:
-    """Unified AI service that routes to the appropriate provider."""
+    def _categorize_without_llm(
+        self,
+        description: str,
+        amount: float,
+        context: Optional[str],
+        household_id: Optional[uuid.UUID],
+        db: Optional[Session],
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Try the cache and the local categorizer; blocks on the database.
+
+        Returns:
+            (final result or None if the LLM is needed, local best guess)
+        """
+        if db is not None:
+            cached = self.cache.get(db, description, amount, context, household_id)
+            if cached is not None:
+                return self._with_source(cached, "cache"), None
+
+        local = None
+        if settings.LOCAL_CATEGORIZER_ENABLED:
+            local = self.local.categorize(description, db=db, household_id=household_id)
+            if local is not None and local["confidence"] >= settings.LOCAL_CATEGORIZER_MIN_CONFIDENCE:
+                return self._with_source(local, "local"), local
+
+        return None, local
+
+    def _finish_categorization(
+        self,
+        result: Dict[str, Any],
+        local: Optional[Dict[str, Any]],
+        description: str,
+        amount: float,
+        context: Optional[str],
+        household_id: Optional[uuid.UUID],
+        db: Optional[Session],
+    ) -> Dict[str, Any]:
+        """Cache an LLM result, or fall back to the local guess if the LLM failed; blocks on the database."""
+        if result.get("confidence", 0.0) <= 0 and local is not None:
+            return self._with_source(local, "local")
 
-    def __init__(self):
-        """Initialize AI service with configured providers."""
-        self.gemini = GeminiProvider()
-        self.openai = OpenAIProvider()
-        self.provider = self._select_provider()
-
-    def _select_provider(self) -> AIProvider:
-        """Select the appropriate AI provider based on configuration."""
-        provider_name = settings.AI_PROVIDER.lower()
-
-        if provider_name == "openai":
-            if self.openai.is_available():
-                print("Using OpenAI provider")
-                return self.openai
-            elif self.gemini.is_available():
-                print("OpenAI not available, falling back to Gemini")
-                return self.gemini
-        elif provider_name == "gemini":
-            if self.gemini.is_available():
-                print("Using Gemini provider")
-                return self.gemini
-            elif self.openai.is_available():
-                print("Gemini not available, falling back to OpenAI")
-                return self.openai
-        elif provider_name == "auto":
-            # Try OpenAI first, then Gemini
-            if self.openai.is_available():
-                print("Using OpenAI provider (auto-selected)")
-                return self.openai
-            elif self.gemini.is_available():
-                print("Using Gemini provider (auto-selected)")
-                return self.gemini
-
-        # Fallback to Gemini as default
-        print("No AI provider available, using default (non-functional)")
-        return self.gemini
+        if db is not None:
+            self.cache.set(db, description, amount, result, context, household_id)
+        return self._with_source(result, "ai")
 
-    def is_available(self) -> bool:
-        """Check if any AI provider is available."""
-        return self.provider.is_available()
+    def _get_batcher(self, provider: AIProvider) -> CategorizationBatcher:
+        """Get the micro-batcher for a provider."""
+        if provider.name not in self._batchers:
+            self._batchers[provider.name] = CategorizationBatcher(provider)
+        return self._batchers[provider.name]
 
-    async def categorize_expense(
-        self, description: str, amount: float, context: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Categorize an expense using the selected provider."""
-        return await self.provider.categorize_expense(description, amount, context)
+    @staticmethod
+    def _with_source(result: Dict[str, Any], source: str) -> Dict[str, Any]:
+        """Tag a categorization with where it came from."""
+        AI_CATEGORIZATIONS_TOTAL.labels(source=source).inc()
+        result["source"] = source
+        return result
 
     async def extract_receipt_data(
-        self, image_data: bytes, mime_type: str = "image/jpeg"
+        self, image_data: bytes, mime_type: str = "image/jpeg", preprocess: bool = True
     ) -> Dict[str, Any]:
-        """Extract receipt data using the selected provider."""
-        return await self.provider.extract_receipt_data(image_data, mime_type)
+        """
+        Extract receipt data, failing over between providers.
+
+        Args:
+            image_data: Receipt image bytes
+            mime_type: MIME type of image_data
+            preprocess: Shrink the image for OCR before uploading it
+
+        Returns:
+            Extracted receipt data
+
+        Raises:
+            ReceiptImageError: If preprocessing is enabled and the bytes are not an image
+        """
+        if preprocess:
+            image_data, mime_type = await preprocess_receipt(image_data)
+        return await self.router.call(
+            "receipt_ocr",
+            lambda provider: provider.extract_receipt_data(image_data, mime_type),
+            lambda result: not result.get("success"),
+            lambda: {"success": False, "error": "AI service unavailable", "expenses": []},
+        )
 
     async def suggest_tasks(
         self,
@@ -547,9 +819,62 @@ class AIService:
         existing_tasks: List[Dict[str, Any]],
         recent_expenses: Optional[List[Dict[str, Any]]] = None,
     ) -> List[Dict[str, Any]]:
-        """Generate task suggestions using the selected provider."""
-        return await self.provider.suggest_tasks(household_context, existing_tasks, recent_expenses)
-
-
-# Create a singleton instance
-ai_service = AIService()
+        """
+        Generate task suggestions, failing over between providers.
+
+        Providers raise when they fail, so only errors and timeouts fail over
+        and count against a provider's circuit; an empty list is an answer.
+        """
+        return await self.router.call(
+            "suggest_tasks",
+            lambda provider: provider.suggest_tasks(household_context, existing_tasks, recent_expenses),
+            lambda suggestions: False,
+            list,
+        )
+
+
+_ai_service: Optional[AIService] = None
+_ai_service_lock = threading.Lock()
+
+
+def get_ai_service() -> AIService:
+    """
+    Get the shared AI service, creating it on first use.
+
+    Use as a FastAPI dependency so every request reuses the same provider
+    clients and their warm connections:
+
+        @router.post("/ai/...")
+        async def endpoint(ai_service: AIService = Depends(get_ai_service)):
+            ...
+
+    Returns:
+        Process-wide AIService instance
+    """
+    global _ai_service
+    if _ai_service is None:
+        with _ai_service_lock:
+            if _ai_service is None:
+                _ai_service = AIService()
+    return _ai_service
+
+
+def ai_service_status() -> Optional[Dict[str, str]]:
+    """
+    Circuit state of each provider of the shared AI service.
+
+    Returns:
+        Provider name to circuit state, or None if the service hasn't been
+        created in this worker yet (it isn't created just to report on it)
+    """
+    if _ai_service is None:
+        return None
+    return {name: breaker.state for name, breaker in _ai_service.router.breakers.items()}
+
+
+async def close_ai_service() -> None:
+    """Close the shared AI service's connections (called on shutdown)."""
+    global _ai_service
+    if _ai_service is not None:
+        await _ai_service.aclose()
+        _ai_service = None
@@ -0,0 +1,325 @@
+"""
+Two-tier cache for AI expense categorizations.
+
+Descriptions are normalized and amounts bucketed so that "TESCO #1234" for
+12.40 and "tesco" for 11.99 share an entry. Lookups check a per-worker
+in-memory LRU first, then the database, where entries are stored per
+household and, for confident context-free results, globally.
+
+Database reads and writes use a session of their own on the caller's
+engine, so caching never commits or rolls back the caller's work. They
+block, so async callers run them in a thread.
+"""
+
+import hashlib
+import math
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import utc_now
+from app.core.logging import get_logger
+from app.core.metrics import AI_CATEGORIZATION_CACHE_TOTAL
+from app.models.ai_cache import CategorizationCacheEntry
+
+logger = get_logger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+# Expired rows are purged once every this many database writes
+_PURGE_EVERY_WRITES = 100
+
+# Dialect inserts supporting ON CONFLICT, for upserting entries
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase alphabetic words.
+
+    Args:
+        text: Raw text, e.g. an expense description
+
+    Returns:
+        Words in order of appearance, digits and punctuation removed
+    """
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_description(description: str) -> str:
+    """
+    Normalize an expense description for cache lookups.
+
+    Lowercases, drops digits and punctuation (store numbers, dates, order
+    references) and sorts the unique remaining words.
+
+    Args:
+        description: Raw expense description
+
+    Returns:
+        Normalized description, e.g. "Tesco Express #1234" -> "express tesco"
+    """
+    return " ".join(sorted(set(tokenize(description))))
+
+
+def amount_bucket(amount: float) -> int:
+    """
+    Bucket an amount on a log2 scale so similar amounts share an entry.
+
+    Args:
+        amount: Expense amount
+
+    Returns:
+        Bucket index (0 for amounts below 1)
+    """
+    if amount < 1:
+        return 0
+    return int(math.log2(amount)) + 1
+
+
+def build_cache_key(description: str, amount: float, context: Optional[str] = None) -> str:
+    """
+    Build the cache key for a categorization request.
+
+    Args:
+        description: Raw expense description
+        amount: Expense amount
+        context: Optional additional context passed to the AI
+
+    Returns:
+        Hex digest identifying the normalized request
+    """
+    parts = [
+        normalize_description(description),
+        str(amount_bucket(amount)),
+        normalize_description(context) if context else "",
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class CategorizationCache:
+    """In-memory LRU in front of the persistent categorization cache table."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        """
+        Create the cache.
+
+        Args:
+            max_entries: In-memory entries kept per worker
+            ttl_seconds: How long entries stay valid in both tiers
+        """
+        self.max_entries = max_entries or settings.CATEGORIZATION_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.CATEGORIZATION_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[Tuple[Optional[uuid.UUID], str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(
+        self,
+        db: Session,
+        description: str,
+        amount: float,
+        context: Optional[str] = None,
+        household_id: Optional[uuid.UUID] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached categorization.
+
+        The household's own entry wins over the global one.
+
+        Args:
+            db: Caller's database session; only its engine is used
+            description: Raw expense description
+            amount: Expense amount
+            context: Optional additional context
+            household_id: Household the expense belongs to, if any
+
+        Returns:
+            Copy of the cached categorization, or None on a miss
+        """
+        key = build_cache_key(description, amount, context)
+
+        for scope in self._scopes(household_id):
+            result = self._memory_get(scope, key)
+            if result is not None:
+                AI_CATEGORIZATION_CACHE_TOTAL.labels(tier="memory", result="hit").inc()
+                return dict(result)
+        AI_CATEGORIZATION_CACHE_TOTAL.labels(tier="memory", result="miss").inc()
+
+        try:
+            with self._session(db) as cache_db:
+                rows = (
+                    cache_db.query(CategorizationCacheEntry)
+                    .filter(
+                        CategorizationCacheEntry.cache_key == key,
+                        or_(
+                            CategorizationCacheEntry.household_id == household_id,
+                            CategorizationCacheEntry.household_id.is_(None),
+                        ),
+                        CategorizationCacheEntry.expires_at > utc_now(),
+                    )
+                    .all()
+                )
+                found = [(row.household_id, row.result) for row in rows]
+        except Exception as e:
+            logger.warning("Categorization cache lookup failed", error=str(e))
+            return None
+
+        found.sort(key=lambda row: row[0] is None)
+        if not found:
+            AI_CATEGORIZATION_CACHE_TOTAL.labels(tier="database", result="miss").inc()
+            return None
+
+        AI_CATEGORIZATION_CACHE_TOTAL.labels(tier="database", result="hit").inc()
+        scope, result = found[0]
+        self._memory_set(scope, key, result)
+        return dict(result)
+
+    def set(
+        self,
+        db: Session,
+        description: str,
+        amount: float,
+        result: Dict[str, Any],
+        context: Optional[str] = None,
+        household_id: Optional[uuid.UUID] = None,
+    ) -> None:
+        """
+        Store a categorization in both tiers.
+
+        Fallback results (confidence 0) are never cached. Results are shared
+        globally only when they are confident and did not depend on context.
+
+        Args:
+            db: Caller's database session; only its engine is used
+            description: Raw expense description
+            amount: Expense amount
+            result: Categorization returned by the AI provider
+            context: Optional additional context
+            household_id: Household the expense belongs to, if any
+        """
+        confidence = result.get("confidence") or 0.0
+        if confidence <= 0:
+            return
+
+        key = build_cache_key(description, amount, context)
+        scopes = [household_id] if household_id is not None else []
+        if not context and confidence >= settings.CATEGORIZATION_CACHE_GLOBAL_MIN_CONFIDENCE:
+            scopes.append(None)
+
+        if not scopes:
+            return
+
+        expires_at = utc_now() + timedelta(seconds=self.ttl_seconds)
+        for scope in scopes:
+            self._memory_set(scope, key, result)
+        try:
+            with self._session(db) as cache_db:
+                for scope in scopes:
+                    self._upsert(cache_db, scope, key, result, expires_at)
+
+                with self._lock:
+                    self._writes += 1
+                    purge = self._writes % _PURGE_EVERY_WRITES == 0
+                if purge:
+                    self.purge_expired(cache_db)
+                cache_db.commit()
+        except Exception as e:
+            logger.warning("Categorization cache write failed", error=str(e))
+
+    def purge_expired(self, db: Session) -> int:
+        """
+        Delete expired rows from the cache table.
+
+        Args:
+            db: Database session (not committed)
+
+        Returns:
+            Number of rows deleted
+        """
+        return (
+            db.query(CategorizationCacheEntry)
+            .filter(CategorizationCacheEntry.expires_at <= utc_now())
+            .delete(synchronize_session=False)
+        )
+
+    def size(self) -> int:
+        """Number of in-memory entries, including expired ones not yet evicted."""
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries."""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _upsert(
+        db: Session, scope: Optional[uuid.UUID], key: str, result: Dict[str, Any], expires_at: datetime
+    ) -> None:
+        """
+        Insert or replace an entry in one statement.
+
+        Workers that miss on the same key at once would otherwise both insert
+        it; the unique index on the tier makes the later one update instead.
+
+        Args:
+            db: Cache session (not committed)
+            scope: Household the entry belongs to, or None for the global tier
+            key: Cache key
+            result: Categorization to store
+            expires_at: When the entry stops being served
+        """
+        insert = _UPSERT_INSERTS[db.get_bind().dialect.name]
+        column = CategorizationCacheEntry.household_id
+        statement = insert(CategorizationCacheEntry).values(
+            household_id=scope, cache_key=key, result=dict(result), expires_at=expires_at
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["cache_key"] if scope is None else ["cache_key", "household_id"],
+            index_where=column.is_(None) if scope is None else column.isnot(None),
+            set_={"result": statement.excluded.result, "expires_at": statement.excluded.expires_at},
+        )
+        db.execute(statement)
+
+    @staticmethod
+    def _session(db: Session) -> Session:
+        """New session on the engine the caller's session was created with (the primary)."""
+        return Session(bind=db.bind)
+
+    @staticmethod
+    def _scopes(household_id: Optional[uuid.UUID]):
+        """Scopes to check, most specific first."""
+        return [household_id, None] if household_id is not None else [None]
+
+    def _memory_get(self, scope: Optional[uuid.UUID], key: str) -> Optional[Dict[str, Any]]:
+        """Get an unexpired in-memory entry, refreshing its LRU position."""
+        with self._lock:
+            item = self._entries.get((scope, key))
+            if item is None:
+                return None
+            expires, result = item
+            if expires <= time.monotonic():
+                del self._entries[(scope, key)]
+                return None
+            self._entries.move_to_end((scope, key))
+            return result
+
+    def _memory_set(self, scope: Optional[uuid.UUID], key: str, result: Dict[str, Any]) -> None:
+        """Add an in-memory entry, evicting the least recently used ones."""
+        with self._lock:
+            self._entries[(scope, key)] = (time.monotonic() + self.ttl_seconds, dict(result))
+            self._entries.move_to_end((scope, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+categorization_cache = CategorizationCache()
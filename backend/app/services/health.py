@@ -0,0 +1,192 @@
+"""
+Readiness checks for the health endpoints.
+
+/health/live does no I/O and only shows that the worker is serving
+requests. Readiness covers the database, the connection pool, read replica
+lag (as last measured), the AI providers and the categorization cache. Its
+result is cached for HEALTH_CACHE_SECONDS. A probe that finds the result
+stale still gets it straight away and wakes a background task to refresh
+it, so only the first probe waits. The database is checked at most once
+per window, and only while something polls readiness. Container health
+checks hitting /health/live never reach the database, so they don't keep
+Neon awake. Readiness reports "warming" while the pool is being warmed at
+startup (see app.core.db_warmup).
+
+A statement that real traffic completed within the window counts as a
+successful database check (its duration standing in for the probe's
+latency), so busy workers never send their own probe.
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.database import engine, get_db_with_retry, utc_now
+from app.core.db_warmup import connection_warmer
+from app.core.db_metrics import last_query
+from app.core.replicas import replica_router
+from app.core.logging import get_logger
+from app.services.ai_service import ai_service_status
+from app.services.categorization_cache import categorization_cache
+
+logger = get_logger(__name__)
+
+
+def check_database() -> Dict[str, Any]:
+    """
+    Check that the database is reachable.
+
+    Skips the probe when a statement completed within HEALTH_CACHE_SECONDS
+    and reports that statement's duration as the latency; otherwise runs
+    SELECT 1 with the cold-start retries of get_db_with_retry.
+    """
+    recent = last_query()
+    if recent is not None and recent[0] < settings.HEALTH_CACHE_SECONDS:
+        return {
+            "database": "healthy",
+            "database_latency_ms": round(recent[1] * 1000, 2),
+            "database_checked_by": "traffic",
+        }
+
+    start = time.perf_counter()
+    try:
+        get_db_with_retry().close()
+    except Exception as e:
+        return {
+            "database": "unhealthy",
+            "database_latency_ms": None,
+            "database_checked_by": "probe",
+            "database_error": str(e),
+        }
+    return {
+        "database": "healthy",
+        "database_latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "database_checked_by": "probe",
+    }
+
+
+def pool_status() -> Dict[str, Any]:
+    """Connection pool usage, read from the pool without touching the database."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+def ai_status() -> Dict[str, Any]:
+    """Circuit state of the AI providers; degraded when every circuit is open."""
+    providers = ai_service_status()
+    if providers is None:
+        return {"status": "idle"}
+    status = "healthy" if any(state != "open" for state in providers.values()) else "degraded"
+    return {"status": status, "providers": providers}
+
+
+def check_readiness() -> Dict[str, Any]:
+    """
+    Run all readiness checks; blocks while the database is probed.
+
+    Only the database decides the overall status: the app keeps serving
+    everything but AI features when the AI providers are down.
+    """
+    checks = {
+        "api": "healthy",
+        **check_database(),
+        "pool": pool_status(),
+        "replicas": replica_router.status(),
+        "ai": ai_status(),
+        "cache": {
+            "entries": categorization_cache.size(),
+            "max_entries": categorization_cache.max_entries,
+        },
+    }
+    return {
+        "status": "healthy" if checks["database"] == "healthy" else "unhealthy",
+        "version": settings.VERSION,
+        "environment": settings.ENVIRONMENT,
+        "checked_at": utc_now().isoformat(),
+        "checks": checks,
+    }
+
+
+class ReadinessMonitor:
+    """Caches the readiness result and refreshes it in the background on demand."""
+
+    def __init__(self):
+        """Create a monitor; checks run on the first probe."""
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._checked_while_warming = False
+        self._wanted: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stale(self) -> bool:
+        """Whether the cached result is older than HEALTH_CACHE_SECONDS or predates the end of pool warming."""
+        if self._checked_while_warming and not connection_warmer.warming:
+            return True
+        return time.monotonic() - self._checked_at >= settings.HEALTH_CACHE_SECONDS
+
+    async def start(self) -> None:
+        """Start the background refresh task (called on startup)."""
+        self._wanted = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="readiness-monitor")
+
+    async def stop(self) -> None:
+        """Stop the background refresh task (called on shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def status(self) -> Dict[str, Any]:
+        """
+        Get the readiness result.
+
+        Returns:
+            Cached result, with the current pool warmup state; checked
+            inline only when there is none yet (or the background task
+            isn't running and the result is stale). The status is
+            "warming" until startup warming has finished.
+        """
+        if self._result is None or (self._task is None and self.stale):
+            await self.refresh()
+        elif self.stale:
+            self._wanted.set()
+
+        result = {**self._result, "checks": {**self._result["checks"], "warmup": connection_warmer.state}}
+        if connection_warmer.warming:
+            result["status"] = "warming"
+        return result
+
+    async def refresh(self) -> None:
+        """Run the checks in a thread and cache the result."""
+        self._checked_while_warming = connection_warmer.warming
+        self._result = await asyncio.to_thread(check_readiness)
+        self._checked_at = time.monotonic()
+
+    async def _run(self) -> None:
+        """Refresh whenever a probe finds the result stale."""
+        while True:
+            await self._wanted.wait()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Readiness check failed", error=str(e))
+            # Probes that arrived during the refresh got a result that is
+            # now superseded; they don't need another one
+            self._wanted.clear()
+
+
+readiness_monitor = ReadinessMonitor()
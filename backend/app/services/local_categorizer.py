@@ -0,0 +1,443 @@
+"""
+Local expense categorizer used as a fast path before the LLM.
+
+Combines keyword rules with a multinomial naive Bayes model trained on each
+household's own categorized expenses. Predictions are instant and free, so
+the LLM is only consulted when the local answer is not confident enough.
+"""
+
+import math
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.expense import Expense, ExpenseCategory
+from app.services.categorization_cache import tokenize
+
+logger = get_logger(__name__)
+
+# Expense categories mapped onto the labels used by the AI providers
+CATEGORY_LABELS: Dict[ExpenseCategory, str] = {
+    ExpenseCategory.GROCERIES: "Groceries",
+    ExpenseCategory.UTILITIES: "Utilities",
+    ExpenseCategory.RENT: "Rent",
+    ExpenseCategory.INTERNET: "Utilities",
+    ExpenseCategory.CLEANING: "Home Maintenance",
+    ExpenseCategory.MAINTENANCE: "Home Maintenance",
+    ExpenseCategory.ENTERTAINMENT: "Entertainment",
+    ExpenseCategory.FOOD: "Dining",
+    ExpenseCategory.TRANSPORTATION: "Transportation",
+    ExpenseCategory.OTHER: "Other",
+}
+
+# Words that identify a category on their own
+KEYWORD_RULES: Dict[str, Tuple[str, ...]] = {
+    "Groceries": (
+        "grocery", "groceries", "supermarket", "tesco", "sainsbury", "sainsburys",
+        "asda", "aldi", "lidl", "waitrose", "morrisons", "walmart", "kroger",
+        "costco", "safeway", "trader", "bigbasket", "blinkit",
+    ),
+    "Utilities": (
+        "electricity", "electric", "gas", "water", "energy", "utility", "utilities",
+        "internet", "broadband", "wifi", "council", "sewage", "heating",
+    ),
+    "Rent": ("rent", "landlord", "lease", "deposit"),
+    "Transportation": (
+        "uber", "lyft", "taxi", "cab", "bus", "train", "metro", "tube", "fuel",
+        "petrol", "diesel", "parking", "toll", "oyster", "ola",
+    ),
+    "Dining": (
+        "restaurant", "cafe", "coffee", "pizza", "takeaway", "takeout", "deliveroo",
+        "doordash", "swiggy", "zomato", "eats", "burger", "sushi", "lunch", "dinner",
+    ),
+    "Entertainment": (
+        "netflix", "spotify", "cinema", "movie", "movies", "concert", "tickets",
+        "disney", "prime", "hulu", "games", "bowling",
+    ),
+    "Healthcare": (
+        "pharmacy", "chemist", "doctor", "dentist", "medicine", "hospital", "clinic",
+        "prescription",
+    ),
+    "Shopping": ("amazon", "ikea", "argos", "clothes", "clothing", "shoes", "flipkart"),
+    "Home Maintenance": (
+        "plumber", "electrician", "repair", "repairs", "cleaning", "cleaner",
+        "detergent", "hardware", "paint", "bulbs", "handyman",
+    ),
+}
+
+_KEYWORD_INDEX: Dict[str, str] = {
+    keyword: label for label, keywords in KEYWORD_RULES.items() for keyword in keywords
+}
+
+# Confidence assigned to an unambiguous keyword match
+_RULE_CONFIDENCE = 0.85
+
+# Words that say nothing about the category; left out of training and predictions
+_STOPWORDS = frozenset((
+    "a", "an", "and", "the", "of", "for", "to", "from", "in", "on", "at", "by",
+    "with", "my", "our", "your", "his", "her", "their", "me", "us", "we", "it",
+    "this", "that", "some", "more", "per", "via", "x",
+))
+
+# A model trained on fewer categories has nothing to choose between
+_MIN_MODEL_LABELS = 2
+
+# Most recent expenses used to train a household's model
+_MAX_TRAINING_ROWS = 2000
+
+# Trained household models kept in memory per worker
+_MAX_CACHED_MODELS = 1000
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over description words, with Laplace smoothing."""
+
+    def __init__(self):
+        """Create an empty model."""
+        self.class_counts: Counter = Counter()
+        self.token_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.class_token_totals: Counter = Counter()
+        self.vocabulary: set = set()
+
+    @property
+    def sample_count(self) -> int:
+        """Number of descriptions the model was trained on."""
+        return sum(self.class_counts.values())
+
+    @property
+    def is_trained(self) -> bool:
+        """Whether the model has seen enough descriptions and categories to answer."""
+        return (
+            self.sample_count >= settings.LOCAL_CATEGORIZER_MIN_SAMPLES
+            and len(self.class_counts) >= _MIN_MODEL_LABELS
+        )
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> "NaiveBayesModel":
+        """
+        Train the model.
+
+        Args:
+            samples: (description, label) pairs
+
+        Returns:
+            The trained model
+        """
+        for description, label in samples:
+            tokens = _evidence(description)
+            if not tokens:
+                continue
+            self.class_counts[label] += 1
+            self.token_counts[label].update(tokens)
+            self.class_token_totals[label] += len(tokens)
+            self.vocabulary.update(tokens)
+        return self
+
+    def predict(self, description: str) -> Optional[Tuple[str, float]]:
+        """
+        Predict the label of a description.
+
+        The posterior only compares the categories the household has used,
+        so it is scaled by the share of the description's words the model
+        has seen: a description that is mostly new words is not a confident
+        match however lopsided the known words are.
+
+        Args:
+            description: Expense description
+
+        Returns:
+            (label, confidence), or None if the model is not trained enough
+            or no word of the description was seen during training
+        """
+        words = _evidence(description)
+        tokens = [token for token in words if token in self.vocabulary]
+        if not tokens or not self.is_trained:
+            return None
+
+        total = self.sample_count
+        vocabulary_size = len(self.vocabulary)
+        log_scores = {}
+        for label, count in self.class_counts.items():
+            denominator = self.class_token_totals[label] + vocabulary_size
+            score = math.log(count / total)
+            for token in tokens:
+                score += math.log((self.token_counts[label][token] + 1) / denominator)
+            log_scores[label] = score
+
+        best = max(log_scores, key=log_scores.get)
+        normalizer = sum(math.exp(score - log_scores[best]) for score in log_scores.values())
+        return best, len(tokens) / len(words) / normalizer
+
+
+def _evidence(description: str) -> List[str]:
+    """Words of a description that can point to a category."""
+    return [token for token in tokenize(description) if token not in _STOPWORDS]
+
+
+def match_keywords(description: str) -> Optional[str]:
+    """
+    Apply the keyword rules to a description.
+
+    Args:
+        description: Expense description
+
+    Returns:
+        The matching label, or None if no rule or more than one label matched
+    """
+    labels = {_KEYWORD_INDEX[token] for token in tokenize(description) if token in _KEYWORD_INDEX}
+    if len(labels) != 1:
+        return None
+    return labels.pop()
+
+
+class LocalCategorizer:
+    """Keyword rules plus per-household naive Bayes models."""
+
+    def __init__(self):
+        """Create the categorizer; household models are trained on demand."""
+        self._models: "OrderedDict[uuid.UUID, Tuple[float, NaiveBayesModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def categorize(
+        self,
+        description: str,
+        db: Optional[Session] = None,
+        household_id: Optional[uuid.UUID] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Categorize an expense locally.
+
+        See ``predict`` for how the household model and keyword rules are combined.
+
+        Args:
+            description: Expense description
+            db: Database session, needed to train the household model
+            household_id: Household whose past expenses to learn from
+
+        Returns:
+            Categorization in the AI provider format, or None if neither the
+            model nor the rules have an opinion
+        """
+        model = None
+        if db is not None and household_id is not None:
+            model = self.get_model(db, household_id)
+
+        prediction = predict(description, model)
+        if prediction is None:
+            return None
+
+        label, confidence, reasoning = prediction
+        return {
+            "category": label,
+            "subcategory": None,
+            "confidence": round(confidence, 4),
+            "reasoning": reasoning,
+            "suggested_tags": [],
+        }
+
+    def get_model(self, db: Session, household_id: uuid.UUID) -> Optional[NaiveBayesModel]:
+        """
+        Get the household's model, retraining it once it is stale.
+
+        Args:
+            db: Database session
+            household_id: ID of the household
+
+        Returns:
+            Trained model, or None if the household has too few categorized expenses
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._models.get(household_id)
+            if cached is not None and now - cached[0] < settings.LOCAL_CATEGORIZER_RETRAIN_SECONDS:
+                self._models.move_to_end(household_id)
+                return cached[1]
+
+        try:
+            rows = (
+                db.query(Expense.description, Expense.category)
+                .filter(
+                    Expense.household_id == household_id,
+                    Expense.category != ExpenseCategory.OTHER,
+                )
+                .order_by(Expense.created_at.desc())
+                .limit(_MAX_TRAINING_ROWS)
+                .all()
+            )
+        except Exception as e:
+            logger.warning("Failed to load training data", household_id=str(household_id), error=str(e))
+            return None
+
+        model = train_model(rows)
+        if not model.is_trained:
+            model = None
+
+        with self._lock:
+            self._models[household_id] = (now, model)
+            self._models.move_to_end(household_id)
+            while len(self._models) > _MAX_CACHED_MODELS:
+                self._models.popitem(last=False)
+        return model
+
+    def invalidate(self, household_id: Optional[uuid.UUID] = None) -> None:
+        """Drop a household's trained model, or all of them."""
+        with self._lock:
+            if household_id is None:
+                self._models.clear()
+            else:
+                self._models.pop(household_id, None)
+
+
+def predict(
+    description: str, model: Optional[NaiveBayesModel] = None
+) -> Optional[Tuple[str, float, str]]:
+    """
+    Combine the household model and the keyword rules.
+
+    An unambiguous keyword match wins when the model disagrees with it, as
+    the model only knows the household's own categories and can't tell that
+    e.g. "council" is a utility if the household never entered one. When
+    they agree the higher confidence is used. Without a keyword match a
+    confident model answers, and failing that the model's low-confidence
+    guess is returned.
+
+    Args:
+        description: Expense description
+        model: Household model, if one could be trained
+
+    Returns:
+        (label, confidence, reasoning), or None if nothing matched
+    """
+    model_prediction = model.predict(description) if model is not None else None
+    model_reasoning = "Similar to past expenses in this household"
+
+    rule_label = match_keywords(description)
+    if rule_label is not None:
+        if model_prediction is not None and model_prediction[0] == rule_label:
+            if model_prediction[1] > _RULE_CONFIDENCE:
+                return rule_label, model_prediction[1], model_reasoning
+        return rule_label, _RULE_CONFIDENCE, "Matched a known merchant or keyword"
+
+    if model_prediction is not None:
+        return model_prediction[0], model_prediction[1], model_reasoning
+
+    return None
+
+
+def train_model(rows: Iterable[Tuple[str, ExpenseCategory]]) -> NaiveBayesModel:
+    """
+    Train a model from (description, category) rows.
+
+    Args:
+        rows: Expense descriptions with their ExpenseCategory
+
+    Returns:
+        Trained model over the AI category labels
+    """
+    return NaiveBayesModel().fit(
+        (description, CATEGORY_LABELS[ExpenseCategory(category)]) for description, category in rows
+    )
+
+
+def evaluate(
+    rows: List[Tuple[str, ExpenseCategory]],
+    holdout: float = 0.2,
+    min_confidence: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate the local categorizer on one household's expenses.
+
+    The oldest expenses train the model and the newest ``holdout`` fraction
+    is categorized, as if it were entered after the model was built.
+
+    Args:
+        rows: (description, category) rows ordered oldest first
+        holdout: Fraction of rows to evaluate on
+        min_confidence: Confidence needed to skip the LLM (defaults to the setting)
+
+    Returns:
+        Counts of evaluated expenses, how many were answered locally, how
+        many of those were correct, and the resulting accuracy and LLM-call savings
+    """
+    if min_confidence is None:
+        min_confidence = settings.LOCAL_CATEGORIZER_MIN_CONFIDENCE
+
+    split = len(rows) - max(1, int(len(rows) * holdout)) if rows else 0
+    model = train_model(rows[:split])
+    if not model.is_trained:
+        model = None
+
+    evaluated = answered = correct = 0
+    for description, category in rows[split:]:
+        expected = CATEGORY_LABELS[ExpenseCategory(category)]
+        prediction = predict(description, model)
+
+        evaluated += 1
+        if prediction is not None and prediction[1] >= min_confidence:
+            answered += 1
+            correct += prediction[0] == expected
+
+    return {
+        "evaluated": evaluated,
+        "answered_locally": answered,
+        "correct": correct,
+        "accuracy": correct / answered if answered else None,
+        "llm_calls_saved": answered / evaluated if evaluated else 0.0,
+    }
+
+
+local_categorizer = LocalCategorizer()
+
+
+def main() -> None:
+    """
+    Report local categorizer accuracy and LLM-call savings per household.
+
+    Usage: python -m app.services.local_categorizer [--holdout 0.2] [--min-confidence 0.8]
+    """
+    import argparse
+    import json
+
+    from app.core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--min-confidence", type=float, default=None)
+    parser.add_argument("--household", type=uuid.UUID, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Expense.household_id, Expense.description, Expense.category).filter(
+            Expense.category != ExpenseCategory.OTHER
+        )
+        if args.household is not None:
+            query = query.filter(Expense.household_id == args.household)
+
+        rows_by_household: Dict[uuid.UUID, List[Tuple[str, ExpenseCategory]]] = defaultdict(list)
+        for household_id, description, category in query.order_by(Expense.created_at):
+            rows_by_household[household_id].append((description, category))
+    finally:
+        db.close()
+
+    totals = Counter()
+    for household_id, rows in rows_by_household.items():
+        report = evaluate(rows, args.holdout, args.min_confidence)
+        totals.update({key: report[key] for key in ("evaluated", "answered_locally", "correct")})
+        print(json.dumps({"household_id": str(household_id), **report}))
+
+    print(json.dumps({
+        "household_id": "all",
+        **totals,
+        "accuracy": totals["correct"] / totals["answered_locally"] if totals["answered_locally"] else None,
+        "llm_calls_saved": totals["answered_locally"] / totals["evaluated"] if totals["evaluated"] else 0.0,
+    }))
+
+
+if __name__ == "__main__":
+    main()
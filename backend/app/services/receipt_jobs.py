@@ -0,0 +1,647 @@
+"""
+Background receipt OCR jobs.
+
+Receipt OCR takes 5-30 seconds, so clients can submit a receipt, get a job
+ID straight away and poll for the result (or receive it on a webhook) while
+a pool of worker tasks does the work. Two queue backends are available:
+
+- "database": durable. Workers poll the receipt_jobs table and claim jobs
+  with a conditional update, so several app processes can share the queue
+  and jobs survive restarts. Submissions and retries wake the process's
+  workers directly, so polls back off while the queue is empty and an
+  idle database can still suspend.
+- "memory": an asyncio queue inside the process, for tests and development.
+
+Workers run on the serving process's event loop, so every database call
+they make goes through ``asyncio.to_thread``: a slow database then delays
+jobs, not the requests being served alongside them.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import random
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, utc_now
+from app.core.logging import get_logger
+from app.core.metrics import RECEIPT_JOBS_TOTAL
+from app.models.receipt import ReceiptJob, ReceiptJobStatus
+from app.services.ai_service import AIService, get_ai_service
+from app.services.receipt_processing import ReceiptImageError
+from app.services.receipt_scanning import scan_receipt
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Upper bound for the retry backoff
+_MAX_RETRY_DELAY_SECONDS = 300
+
+# Due jobs fetched per poll when looking for one to claim
+_CLAIM_BATCH = 5
+
+# Empty polls after which the poll interval stops doubling
+_MAX_IDLE_POLLS = 16
+
+
+class WebhookURLError(ValueError):
+    """Raised when a webhook URL points somewhere the server must not call."""
+
+
+def _is_public_address(address: str) -> bool:
+    """Whether an IP address is routable on the public internet."""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def validate_webhook_url(url: str) -> str:
+    """
+    Check that a webhook URL is safe for the server to POST to.
+
+    The host must be in RECEIPT_WEBHOOK_ALLOWED_HOSTS when that is set, and
+    every address it resolves to must be public, so webhooks can't reach
+    loopback, link-local (cloud metadata), private or reserved addresses.
+    Called on submission and again before delivery, as DNS may have changed.
+
+    Args:
+        url: Webhook URL given by the client
+
+    Returns:
+        One of the checked addresses. Delivery connects to it rather than
+        resolving the host again, which a rebinding DNS server could answer
+        with an internal address
+
+    Raises:
+        WebhookURLError: If the URL must not be called
+    """
+    parts = urlsplit(url)
+    schemes = ("https", "http") if settings.is_development else ("https",)
+    if parts.scheme not in schemes:
+        raise WebhookURLError("Webhook URL must use https")
+
+    try:
+        host, port = parts.hostname, parts.port
+    except ValueError:
+        raise WebhookURLError("Webhook URL is invalid")
+    if not host:
+        raise WebhookURLError("Webhook URL is invalid")
+
+    allowed_hosts = [allowed.lower() for allowed in settings.RECEIPT_WEBHOOK_ALLOWED_HOSTS]
+    if allowed_hosts and host.lower() not in allowed_hosts:
+        raise WebhookURLError("Webhook host is not allowed")
+
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(
+            host, port or (443 if parts.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except (socket.gaierror, UnicodeError):
+        raise WebhookURLError("Webhook host could not be resolved")
+    if not addresses or not all(_is_public_address(address[4][0]) for address in addresses):
+        raise WebhookURLError("Webhook URL must resolve to a public address")
+    return addresses[0][4][0]
+
+
+def pinned_webhook_request(url: str, address: str) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    """
+    Point a webhook request at an already checked address.
+
+    The URL's host is replaced by the address, and the original host is sent
+    in the Host header and as the TLS server name, so virtual hosting and
+    certificate verification work as if the host had been resolved.
+
+    Args:
+        url: Webhook URL given by the client
+        address: Address returned by validate_webhook_url
+
+    Returns:
+        URL to request, extra headers and httpx request extensions
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    netloc = f"[{ip}]" if ip.version == 6 else str(ip)
+    if parts.port is not None:
+        netloc = f"{netloc}:{parts.port}"
+    host_header = f"[{host}]" if ":" in host else host
+    if parts.port is not None:
+        host_header = f"{host_header}:{parts.port}"
+    pinned = urlunsplit((parts.scheme, netloc, parts.path, parts.query, ""))
+    return pinned, {"Host": host_header}, {"sni_hostname": host}
+
+
+def submit_receipt_job(
+    db: Session,
+    image_data: bytes,
+    user_id: uuid.UUID,
+    household_id: Optional[uuid.UUID] = None,
+    webhook_url: Optional[str] = None,
+) -> ReceiptJob:
+    """
+    Persist a receipt OCR job.
+
+    Args:
+        db: Database session (committed by this call)
+        image_data: Uploaded receipt image
+        user_id: User submitting the receipt
+        household_id: Household to deduplicate the receipt against, if any
+        webhook_url: URL to POST the outcome to, if any
+
+    Returns:
+        The pending job
+    """
+    job = ReceiptJob(
+        household_id=household_id,
+        submitted_by=user_id,
+        status=ReceiptJobStatus.PENDING,
+        attempts=0,
+        next_attempt_at=utc_now(),
+        image_data=image_data,
+        webhook_url=webhook_url,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    RECEIPT_JOBS_TOTAL.labels(status="submitted").inc()
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff with jitter for a job that has failed ``attempts`` times.
+
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    delay = settings.RECEIPT_JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return min(delay, _MAX_RETRY_DELAY_SECONDS) * random.uniform(0.8, 1.2)
+
+
+def sign_webhook(body: bytes) -> str:
+    """
+    HMAC-SHA256 signature of a webhook body, keyed with RECEIPT_WEBHOOK_SECRET.
+
+    The key is shared with webhook receivers so they can verify deliveries,
+    which is why it is not SECRET_KEY: that one signs access tokens.
+    """
+    return hmac.new(settings.RECEIPT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+class ReceiptJobQueue(ABC):
+    """
+    Abstract worker pool processing receipt jobs.
+
+    Subclasses implement ``notify`` and ``_run_worker`` to decide how
+    workers find jobs; claiming, processing, retries and webhooks are shared.
+    """
+
+    backend: str = "base"
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        ai_service_factory: Callable[[], AIService] = get_ai_service,
+    ):
+        """
+        Create a queue.
+
+        Args:
+            workers: Number of concurrent worker tasks (defaults to RECEIPT_JOB_WORKERS)
+            session_factory: Creates the database sessions workers use
+            ai_service_factory: Returns the AI service used for OCR
+        """
+        self.workers = workers if workers is not None else settings.RECEIPT_JOB_WORKERS
+        self.session_factory = session_factory
+        self.ai_service_factory = ai_service_factory
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run_worker()) for _ in range(self.workers)]
+        logger.info("Receipt job workers started", backend=self.backend, workers=self.workers)
+
+    async def stop(self) -> None:
+        """Stop the worker tasks; jobs being processed are retried later."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @abstractmethod
+    def notify(self, job_id: uuid.UUID) -> None:
+        """Tell the workers a job has been submitted."""
+        pass
+
+    @abstractmethod
+    async def _run_worker(self) -> None:
+        """Process jobs until cancelled."""
+        pass
+
+    def _schedule_retry(self, job_id: uuid.UUID, delay: float) -> None:
+        """Arrange for a job to be picked up again after ``delay`` seconds."""
+        return None
+
+    def claim(self, db: Session, job_id: uuid.UUID) -> bool:
+        """
+        Mark a due pending job as processing.
+
+        The conditional update succeeds for exactly one worker, even across
+        processes. Jobs that have used up RECEIPT_JOB_MAX_ATTEMPTS are never
+        claimed again.
+
+        Returns:
+            True if this worker now owns the job
+        """
+        now = utc_now()
+        claimed = (
+            db.query(ReceiptJob)
+            .filter(
+                ReceiptJob.id == job_id,
+                ReceiptJob.status == ReceiptJobStatus.PENDING,
+                ReceiptJob.next_attempt_at <= now,
+                ReceiptJob.attempts < settings.RECEIPT_JOB_MAX_ATTEMPTS,
+            )
+            .update(
+                {
+                    ReceiptJob.status: ReceiptJobStatus.PROCESSING,
+                    ReceiptJob.attempts: ReceiptJob.attempts + 1,
+                    ReceiptJob.locked_at: now,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return claimed == 1
+
+    async def process(self, db: Session, job_id: uuid.UUID) -> None:
+        """
+        Run OCR for a claimed job and record the outcome.
+
+        Unreadable images fail immediately. Other failures are retried with
+        exponential backoff until RECEIPT_JOB_MAX_ATTEMPTS is reached.
+        """
+        job = await asyncio.to_thread(db.get, ReceiptJob, job_id)
+        if job is None or job.status != ReceiptJobStatus.PROCESSING:
+            return
+        # Read now: commits made while scanning expire the job's attributes
+        attempts = job.attempts
+
+        result, error, retryable = None, None, True
+        try:
+            result = await scan_receipt(
+                self.ai_service_factory(),
+                db,
+                job.image_data,
+                household_id=job.household_id,
+                user_id=job.submitted_by,
+            )
+            if not result.get("success"):
+                error = result.get("error") or "Receipt could not be read"
+        except ReceiptImageError as e:
+            error, retryable = str(e), False
+        except Exception as e:
+            logger.warning("Receipt job attempt failed", job_id=str(job.id), error=str(e))
+            error = str(e)
+
+        if error is not None and retryable and attempts < settings.RECEIPT_JOB_MAX_ATTEMPTS:
+            delay = retry_delay(attempts)
+            await asyncio.to_thread(self._retry_later, db, job, error, delay)
+            RECEIPT_JOBS_TOTAL.labels(status="retried").inc()
+            self._schedule_retry(job_id, delay)
+            return
+
+        await asyncio.to_thread(self._finish, db, job, result, error)
+        RECEIPT_JOBS_TOTAL.labels(status=job.status.value).inc()
+
+        if job.webhook_url:
+            await self._send_webhook(job)
+
+    def _retry_later(self, db: Session, job: ReceiptJob, error: str, delay: float) -> None:
+        """Return a failed attempt's job to the queue for ``delay`` seconds."""
+        job.status = ReceiptJobStatus.PENDING
+        job.next_attempt_at = utc_now() + timedelta(seconds=delay)
+        job.locked_at = None
+        job.error = error
+        db.commit()
+
+    def _finish(
+        self, db: Session, job: ReceiptJob, result: Optional[dict], error: Optional[str]
+    ) -> None:
+        """Record a job's final outcome, leaving it loaded for the webhook."""
+        job.status = ReceiptJobStatus.FAILED if error is not None else ReceiptJobStatus.COMPLETED
+        job.result = jsonable_encoder(result) if result is not None else None
+        job.error = error
+        job.image_data = None
+        job.locked_at = None
+        job.completed_at = utc_now()
+        db.commit()
+        db.refresh(job)
+
+    async def _claim_and_process(self, job_id: uuid.UUID) -> bool:
+        """Claim and process one job in its own session."""
+        db = self.session_factory()
+        try:
+            if not await asyncio.to_thread(self.claim, db, job_id):
+                return False
+            await self.process(db, job_id)
+            return True
+        except Exception as e:
+            logger.error("Receipt job processing failed", job_id=str(job_id), error=str(e))
+            await asyncio.to_thread(db.rollback)
+            return False
+        finally:
+            await asyncio.to_thread(db.close)
+
+    async def _send_webhook(self, job: ReceiptJob) -> None:
+        """POST the job outcome to its webhook; failures are only logged."""
+        try:
+            address = await validate_webhook_url(job.webhook_url)
+        except WebhookURLError as e:
+            logger.warning("Receipt job webhook refused", job_id=str(job.id), error=str(e))
+            return
+
+        body = json.dumps(jsonable_encoder({
+            "job_id": job.id,
+            "status": job.status.value,
+            "result": job.result,
+            "error": job.error,
+        })).encode()
+        url, headers, extensions = pinned_webhook_request(job.webhook_url, address)
+        headers["Content-Type"] = "application/json"
+        if settings.RECEIPT_WEBHOOK_SECRET:
+            headers["X-Flatmates-Signature"] = sign_webhook(body)
+        try:
+            # Redirects aren't followed: their targets haven't been checked
+            async with httpx.AsyncClient(timeout=10.0, follow_redirects=False) as client:
+                response = await client.post(url, content=body, headers=headers, extensions=extensions)
+                response.raise_for_status()
+        except Exception as e:
+            logger.warning("Receipt job webhook failed", job_id=str(job.id), error=str(e))
+
+
+class InProcessReceiptJobQueue(ReceiptJobQueue):
+    """Jobs handed to workers through an asyncio queue; not durable."""
+
+    backend = "memory"
+
+    def __init__(self, *args, **kwargs):
+        """Create the queue; see ReceiptJobQueue."""
+        super().__init__(*args, **kwargs)
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        """Create the asyncio queue and start the workers."""
+        self._queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        await super().start()
+
+    def notify(self, job_id: uuid.UUID) -> None:
+        """Queue a submitted job."""
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    def _schedule_retry(self, job_id: uuid.UUID, delay: float) -> None:
+        """Re-queue a job once its backoff has elapsed."""
+        if self._loop is not None:
+            self._loop.call_later(delay, self.notify, job_id)
+
+    async def _run_worker(self) -> None:
+        """Process queued jobs until cancelled."""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._claim_and_process(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued job has been processed."""
+        await self._queue.join()
+
+
+class DatabaseReceiptJobQueue(ReceiptJobQueue):
+    """Workers poll the receipt_jobs table for due jobs."""
+
+    backend = "database"
+
+    def __init__(self, *args, **kwargs):
+        """Create the queue; see ReceiptJobQueue."""
+        super().__init__(*args, **kwargs)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        """Start the pollers, and one task returning stale jobs to the queue."""
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        await super().start()
+        self._tasks.append(self._loop.create_task(self._run_requeuer()))
+
+    def notify(self, job_id: uuid.UUID) -> None:
+        """Wake the pollers instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule_retry(self, job_id: uuid.UUID, delay: float) -> None:
+        """Wake the pollers once a job's backoff has elapsed."""
+        if self._loop is not None:
+            self._loop.call_later(delay, self.notify, job_id)
+
+    def fail_exhausted(self, db: Session) -> List[ReceiptJob]:
+        """
+        Fail jobs that can't be claimed again because they used up RECEIPT_JOB_MAX_ATTEMPTS.
+
+        These are jobs whose worker died mid-processing on their last attempt,
+        such as a receipt that crashes every worker that opens it, and
+        pending jobs left over after RECEIPT_JOB_MAX_ATTEMPTS was lowered.
+
+        Returns:
+            The failed jobs, loaded for their webhooks
+        """
+        cutoff = utc_now() - timedelta(seconds=settings.RECEIPT_JOB_LEASE_SECONDS)
+        jobs = (
+            db.query(ReceiptJob)
+            .filter(
+                or_(
+                    and_(
+                        ReceiptJob.status == ReceiptJobStatus.PROCESSING,
+                        ReceiptJob.locked_at < cutoff,
+                    ),
+                    ReceiptJob.status == ReceiptJobStatus.PENDING,
+                ),
+                ReceiptJob.attempts >= settings.RECEIPT_JOB_MAX_ATTEMPTS,
+            )
+            .all()
+        )
+        for job in jobs:
+            if job.status == ReceiptJobStatus.PROCESSING:
+                job.error = "Receipt processing stopped before finishing"
+            job.status = ReceiptJobStatus.FAILED
+            job.image_data = None
+            job.locked_at = None
+            job.completed_at = utc_now()
+        db.commit()
+        for job in jobs:
+            db.refresh(job)
+        return jobs
+
+    def requeue_stale(self, db: Session) -> int:
+        """
+        Return jobs whose worker died mid-processing to the queue.
+
+        Jobs on their last attempt are left to fail_exhausted.
+
+        Returns:
+            Number of jobs requeued
+        """
+        cutoff = utc_now() - timedelta(seconds=settings.RECEIPT_JOB_LEASE_SECONDS)
+        requeued = (
+            db.query(ReceiptJob)
+            .filter(
+                ReceiptJob.status == ReceiptJobStatus.PROCESSING,
+                ReceiptJob.locked_at < cutoff,
+                ReceiptJob.attempts < settings.RECEIPT_JOB_MAX_ATTEMPTS,
+            )
+            .update(
+                {ReceiptJob.status: ReceiptJobStatus.PENDING, ReceiptJob.locked_at: None},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return requeued
+
+    def due_job_ids(self, db: Session) -> List[uuid.UUID]:
+        """IDs of the oldest pending jobs that are due."""
+        rows = (
+            db.query(ReceiptJob.id)
+            .filter(
+                ReceiptJob.status == ReceiptJobStatus.PENDING,
+                ReceiptJob.next_attempt_at <= utc_now(),
+                ReceiptJob.attempts < settings.RECEIPT_JOB_MAX_ATTEMPTS,
+            )
+            .order_by(ReceiptJob.next_attempt_at)
+            .limit(_CLAIM_BATCH)
+            .all()
+        )
+        return [row.id for row in rows]
+
+    def poll_interval(self, idle_polls: int) -> float:
+        """
+        Seconds to wait after ``idle_polls`` polls in a row found nothing.
+
+        Starts at RECEIPT_JOB_POLL_SECONDS and doubles up to RECEIPT_JOB_MAX_POLL_SECONDS.
+        """
+        delay = settings.RECEIPT_JOB_POLL_SECONDS * 2 ** min(idle_polls, _MAX_IDLE_POLLS)
+        return min(delay, settings.RECEIPT_JOB_MAX_POLL_SECONDS)
+
+    def _in_session(self, work: Callable[[Session], T]) -> T:
+        """Run ``work`` in a new session, closing it afterwards; called in a thread."""
+        db = self.session_factory()
+        try:
+            return work(db)
+        finally:
+            db.close()
+
+    async def _run_requeuer(self) -> None:
+        """Requeue or fail stale jobs at startup and every RECEIPT_JOB_REQUEUE_SECONDS until cancelled."""
+        while True:
+            try:
+                # Failed last, as the requeue's commit would expire the failed jobs
+                requeued, failed = await asyncio.to_thread(
+                    self._in_session, lambda db: (self.requeue_stale(db), self.fail_exhausted(db))
+                )
+            except Exception as e:
+                logger.warning("Receipt job requeue failed", error=str(e))
+                requeued, failed = 0, []
+            if requeued:
+                self._wakeup.set()
+            for job in failed:
+                logger.warning("Receipt job abandoned", job_id=str(job.id), attempts=job.attempts)
+                RECEIPT_JOBS_TOTAL.labels(status=job.status.value).inc()
+                if job.webhook_url:
+                    await self._send_webhook(job)
+            await asyncio.sleep(settings.RECEIPT_JOB_REQUEUE_SECONDS)
+
+    async def _run_worker(self) -> None:
+        """Poll for due jobs until cancelled, backing off while there are none."""
+        idle_polls = 0
+        while True:
+            # Cleared before polling so a job submitted mid-poll still wakes us
+            self._wakeup.clear()
+            processed = False
+            try:
+                job_ids = await asyncio.to_thread(self._in_session, self.due_job_ids)
+            except Exception as e:
+                logger.warning("Receipt job poll failed", error=str(e))
+                job_ids = []
+
+            for job_id in job_ids:
+                if await self._claim_and_process(job_id):
+                    processed = True
+                    break
+
+            if processed:
+                idle_polls = 0
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval(idle_polls))
+                idle_polls = 0
+            except asyncio.TimeoutError:
+                idle_polls += 1
+
+
+_QUEUE_BACKENDS = {
+    "memory": InProcessReceiptJobQueue,
+    "database": DatabaseReceiptJobQueue,
+}
+
+_job_queue: Optional[ReceiptJobQueue] = None
+
+
+def get_receipt_job_queue() -> Optional[ReceiptJobQueue]:
+    """
+    Get this process's receipt job queue.
+
+    Returns:
+        The running queue, or None if workers are disabled in this process
+    """
+    return _job_queue
+
+
+async def start_receipt_job_queue() -> None:
+    """Start the configured receipt job queue (called on startup)."""
+    global _job_queue
+    if settings.RECEIPT_JOB_WORKERS <= 0:
+        return
+    queue_class = _QUEUE_BACKENDS.get(settings.RECEIPT_JOB_BACKEND.lower())
+    if queue_class is None:
+        raise ValueError(f"Unknown RECEIPT_JOB_BACKEND: {settings.RECEIPT_JOB_BACKEND}")
+    _job_queue = queue_class()
+    await _job_queue.start()
+
+
+async def stop_receipt_job_queue() -> None:
+    """Stop the receipt job queue (called on shutdown)."""
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.stop()
+        _job_queue = None
@@ -0,0 +1,251 @@
+"""
+Receipt image preprocessing before OCR.
+
+Phone photos of receipts are typically 3-12 MB. OCR only needs a legible
+grayscale image of the receipt itself, so images are auto-rotated, cropped to
+the paper, converted to grayscale, downsized and re-encoded as a small JPEG
+without EXIF before being sent to the AI provider. The work is CPU-bound and
+runs in a process pool so it never blocks the event loop.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import RECEIPT_IMAGE_BYTES, RECEIPT_PREPROCESS_DURATION_SECONDS
+
+logger = get_logger(__name__)
+
+# Side of the thumbnail used to locate the receipt
+_CROP_ANALYSIS_SIZE = 256
+
+# Only crop when the detected paper covers this share of the photo; outside
+# this range the detection is more likely wrong than helpful
+_MIN_CROP_AREA = 0.15
+_MAX_CROP_AREA = 0.9
+
+# Margin kept around the detected receipt, as a share of its size
+_CROP_MARGIN = 0.02
+
+# Side of the difference hash grid; 16 gives 256 bits, enough to tell apart
+# receipts that are mostly white paper
+_HASH_SIZE = 16
+
+
+class ReceiptImageError(ValueError):
+    """Raised when uploaded bytes cannot be decoded as an image."""
+
+
+def _percentile(histogram, fraction: float) -> int:
+    """Return the pixel value below which ``fraction`` of pixels fall."""
+    target = sum(histogram) * fraction
+    running = 0
+    for value, count in enumerate(histogram):
+        running += count
+        if running >= target:
+            return value
+    return len(histogram) - 1
+
+
+def find_receipt_bounds(image: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Locate the receipt paper in a grayscale photo.
+
+    Receipts are light paper on a darker background, so the bounding box of
+    bright pixels in a denoised thumbnail approximates the receipt.
+
+    Args:
+        image: Grayscale ("L") image
+
+    Returns:
+        (left, upper, right, lower) in image coordinates, or None if no
+        plausible receipt was found
+    """
+    small = image.copy()
+    small.thumbnail((_CROP_ANALYSIS_SIZE, _CROP_ANALYSIS_SIZE))
+    small = small.filter(ImageFilter.MedianFilter(5))
+
+    histogram = small.histogram()
+    dark, light = _percentile(histogram, 0.1), _percentile(histogram, 0.9)
+    if light - dark < 40:
+        return None
+
+    threshold = (dark + light) // 2
+    bounds = small.point(lambda value: 255 if value > threshold else 0).getbbox()
+    if bounds is None:
+        return None
+
+    left, upper, right, lower = bounds
+    area = (right - left) * (lower - upper) / (small.width * small.height)
+    if not _MIN_CROP_AREA <= area <= _MAX_CROP_AREA:
+        return None
+
+    scale_x, scale_y = image.width / small.width, image.height / small.height
+    margin_x = (right - left) * scale_x * _CROP_MARGIN
+    margin_y = (lower - upper) * scale_y * _CROP_MARGIN
+    return (
+        max(0, int(left * scale_x - margin_x)),
+        max(0, int(upper * scale_y - margin_y)),
+        min(image.width, int(right * scale_x + margin_x)),
+        min(image.height, int(lower * scale_y + margin_y)),
+    )
+
+
+def preprocess_receipt_image(
+    image_data: bytes,
+    max_dimension: Optional[int] = None,
+    jpeg_quality: Optional[int] = None,
+) -> bytes:
+    """
+    Prepare a receipt photo for OCR.
+
+    Applies the EXIF orientation, converts to grayscale, crops to the
+    receipt, downsizes so the longest side is at most ``max_dimension`` and
+    re-encodes as JPEG. EXIF and other metadata are not carried over.
+
+    Args:
+        image_data: Uploaded image bytes in any format Pillow can read
+        max_dimension: Longest side of the output (defaults to RECEIPT_MAX_DIMENSION)
+        jpeg_quality: JPEG quality (defaults to RECEIPT_JPEG_QUALITY)
+
+    Returns:
+        JPEG bytes
+
+    Raises:
+        ReceiptImageError: If the bytes are not a readable image
+    """
+    max_dimension = max_dimension or settings.RECEIPT_MAX_DIMENSION
+    jpeg_quality = jpeg_quality or settings.RECEIPT_JPEG_QUALITY
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        # Decode at a reduced size straight away when the format allows it
+        image.draft("L", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("L")
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ReceiptImageError(f"Could not read image: {e}") from e
+
+    bounds = find_receipt_bounds(image)
+    if bounds is not None:
+        image = image.crop(bounds)
+
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    image = ImageOps.autocontrast(image, cutoff=1)
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+    return output.getvalue()
+
+
+def receipt_dhash(image_data: bytes) -> str:
+    """
+    Compute a 256-bit difference hash of a receipt image.
+
+    Near-identical images (another photo of the same receipt, a re-upload
+    at a different quality) differ in only a few bits.
+
+    Args:
+        image_data: Image bytes, ideally already preprocessed
+
+    Returns:
+        Hash as 64 hex digits
+
+    Raises:
+        ReceiptImageError: If the bytes are not a readable image
+    """
+    size = _HASH_SIZE
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        image.draft("L", (size * 8, size * 8))
+        small = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ReceiptImageError(f"Could not read image: {e}") from e
+
+    pixels = small.tobytes()
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            offset = row * (size + 1) + col
+            value = (value << 1) | (pixels[offset] > pixels[offset + 1])
+    return f"{value:0{size * size // 4}x}"
+
+
+def hamming_distance(first: str, second: str) -> int:
+    """Number of differing bits between two hex-encoded hashes."""
+    return (int(first, 16) ^ int(second, 16)).bit_count()
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the shared process pool, or None when preprocessing runs in threads.
+
+    Workers are started from a fork server (or spawned where there is none)
+    rather than forked from the app: by the time the pool is first used the
+    app runs several threads, and a child forked while one of them holds a
+    lock would deadlock on it.
+    """
+    global _executor
+    if settings.RECEIPT_PREPROCESS_WORKERS <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.RECEIPT_PREPROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context(method),
+                )
+    return _executor
+
+
+async def preprocess_receipt(image_data: bytes) -> Tuple[bytes, str]:
+    """
+    Preprocess a receipt off the event loop.
+
+    Args:
+        image_data: Uploaded image bytes
+
+    Returns:
+        (processed image bytes, MIME type)
+
+    Raises:
+        ReceiptImageError: If the bytes are not a readable image
+    """
+    started = time.perf_counter()
+    executor = _get_executor()
+    if executor is not None:
+        loop = asyncio.get_running_loop()
+        processed = await loop.run_in_executor(executor, preprocess_receipt_image, image_data)
+    else:
+        processed = await asyncio.to_thread(preprocess_receipt_image, image_data)
+
+    RECEIPT_PREPROCESS_DURATION_SECONDS.observe(time.perf_counter() - started)
+    RECEIPT_IMAGE_BYTES.labels(stage="original").observe(len(image_data))
+    RECEIPT_IMAGE_BYTES.labels(stage="processed").observe(len(processed))
+    logger.debug(
+        "Receipt preprocessed",
+        original_bytes=len(image_data),
+        processed_bytes=len(processed),
+    )
+    return processed, "image/jpeg"
+
+
+def shutdown_receipt_executor() -> None:
+    """Stop the preprocessing process pool (called on shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
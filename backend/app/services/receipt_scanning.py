@@ -0,0 +1,253 @@
+"""
+Receipt scanning with per-household deduplication.
+
+Every successfully extracted receipt is indexed by a SHA-256 of the uploaded
+file and a perceptual hash of its preprocessed image. Uploading the exact
+same file again reuses the stored extraction without calling the AI. A scan
+whose perceptual hash is within a few bits of an indexed one is only a
+probable duplicate, since white receipts with different text can hash
+alike: it is still extracted, and reported as a duplicate when its total
+and merchant or date agree with the earlier scan. Expenses that look like
+they were already entered from the receipt are flagged either way.
+"""
+
+import asyncio
+import hashlib
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import utc_now
+from app.core.logging import get_logger
+from app.core.metrics import RECEIPT_DEDUP_TOTAL
+from app.models.expense import Expense
+from app.models.receipt import ReceiptScan
+from app.services.receipt_processing import hamming_distance, preprocess_receipt, receipt_dhash
+
+logger = get_logger(__name__)
+
+# Most recent scans compared against when looking for a near-duplicate
+_MAX_CANDIDATES = 500
+
+# How far apart an expense's date may be from the receipt's to be flagged
+_DUPLICATE_EXPENSE_DAYS = 1
+
+
+def find_exact_scan(
+    db: Session, household_id: uuid.UUID, content_hash: str
+) -> Optional[ReceiptScan]:
+    """
+    Find a recent scan of the same file in a household.
+
+    Args:
+        db: Database session
+        household_id: ID of the household
+        content_hash: SHA-256 of the uploaded file
+
+    Returns:
+        The newest scan within RECEIPT_DEDUP_WINDOW_DAYS, or None
+    """
+    since = utc_now() - timedelta(days=settings.RECEIPT_DEDUP_WINDOW_DAYS)
+    return (
+        db.query(ReceiptScan)
+        .filter(
+            ReceiptScan.household_id == household_id,
+            ReceiptScan.content_hash == content_hash,
+            ReceiptScan.created_at >= since,
+        )
+        .order_by(ReceiptScan.created_at.desc())
+        .first()
+    )
+
+
+def find_similar_scan(
+    db: Session, household_id: uuid.UUID, image_hash: str
+) -> Optional[ReceiptScan]:
+    """
+    Find the closest recent scan that looks like the same receipt in a household.
+
+    Args:
+        db: Database session
+        household_id: ID of the household
+        image_hash: Hash of the new scan
+
+    Returns:
+        The most similar scan within RECEIPT_DEDUP_MAX_DISTANCE bits, or None
+    """
+    since = utc_now() - timedelta(days=settings.RECEIPT_DEDUP_WINDOW_DAYS)
+    candidates = (
+        db.query(ReceiptScan.id, ReceiptScan.image_hash)
+        .filter(ReceiptScan.household_id == household_id, ReceiptScan.created_at >= since)
+        .order_by(ReceiptScan.created_at.desc())
+        .limit(_MAX_CANDIDATES)
+        .all()
+    )
+
+    best_id, best_distance = None, settings.RECEIPT_DEDUP_MAX_DISTANCE + 1
+    for scan_id, candidate_hash in candidates:
+        distance = hamming_distance(image_hash, candidate_hash)
+        if distance < best_distance:
+            best_id, best_distance = scan_id, distance
+
+    if best_id is None:
+        return None
+    return db.query(ReceiptScan).filter(ReceiptScan.id == best_id).first()
+
+
+def _total(extraction: Dict[str, Any]) -> Optional[Decimal]:
+    """Receipt total rounded to cents, or None if it couldn't be read."""
+    try:
+        return Decimal(str(extraction.get("total"))).quantize(Decimal("0.01"))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def same_receipt(first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+    """
+    Whether two extractions describe the same receipt.
+
+    The totals must match, along with the merchant or the date.
+
+    Args:
+        first: Receipt data returned by the AI
+        second: Receipt data returned by the AI for another scan
+
+    Returns:
+        True if the extractions agree
+    """
+    total = _total(first)
+    if total is None or total != _total(second):
+        return False
+    merchant = str(first.get("merchant") or "").strip().lower()
+    if merchant and merchant == str(second.get("merchant") or "").strip().lower():
+        return True
+    return first.get("date") is not None and first.get("date") == second.get("date")
+
+
+def find_possible_duplicate_expenses(
+    db: Session, household_id: uuid.UUID, extraction: Dict[str, Any]
+) -> List[Expense]:
+    """
+    Find expenses that were probably already entered from this receipt.
+
+    Matches on the receipt total and, when it could be read, the receipt date.
+
+    Args:
+        db: Database session
+        household_id: ID of the household
+        extraction: Receipt data returned by the AI
+
+    Returns:
+        Up to five matching expenses, newest first
+    """
+    total = _total(extraction)
+    if total is None:
+        return []
+
+    try:
+        receipt_date = datetime.strptime(str(extraction.get("date")), "%Y-%m-%d")
+        window = timedelta(days=_DUPLICATE_EXPENSE_DAYS)
+        start, end = receipt_date - window, receipt_date + timedelta(days=1) + window
+    except ValueError:
+        start, end = utc_now() - timedelta(days=settings.RECEIPT_DEDUP_WINDOW_DAYS), None
+
+    query = db.query(Expense).filter(
+        Expense.household_id == household_id,
+        Expense.amount == total,
+        Expense.date >= start,
+    )
+    if end is not None:
+        query = query.filter(Expense.date < end)
+    return query.order_by(Expense.date.desc()).limit(5).all()
+
+
+async def scan_receipt(
+    ai_service,
+    db: Session,
+    image_data: bytes,
+    household_id: Optional[uuid.UUID] = None,
+    user_id: Optional[uuid.UUID] = None,
+) -> Dict[str, Any]:
+    """
+    Preprocess a receipt, deduplicate it within the household and extract its data.
+
+    Args:
+        ai_service: AI service used for OCR
+        db: Database session
+        image_data: Uploaded image bytes
+        household_id: Household to deduplicate against; without one the
+            receipt is always sent to the AI and not indexed
+        user_id: User who scanned the receipt
+
+    Returns:
+        Extracted receipt data. For household scans this also carries
+        "scan_id", "duplicate_of" (the earlier scan of the same file, or of a
+        similar-looking receipt with the same details, if any) and
+        "possible_duplicate_expenses" (IDs of expenses that match the receipt)
+
+    Raises:
+        ReceiptImageError: If the bytes are not a readable image
+    """
+    if household_id is None:
+        processed, mime_type = await preprocess_receipt(image_data)
+        return await ai_service.extract_receipt_data(processed, mime_type, preprocess=False)
+
+    # Database work runs in a thread, so a slow database doesn't stall the
+    # event loop of the process serving requests
+    content_hash = hashlib.sha256(image_data).hexdigest()
+    exact = await asyncio.to_thread(find_exact_scan, db, household_id, content_hash)
+    if exact is not None:
+        RECEIPT_DEDUP_TOTAL.labels(result="hit").inc()
+        logger.info("Duplicate receipt upload", household_id=str(household_id), scan_id=str(exact.id))
+        result = {**exact.result, "scan_id": exact.id, "duplicate_of": _duplicate_info(exact)}
+    else:
+        processed, mime_type = await preprocess_receipt(image_data)
+        image_hash = await asyncio.to_thread(receipt_dhash, processed)
+        similar = await asyncio.to_thread(find_similar_scan, db, household_id, image_hash)
+
+        result = await ai_service.extract_receipt_data(processed, mime_type, preprocess=False)
+        if result.get("success") and similar is not None and same_receipt(result, similar.result):
+            RECEIPT_DEDUP_TOTAL.labels(result="similar").inc()
+            logger.info("Duplicate receipt scan", household_id=str(household_id), scan_id=str(similar.id))
+            result = {**result, "scan_id": similar.id, "duplicate_of": _duplicate_info(similar)}
+        elif result.get("success"):
+            RECEIPT_DEDUP_TOTAL.labels(result="miss").inc()
+            scan_id = await asyncio.to_thread(
+                _save_scan, db, household_id, user_id, image_hash, content_hash, result
+            )
+            result = {**result, "scan_id": scan_id}
+
+    if result.get("success"):
+        expenses = await asyncio.to_thread(find_possible_duplicate_expenses, db, household_id, result)
+        result["possible_duplicate_expenses"] = [expense.id for expense in expenses]
+    return result
+
+
+def _save_scan(
+    db: Session,
+    household_id: uuid.UUID,
+    user_id: Optional[uuid.UUID],
+    image_hash: str,
+    content_hash: str,
+    result: Dict[str, Any],
+) -> uuid.UUID:
+    """Index a successfully extracted receipt, returning the scan's ID."""
+    scan = ReceiptScan(
+        household_id=household_id,
+        scanned_by=user_id,
+        image_hash=image_hash,
+        content_hash=content_hash,
+        result=result,
+    )
+    db.add(scan)
+    db.commit()
+    return scan.id
+
+
+def _duplicate_info(scan: ReceiptScan) -> Dict[str, Any]:
+    """Describe the earlier scan a receipt was recognised as."""
+    return {"scan_id": scan.id, "scanned_by": scan.scanned_by, "scanned_at": scan.created_at}
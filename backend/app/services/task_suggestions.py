@@ -0,0 +1,223 @@
+"""
+Cached AI task suggestions.
+
+Generating suggestions means loading the household's todos and expenses and
+calling the LLM, yet most views of the suggestions screen happen when
+nothing has changed. Suggestions are stored per household together with a
+fingerprint of the state they were generated from. While the fingerprint
+matches they are served straight from the cache; once it changes the old
+suggestions are still served immediately while fresh ones are generated in
+the background (stale-while-revalidate).
+"""
+
+import asyncio
+import hashlib
+import uuid
+from datetime import timedelta, timezone
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal, utc_now
+from app.core.logging import get_logger
+from app.core.metrics import AI_TASK_SUGGESTIONS_CACHE_TOTAL
+from app.models.ai_cache import TaskSuggestionCacheEntry
+from app.models.expense import Expense
+from app.models.household import Household, HouseholdMember
+from app.models.todo import Todo, TodoStatus
+
+logger = get_logger(__name__)
+
+
+def household_fingerprint(db: Session, household_id: uuid.UUID) -> str:
+    """
+    Summarise the household state that task suggestions depend on.
+
+    Combines the household name, member count and the count and latest
+    update time of its todos and expenses in a single query. Adding,
+    editing or deleting any of them changes the fingerprint.
+
+    Args:
+        db: Database session
+        household_id: ID of the household
+
+    Returns:
+        Hex digest of the household state
+    """
+    def stats(model):
+        where = model.household_id == household_id
+        return (
+            select(func.count()).select_from(model).where(where).scalar_subquery(),
+            select(func.max(model.updated_at)).where(where).scalar_subquery(),
+        )
+
+    row = db.execute(select(
+        select(Household.name).where(Household.id == household_id).scalar_subquery(),
+        select(func.count()).select_from(HouseholdMember)
+        .where(HouseholdMember.household_id == household_id).scalar_subquery(),
+        *stats(Todo),
+        *stats(Expense),
+    )).one()
+    return hashlib.sha256("|".join(str(value) for value in row).encode()).hexdigest()
+
+
+def build_suggestion_context(db: Session, household: Household) -> Dict[str, Any]:
+    """
+    Collect what the AI needs to suggest tasks for a household.
+
+    Args:
+        db: Database session
+        household: The household
+
+    Returns:
+        Keyword arguments for AIService.suggest_tasks
+    """
+    member_count = (
+        db.query(HouseholdMember)
+        .filter(HouseholdMember.household_id == household.id)
+        .count()
+    )
+
+    existing_tasks = (
+        db.query(Todo)
+        .filter(
+            Todo.household_id == household.id,
+            Todo.status != TodoStatus.COMPLETED,
+        )
+        .limit(10)
+        .all()
+    )
+
+    recent_expenses = (
+        db.query(Expense)
+        .filter(Expense.household_id == household.id)
+        .order_by(Expense.created_at.desc())
+        .limit(10)
+        .all()
+    )
+
+    return {
+        "household_context": {
+            "name": household.name,
+            "member_count": member_count,
+        },
+        "existing_tasks": [
+            {
+                "title": t.title,
+                "description": t.description or "",
+                "status": t.status.value if hasattr(t.status, 'value') else str(t.status),
+                "priority": t.priority.value if hasattr(t.priority, 'value') else str(t.priority),
+            }
+            for t in existing_tasks
+        ],
+        "recent_expenses": [
+            {
+                "amount": float(e.amount),
+                "description": e.description,
+                "category": e.category.value if hasattr(e.category, 'value') else str(e.category),
+            }
+            for e in recent_expenses
+        ],
+    }
+
+
+class TaskSuggestionCache:
+    """Per-household task suggestions with stale-while-revalidate refresh."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        """
+        Create the cache.
+
+        Args:
+            session_factory: Creates the sessions used by background refreshes
+        """
+        self.session_factory = session_factory
+        self._refreshing: Set[uuid.UUID] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get_suggestions(
+        self, ai_service, db: Session, household: Household
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get task suggestions for a household, generating them only when needed.
+
+        Suggestions whose fingerprint still matches and that are younger than
+        TASK_SUGGESTIONS_CACHE_TTL_SECONDS are returned as they are. Outdated
+        ones younger than TASK_SUGGESTIONS_MAX_STALE_SECONDS are returned
+        while a background refresh runs. Otherwise the AI is called inline.
+
+        Args:
+            ai_service: AI service used to generate suggestions
+            db: Database session
+            household: Household to suggest tasks for
+
+        Returns:
+            (suggestions, whether they came from the cache)
+        """
+        fingerprint = household_fingerprint(db, household.id)
+        entry = db.get(TaskSuggestionCacheEntry, household.id)
+
+        if entry is not None:
+            created_at = entry.created_at
+            if created_at.tzinfo is not None:
+                created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+            age = utc_now() - created_at
+            if entry.fingerprint == fingerprint and age < timedelta(seconds=settings.TASK_SUGGESTIONS_CACHE_TTL_SECONDS):
+                AI_TASK_SUGGESTIONS_CACHE_TOTAL.labels(result="hit").inc()
+                return entry.suggestions, True
+            if age < timedelta(seconds=settings.TASK_SUGGESTIONS_MAX_STALE_SECONDS):
+                AI_TASK_SUGGESTIONS_CACHE_TOTAL.labels(result="stale").inc()
+                self._refresh_in_background(ai_service, household.id)
+                return entry.suggestions, True
+
+        AI_TASK_SUGGESTIONS_CACHE_TOTAL.labels(result="miss").inc()
+        return await self._generate(ai_service, db, household, fingerprint), False
+
+    async def _generate(
+        self, ai_service, db: Session, household: Household, fingerprint: str
+    ) -> List[Dict[str, Any]]:
+        """Ask the AI for suggestions and store them; failed (empty) answers aren't cached."""
+        suggestions = await ai_service.suggest_tasks(**build_suggestion_context(db, household))
+        if not suggestions:
+            return suggestions
+
+        try:
+            entry = db.get(TaskSuggestionCacheEntry, household.id)
+            if entry is None:
+                entry = TaskSuggestionCacheEntry(household_id=household.id)
+                db.add(entry)
+            entry.fingerprint = fingerprint
+            entry.suggestions = suggestions
+            entry.created_at = utc_now()
+            db.commit()
+        except Exception as e:
+            logger.warning("Task suggestion cache write failed", household_id=str(household.id), error=str(e))
+            db.rollback()
+        return suggestions
+
+    def _refresh_in_background(self, ai_service, household_id: uuid.UUID) -> None:
+        """Regenerate a household's suggestions unless a refresh is already running."""
+        if household_id in self._refreshing:
+            return
+        self._refreshing.add(household_id)
+        task = asyncio.get_running_loop().create_task(self._refresh(ai_service, household_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, ai_service, household_id: uuid.UUID) -> None:
+        """Regenerate suggestions with a session of its own."""
+        db = self.session_factory()
+        try:
+            household = db.get(Household, household_id)
+            if household is not None:
+                await self._generate(ai_service, db, household, household_fingerprint(db, household_id))
+        except Exception as e:
+            logger.warning("Task suggestion refresh failed", household_id=str(household_id), error=str(e))
+        finally:
+            db.close()
+            self._refreshing.discard(household_id)
+
+
+task_suggestion_cache = TaskSuggestionCache()
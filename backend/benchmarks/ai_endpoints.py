@@ -0,0 +1,111 @@
+"""
+Load test the AI endpoints against the offline stub provider.
+
+Runs the whole request path (auth, database, cache, local categorizer,
+router, provider concurrency limit) in-process with the stub provider
+standing in for the LLM, so latency and throughput under load can be
+measured without network access or API keys. Each expense description is
+unique, so every request misses the cache and reaches the provider.
+
+Usage (from backend/):
+    python -m benchmarks.ai_endpoints
+    python -m benchmarks.ai_endpoints --requests 500 --concurrency 50 --latency-ms 800 --failure-rate 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["AI_PROVIDERS"] = '["stub"]'
+os.environ["AI_PROVIDER"] = "stub"
+os.environ["RECEIPT_JOB_WORKERS"] = "0"
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def create_user() -> str:
+    """Create the tables and a user, returning their access token."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(id=uuid.uuid4(), email="bench@example.com", full_name="Bench", google_id="bench", is_active=True)
+        db.add(user)
+        db.commit()
+        return create_access_token({"sub": str(user.id)})
+    finally:
+        db.close()
+
+
+async def run(requests: int, concurrency: int, token: str) -> tuple:
+    """Send categorization requests with bounded concurrency; returns (latencies, statuses, seconds)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    ) as client:
+        async def one(index: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/expenses/ai/categorize",
+                    json={"description": f"Purchase {uuid.uuid4().hex[:8]} #{index}", "amount": 10 + index % 90},
+                    headers=headers,
+                )
+                latencies.append(time.perf_counter() - started)
+                source = response.json().get("source") if response.status_code == 200 else response.status_code
+                statuses[source] = statuses.get(source, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        return latencies, statuses, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test AI endpoints with the stub provider")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=settings.AI_STUB_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=settings.AI_STUB_JITTER_MS)
+    parser.add_argument("--failure-rate", type=float, default=settings.AI_STUB_FAILURE_RATE)
+    parser.add_argument("--batch-window-ms", type=int, default=settings.AI_BATCH_WINDOW_MS)
+    args = parser.parse_args()
+
+    settings.AI_STUB_LATENCY_MS = args.latency_ms
+    settings.AI_STUB_JITTER_MS = args.jitter_ms
+    settings.AI_STUB_FAILURE_RATE = args.failure_rate
+    settings.AI_BATCH_WINDOW_MS = args.batch_window_ms
+
+    token = create_user()
+    latencies, statuses, elapsed = asyncio.run(run(args.requests, args.concurrency, token))
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+    print(f"requests:     {args.requests} at concurrency {args.concurrency}")
+    print(f"stub:         {args.latency_ms:g} ± {args.jitter_ms:g} ms, failure rate {args.failure_rate:g}")
+    print(f"throughput:   {args.requests / elapsed:,.1f} req/s")
+    print(f"latency p50:  {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"latency p95:  {percentile(0.95):.1f} ms")
+    print(f"latency p99:  {percentile(0.99):.1f} ms")
+    print(f"answered by:  {', '.join(f'{source}={count}' for source, count in sorted(statuses.items(), key=str))}")
+
+
+if __name__ == "__main__":
+    main()
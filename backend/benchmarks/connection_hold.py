@@ -0,0 +1,95 @@
+"""
+Measure how long each request holds a pooled database connection.
+
+Seeds a household with expenses and times list_expenses and sync end to
+end, recording the time between each connection's checkout and checkin:
+
+- "request": connections are returned when get_db closes the session,
+  after the response has been serialized and sent
+- "endpoint": connections are returned as soon as the endpoint returns
+  (SessionReleasingRoute)
+
+Hold time, not request time, is what limits how many requests can share
+Neon's small pool.
+
+Usage (from backend/):
+    python -m benchmarks.connection_hold
+    python -m benchmarks.connection_hold --expenses 5000 --rounds 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from unittest.mock import patch
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["RECEIPT_JOB_WORKERS"] = "0"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.api import routing  # noqa: E402
+from app.core.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from benchmarks.response_serialization import seed  # noqa: E402
+
+
+class HoldTimer:
+    """Records how long connections stay checked out of the engine's pool."""
+
+    def __init__(self):
+        self.held = []
+        self._since = {}
+        event.listen(engine.pool, "checkout", self._checkout)
+        event.listen(engine.pool, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._since[id(connection_record)] = time.perf_counter()
+
+    def _checkin(self, dbapi_connection, connection_record):
+        started = self._since.pop(id(connection_record), None)
+        if started is not None:
+            self.held.append((time.perf_counter() - started) * 1000)
+
+
+async def run(token: str, household_id, rounds: int, timer: HoldTimer) -> tuple:
+    """Median request and connection hold milliseconds, and checkouts per request, over list_expenses and sync."""
+    headers = {"Authorization": f"Bearer {token}"}
+    sync_body = {"last_sync_timestamp": 0, "household_id": str(household_id)}
+    timer.held.clear()
+    requests = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await client.get("/api/v1/expenses/", params={"limit": 1000}, headers=headers)
+            await client.post("/api/v1/sync/", json=sync_body, headers=headers)
+            requests.append((time.perf_counter() - started) * 1000 / 2)
+    return statistics.median(requests), statistics.median(timer.held), len(timer.held) / (2 * rounds)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure connection hold time per request")
+    parser.add_argument("--expenses", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    token, household_id = seed(args.expenses, args.members)
+    timer = HoldTimer()
+
+    print(f"payload:   {args.expenses} expenses x {args.members} splits, median of {args.rounds}")
+    with patch.object(routing, "_release_sessions", lambda values: None):
+        request_ms, held_ms, checkouts = asyncio.run(run(token, household_id, args.rounds, timer))
+    print(f"{'request:':<10} request {request_ms:7.2f} ms   held {held_ms:7.2f} ms   {checkouts:.1f} checkouts")
+    request_ms, held_ms, checkouts = asyncio.run(run(token, household_id, args.rounds, timer))
+    print(f"{'endpoint:':<10} request {request_ms:7.2f} ms   held {held_ms:7.2f} ms   {checkouts:.1f} checkouts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure the per-request cost of request logging.
+
+Sends requests to a route that does no work of its own, so the time per
+request is mostly the middleware, and compares writing the request log on
+the event loop ("sync"), through the queue and listener thread ("queue"),
+and sampling it away entirely ("off"). Logs are rendered as production JSON
+and written to a file (or --output). --write-delay-ms makes every write
+block for a while, like stdout piped to a log collector that can't keep up.
+
+Usage (from backend/):
+    python -m benchmarks.logging_middleware
+    python -m benchmarks.logging_middleware --requests 5000 --concurrency 20 --write-delay-ms 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["ENVIRONMENT"] = "production"
+os.environ["LOG_LEVEL"] = "INFO"
+os.environ["RECEIPT_JOB_WORKERS"] = "0"
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.logging import setup_logging, shutdown_logging  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+class SlowStream:
+    """File wrapper whose writes block for a fixed time, like a full pipe."""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+async def run(requests: int, concurrency: int) -> list:
+    """Send requests to the root route with bounded concurrency; returns per-request latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                await client.get("/")
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure request logging overhead")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--output", default=os.path.join(_db_dir, "requests.log"))
+    parser.add_argument("--write-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    modes = {
+        "off": (True, 0.0),
+        "sync": (False, 1.0),
+        "queue": (True, 1.0),
+    }
+    print(f"requests:  {args.requests} at concurrency {args.concurrency}, logs to {args.output}")
+    print(f"log write: +{args.write_delay_ms:g} ms per line")
+    with open(args.output, "a", buffering=1) as log_file:
+        output = SlowStream(log_file, args.write_delay_ms / 1000) if args.write_delay_ms else log_file
+        for mode, (use_queue, sample_rate) in modes.items():
+            setup_logging(stream=output, use_queue=use_queue)
+            settings.LOG_SUCCESS_SAMPLE_RATE = sample_rate
+            asyncio.run(run(min(200, args.requests), args.concurrency))  # warm up
+
+            latencies = asyncio.run(run(args.requests, args.concurrency))
+            shutdown_logging()
+            latencies.sort()
+            p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+            print(
+                f"{mode + ':':<10} mean {statistics.mean(latencies) * 1e6:8.1f} µs   "
+                f"p50 {statistics.median(latencies) * 1e6:8.1f} µs   p99 {p99 * 1e6:8.1f} µs"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare request throughput of the request middleware with and without call_next.
+
+Builds three apps around the same trivial endpoint: no middleware ("bare"),
+RequestLoggingMiddleware as a plain ASGI middleware ("asgi", as the app
+runs now), and the same middleware behind a pass-through BaseHTTPMiddleware
+("call_next", the task and body stream that ``@app.middleware("http")``
+adds on every request). Logs are written to a temporary file.
+
+Usage (from backend/):
+    python -m benchmarks.middleware_throughput
+    python -m benchmarks.middleware_throughput --requests 20000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ["ENVIRONMENT"] = "production"
+os.environ["RECEIPT_JOB_WORKERS"] = "0"
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.core.logging import setup_logging, shutdown_logging  # noqa: E402
+from app.core.middleware import RequestLoggingMiddleware  # noqa: E402
+
+
+def build_app(variant: str) -> FastAPI:
+    """App with a trivial endpoint and the given middleware variant."""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    if variant in ("asgi", "call_next"):
+        app.add_middleware(RequestLoggingMiddleware)
+    if variant == "call_next":
+        async def passthrough(request, call_next):
+            return await call_next(request)
+
+        app.add_middleware(BaseHTTPMiddleware, dispatch=passthrough)
+    return app
+
+
+async def run(app: FastAPI, requests: int, concurrency: int) -> float:
+    """Send requests with bounded concurrency; returns requests per second."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one() -> None:
+            async with semaphore:
+                await client.get("/ping")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare middleware throughput")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(os.path.join(_db_dir, "requests.log"), "a") as log_file:
+        setup_logging(stream=log_file)
+        print(f"requests:   {args.requests} at concurrency {args.concurrency}, best of {args.rounds}")
+        for variant in ("bare", "asgi", "call_next"):
+            app = build_app(variant)
+            asyncio.run(run(app, min(500, args.requests), args.concurrency))  # warm up
+            best = max(asyncio.run(run(app, args.requests, args.concurrency)) for _ in range(args.rounds))
+            print(f"{variant + ':':<11} {best:,.0f} req/s")
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
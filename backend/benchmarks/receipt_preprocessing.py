@@ -0,0 +1,102 @@
+"""
+Benchmark receipt preprocessing: bytes sent to the AI and end-to-end latency.
+
+Compares uploading the original photo with preprocessing it first. Upload
+time is modelled from the image size (base64-encoded, as the OpenAI path
+sends it) and the uplink bandwidth, so the benchmark needs no API key.
+
+Usage (from backend/):
+    python -m benchmarks.receipt_preprocessing
+    python -m benchmarks.receipt_preprocessing --uplink-mbps 5 photo1.jpg photo2.jpg
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services import receipt_processing  # noqa: E402
+
+
+def synthetic_receipt_photo(width: int = 4032, height: int = 3024) -> bytes:
+    """A 12 MP phone-style photo of a receipt on a table, with EXIF rotation."""
+    image = Image.effect_noise((width, height), 40).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = width // 3, height // 8, width * 2 // 3, height * 7 // 8
+    draw.rectangle((left, top, right, bottom), fill=(240, 238, 230))
+    for y in range(top + 60, bottom - 60, 45):
+        draw.text((left + 40, y), "ITEM DESCRIPTION ........ 12.34", fill=(30, 30, 30))
+
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=92, exif=exif)
+    return output.getvalue()
+
+
+def upload_seconds(size: int, uplink_mbps: float) -> float:
+    """Time to send a base64-encoded image over the given uplink."""
+    return size * 4 / 3 * 8 / (uplink_mbps * 1_000_000)
+
+
+async def time_pool(images, rounds: int) -> list:
+    """Per-image preprocessing latency through the process pool."""
+    timings = []
+    for _ in range(rounds):
+        for data in images:
+            started = time.perf_counter()
+            await receipt_processing.preprocess_receipt(data)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark receipt preprocessing")
+    parser.add_argument("images", nargs="*", help="Receipt photos (defaults to a synthetic 12 MP photo)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    args = parser.parse_args()
+
+    images = [open(path, "rb").read() for path in args.images] or [synthetic_receipt_photo()]
+
+    inline = []
+    processed_sizes = []
+    for _ in range(args.rounds):
+        for data in images:
+            started = time.perf_counter()
+            processed = receipt_processing.preprocess_receipt_image(data)
+            inline.append(time.perf_counter() - started)
+            processed_sizes.append(len(processed))
+
+    settings.RECEIPT_PREPROCESS_WORKERS = max(1, settings.RECEIPT_PREPROCESS_WORKERS)
+    try:
+        # The first call pays for starting the worker process
+        asyncio.run(receipt_processing.preprocess_receipt(images[0]))
+        pooled = asyncio.run(time_pool(images, args.rounds))
+    finally:
+        receipt_processing.shutdown_receipt_executor()
+
+    original = statistics.mean(len(data) for data in images)
+    processed = statistics.mean(processed_sizes)
+    preprocess = statistics.median(pooled)
+    before = upload_seconds(original, args.uplink_mbps)
+    after = preprocess + upload_seconds(processed, args.uplink_mbps)
+
+    print(f"images:                 {len(images)} x {args.rounds} rounds")
+    print(f"bytes sent (original):  {original / 1024:,.0f} KiB")
+    print(f"bytes sent (processed): {processed / 1024:,.0f} KiB ({processed / original:.1%})")
+    print(f"preprocess p50 inline:  {statistics.median(inline) * 1000:.1f} ms")
+    print(f"preprocess p50 pooled:  {preprocess * 1000:.1f} ms")
+    print(f"upload @ {args.uplink_mbps:g} Mbit/s:    {before * 1000:.0f} ms -> {after * 1000:.0f} ms incl. preprocessing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Measure the cost of turning database rows into JSON responses.
+
+Seeds a household with expenses (split between its members) and times
+loading and serializing the list_expenses payload and the expenses part of
+the sync payload, the way FastAPI handles a response_model (validate against
+the model, then dump to JSON):
+
+- "objects": load Expense objects and copy them into schemas, as the
+  endpoints used to
+- "construct": the same, with model_construct instead of validation
+- "rows": select the schema's columns as plain rows and validate those
+  directly, as the endpoints do now
+- "orjson": rows rendered through a Python dict and orjson, which is what a
+  custom orjson default_response_class would do instead of pydantic-core's
+  dump_json
+
+The last line times both endpoints end to end through the app.
+
+Usage (from backend/):
+    python -m benchmarks.response_serialization
+    python -m benchmarks.response_serialization --expenses 5000 --rounds 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["RECEIPT_JOB_WORKERS"] = "0"
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.api.v1.endpoints.sync import fetch_updated_expenses  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.expense import Expense, ExpenseCategory, ExpenseSplit  # noqa: E402
+from app.models.household import Household, HouseholdMember, MemberRole  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.base import schema_columns  # noqa: E402
+from app.schemas.expense import ExpenseResponse  # noqa: E402
+from app.schemas.sync import ExpenseSplitSyncDto, ExpenseSyncDto  # noqa: E402
+
+EXPENSE_FIELDS = [name for name in ExpenseResponse.model_fields if not name.startswith("creator_")]
+SYNC_FIELDS = [name for name in ExpenseSyncDto.model_fields if name != "splits"]
+SPLIT_FIELDS = list(ExpenseSplitSyncDto.model_fields)
+
+
+def seed(expenses: int, members: int) -> tuple:
+    """Create a household with expenses split between its members; returns (token, household_id)."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        users = [
+            User(id=uuid.uuid4(), email=f"bench{i}@example.com", full_name=f"Bench {i}", google_id=f"bench{i}")
+            for i in range(members)
+        ]
+        db.add_all(users)
+        db.flush()
+        household = Household(name="Bench House", created_by=users[0].id)
+        db.add(household)
+        db.flush()
+        db.add_all(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.MEMBER) for user in users)
+        categories = list(ExpenseCategory)
+        for i in range(expenses):
+            expense = Expense(
+                household_id=household.id,
+                created_by=users[i % members].id,
+                amount=Decimal(members * 10) + Decimal(i % 100) / 100,
+                description=f"Expense {i}",
+                category=categories[i % len(categories)],
+            )
+            db.add(expense)
+            db.flush()
+            db.add_all(
+                ExpenseSplit(expense_id=expense.id, user_id=user.id, amount_owed=expense.amount / members)
+                for user in users
+            )
+        db.commit()
+        return create_access_token({"sub": str(users[0].id)}), household.id
+    finally:
+        db.close()
+
+
+def list_objects(db, household_id, construct: bool) -> list:
+    """list_expenses payload from Expense objects."""
+    build = ExpenseResponse.model_construct if construct else ExpenseResponse
+    expenses = db.query(Expense).filter(Expense.household_id == household_id).order_by(Expense.date.desc()).all()
+    return [
+        build(
+            **{name: getattr(e, name) for name in EXPENSE_FIELDS},
+            creator_name=e.creator.full_name,
+            creator_email=e.creator.email,
+        )
+        for e in expenses
+    ]
+
+
+def list_rows(db, household_id) -> list:
+    """list_expenses payload as plain rows."""
+    return (
+        db.query(
+            *schema_columns(ExpenseResponse, Expense),
+            User.full_name.label("creator_name"),
+            User.email.label("creator_email"),
+        )
+        .join(User, User.id == Expense.created_by)
+        .filter(Expense.household_id == household_id)
+        .order_by(Expense.date.desc())
+        .all()
+    )
+
+
+def sync_objects(db, household_id, construct: bool) -> list:
+    """Sync expenses payload from Expense objects, one split query per expense."""
+    build = ExpenseSyncDto.model_construct if construct else ExpenseSyncDto
+    build_split = ExpenseSplitSyncDto.model_construct if construct else ExpenseSplitSyncDto
+    result = []
+    for e in db.query(Expense).filter(Expense.household_id == household_id).all():
+        splits = db.query(ExpenseSplit).filter(ExpenseSplit.expense_id == e.id).all()
+        result.append(build(
+            **{name: getattr(e, name) for name in SYNC_FIELDS},
+            splits=[build_split(**{name: getattr(s, name) for name in SPLIT_FIELDS}) for s in splits],
+        ))
+    return result
+
+
+def render(adapter: TypeAdapter, payload: list, use_orjson: bool) -> bytes:
+    """Validate and serialize a payload the way FastAPI does for a response_model."""
+    value = adapter.validate_python(payload)
+    if use_orjson:
+        return orjson.dumps(adapter.dump_python(value, mode="json"))
+    return adapter.dump_json(value)
+
+
+def timed(fn, rounds: int) -> float:
+    """Median milliseconds per call, each in a fresh session."""
+    samples = []
+    for _ in range(rounds):
+        db = SessionLocal()
+        started = time.perf_counter()
+        fn(db)
+        samples.append((time.perf_counter() - started) * 1000)
+        db.close()
+    return statistics.median(samples)
+
+
+async def request_ms(token: str, household_id, rounds: int) -> tuple:
+    """Median end-to-end milliseconds for list_expenses and sync."""
+    headers = {"Authorization": f"Bearer {token}"}
+    sync_body = {"last_sync_timestamp": 0, "household_id": str(household_id)}
+    listed, synced = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await client.get("/api/v1/expenses/", params={"limit": 1000}, headers=headers)
+            listed.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            await client.post("/api/v1/sync/", json=sync_body, headers=headers)
+            synced.append((time.perf_counter() - started) * 1000)
+    return statistics.median(listed), statistics.median(synced)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure response serialization")
+    parser.add_argument("--expenses", type=int, default=1000)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    token, household_id = seed(args.expenses, args.members)
+    list_adapter = TypeAdapter(List[ExpenseResponse])
+    sync_adapter = TypeAdapter(List[ExpenseSyncDto])
+    last_sync = datetime.min.replace(tzinfo=timezone.utc)
+
+    modes = {
+        "objects": (
+            lambda db: list_objects(db, household_id, construct=False),
+            lambda db: sync_objects(db, household_id, construct=False),
+            False,
+        ),
+        "construct": (
+            lambda db: list_objects(db, household_id, construct=True),
+            lambda db: sync_objects(db, household_id, construct=True),
+            False,
+        ),
+        "rows": (
+            lambda db: list_rows(db, household_id),
+            lambda db: fetch_updated_expenses(household_id, last_sync, db),
+            False,
+        ),
+        "orjson": (
+            lambda db: list_rows(db, household_id),
+            lambda db: fetch_updated_expenses(household_id, last_sync, db),
+            True,
+        ),
+    }
+
+    print(f"payload:   {args.expenses} expenses x {args.members} splits, median of {args.rounds}, load + serialize")
+    for mode, (list_payload, sync_payload, use_orjson) in modes.items():
+        list_ms = timed(lambda db: render(list_adapter, list_payload(db), use_orjson), args.rounds)
+        sync_ms = timed(lambda db: render(sync_adapter, sync_payload(db), use_orjson), args.rounds)
+        print(f"{mode + ':':<10} list_expenses {list_ms:7.2f} ms   sync expenses {sync_ms:7.2f} ms")
+
+    list_ms, sync_ms = asyncio.run(request_ms(token, household_id, args.rounds))
+    print(f"{'request:':<10} list_expenses {list_ms:7.2f} ms   sync          {sync_ms:7.2f} ms  (end to end)")
+
+
+if __name__ == "__main__":
+    main()
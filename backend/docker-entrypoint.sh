@@ -9,6 +9,12 @@ alembic upgrade head
 
 echo "✅ Migrations complete!"
 
+# Start every run with empty multiprocess metric files, shared by all workers
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Start the application
 echo "🌐 Starting server..."
 exec "$@"
@@ -12,9 +12,14 @@ from sqlalchemy.pool import StaticPool
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 os.environ["SECRET_KEY"] = "test-secret-key-for-pytest"
 os.environ["BACKEND_CORS_ORIGINS"] = '["http://localhost:3000"]'
+# Tests drive receipt job queues explicitly
+os.environ["RECEIPT_JOB_WORKERS"] = "0"
+# Fail any request that repeats a query often enough to be an N+1
+os.environ["N_PLUS_ONE_DETECTION"] = "raise"
 
 from app.main import app
 from app.core.database import get_db, Base
+from app.core.db_metrics import instrument_engine
 
 
 # Use in-memory SQLite database for tests
@@ -26,6 +31,7 @@ engine = create_engine(
     poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_engine(engine)
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,181 @@
+"""
+Tests for routing AI calls across providers.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+from app.services.ai_router import AIRouter, CircuitBreaker
+
+
+class ScriptedProvider:
+    """Provider double answering after a delay, optionally with a failure."""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    def is_available(self):
+        return True
+
+    async def categorize_expense(self, description, amount, context=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"category": "Groceries", "confidence": 0.0 if self.fail else 0.9, "answered_by": self.name}
+
+
+def categorize(router):
+    """Route one categorization."""
+    return router.call(
+        "categorize",
+        lambda provider: provider.categorize_expense("Tesco", 12.5),
+        lambda result: result["confidence"] <= 0,
+        lambda: {"category": "Other", "confidence": 0.0, "answered_by": None},
+    )
+
+
+def request_count(provider, status):
+    """Read the request counter for a provider."""
+    return REGISTRY.get_sample_value(
+        "ai_requests_total", {"provider": provider, "operation": "categorize", "status": status}
+    ) or 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_calls_fail_over_and_are_counted():
+    """Test that a failing provider falls through to the next one and both outcomes are recorded."""
+    primary = ScriptedProvider("router-primary", fail=True)
+    backup = ScriptedProvider("router-backup")
+    router = AIRouter([primary, backup], preferred="router-primary")
+
+    result = await categorize(router)
+
+    assert result["answered_by"] == "router-backup"
+    assert request_count("router-primary", "error") == 1
+    assert request_count("router-backup", "success") == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_open_circuit_skips_provider():
+    """Test that repeated failures open the circuit and the provider stops being called."""
+    primary = ScriptedProvider("breaker-primary", fail=True)
+    backup = ScriptedProvider("breaker-backup")
+    router = AIRouter([primary, backup], preferred="breaker-primary")
+
+    with patch.object(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 2):
+        for _ in range(4):
+            await categorize(router)
+
+    assert primary.calls == 2
+    assert backup.calls == 4
+    assert router.breakers["breaker-primary"].state == CircuitBreaker.OPEN
+
+
+@pytest.mark.unit
+def test_circuit_half_opens_after_reset():
+    """Test that an open circuit lets calls through again after the reset period."""
+    breaker = CircuitBreaker("half-open")
+    with patch.object(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 1), \
+            patch.object(settings, "AI_CIRCUIT_RESET_SECONDS", 0):
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert REGISTRY.get_sample_value("ai_circuit_state", {"provider": "half-open"}) == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_half_open_circuit_lets_one_trial_call_through():
+    """Test that concurrent calls to a half-open provider send it a single trial call."""
+    primary = ScriptedProvider("trial-primary", delay=0.05, fail=True)
+    backup = ScriptedProvider("trial-backup")
+    router = AIRouter([primary, backup], preferred="trial-primary")
+
+    with patch.object(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 1), \
+            patch.object(settings, "AI_CIRCUIT_RESET_SECONDS", 0):
+        router.breakers["trial-primary"].record_failure()
+        results = await asyncio.gather(*(categorize(router) for _ in range(5)))
+
+    assert primary.calls == 1
+    assert all(result["answered_by"] == "trial-backup" for result in results)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_timeout_budget_fails_over():
+    """Test that a call running past its provider's budget is abandoned for the next provider."""
+    slow = ScriptedProvider("timeout-slow", delay=1)
+    fast = ScriptedProvider("timeout-fast")
+    router = AIRouter([slow, fast], preferred="timeout-slow")
+
+    with patch.object(AIRouter, "timeout_for", staticmethod(lambda name: 0.02)):
+        result = await categorize(router)
+
+    assert result["answered_by"] == "timeout-fast"
+    assert slow.cancelled == 1
+    assert request_count("timeout-slow", "timeout") == 1
+
+
+@pytest.mark.unit
+def test_selection_prefers_faster_provider():
+    """Test that the preferred provider loses first place only when clearly slower."""
+    preferred = ScriptedProvider("latency-preferred")
+    other = ScriptedProvider("latency-other")
+    router = AIRouter([other, preferred], preferred="latency-preferred")
+
+    router.latency("latency-preferred", "categorize").observe(1.2)
+    router.latency("latency-other", "categorize").observe(1.0)
+    assert router.candidates("categorize") == [preferred, other]
+
+    router.latency("latency-preferred", "categorize").observe(10.0)
+    assert router.candidates("categorize") == [other, preferred]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_slow_requests_are_hedged():
+    """Test that a backup request starts after the p95 and the slower call is cancelled."""
+    primary = ScriptedProvider("hedge-primary", delay=1)
+    backup = ScriptedProvider("hedge-backup")
+    router = AIRouter([primary, backup], preferred="hedge-primary")
+    for _ in range(20):
+        router.latency("hedge-primary", "categorize").observe(0.01)
+    router.latency("hedge-backup", "categorize").observe(0.05)
+
+    with patch.object(settings, "AI_HEDGING_ENABLED", True):
+        result = await categorize(router)
+
+    assert result["answered_by"] == "hedge-backup"
+    assert primary.cancelled == 1
+    assert REGISTRY.get_sample_value(
+        "ai_hedged_requests_total", {"provider": "hedge-backup", "operation": "categorize"}
+    ) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_no_usable_provider_returns_default():
+    """Test that the default result is returned when every circuit is open."""
+    provider = ScriptedProvider("default-only")
+    router = AIRouter([provider])
+
+    with patch.object(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 1):
+        router.breakers["default-only"].record_failure()
+        result = await categorize(router)
+
+    assert result["answered_by"] is None
+    assert provider.calls == 0
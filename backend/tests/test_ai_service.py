@@ -0,0 +1,280 @@
+"""
+Tests for the shared AI service and its providers.
+"""
+import asyncio
+import pytest
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+from app.services import ai_service as ai_module
+from app.services.ai_prompts import parse_categorization, parse_task_suggestions
+from app.services.ai_service import (
+    AIProviderBusyError,
+    AIService,
+    GeminiProvider,
+    OpenAIProvider,
+    PROVIDER_REGISTRY,
+    StubProvider,
+    StubProviderError,
+    create_providers,
+    get_ai_service,
+    close_ai_service,
+)
+
+
+class FakeAIService:
+    """AI service double returning canned suggestions."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def suggest_tasks(self, household_context, existing_tasks, recent_expenses=None):
+        self.calls += 1
+        return [
+            {
+                "title": "Clean kitchen",
+                "description": "Wipe counters",
+                "priority": "high",
+                "category": "chores",
+                "reasoning": "Shared space",
+            }
+        ]
+
+
+class SlowGeminiModel:
+    """Gemini model double exposing only the async API."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+
+    async def generate_content_async(self, prompt):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        return SimpleNamespace(text='{"category": "Groceries", "confidence": 0.9}')
+
+
+@pytest.fixture
+def household_member(db_session):
+    """Create a user who owns a household."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.flush()
+    household = Household(name="Test House", created_by=user.id)
+    db_session.add(household)
+    db_session.flush()
+    db_session.add(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.OWNER))
+    db_session.commit()
+    return user, household
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_get_ai_service_is_shared():
+    """Test that the AI service is created once and reused."""
+    await close_ai_service()
+    assert ai_module._ai_service is None
+
+    first = get_ai_service()
+    assert get_ai_service() is first
+
+    await close_ai_service()
+    assert ai_module._ai_service is None
+
+
+@pytest.mark.unit
+def test_gemini_is_configured_lazily():
+    """Test that constructing the provider does not configure the SDK."""
+    with patch.object(settings, "GEMINI_API_KEY", "test-key"):
+        provider = GeminiProvider()
+        assert provider.is_available()
+        assert provider._model is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_openai_client_is_pooled_and_reused():
+    """Test that the OpenAI client and its HTTP pool are built once."""
+    with patch.object(settings, "OPENAI_API_KEY", "test-key"):
+        provider = OpenAIProvider()
+        assert provider._client is None
+
+        client = provider.client
+        assert client is provider.client
+        assert provider._http_client is not None
+
+        await provider.aclose()
+        assert provider._client is None
+        assert provider._http_client is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_provider_calls_are_async_and_bounded():
+    """Test that provider calls await the async SDK and respect the concurrency limit."""
+    with patch.object(settings, "GEMINI_API_KEY", "test-key"), \
+            patch.object(settings, "AI_MAX_CONCURRENCY", 1):
+        provider = GeminiProvider()
+        provider._model = SlowGeminiModel()
+
+        async def sample_queue_depth():
+            await asyncio.sleep(0.01)
+            return REGISTRY.get_sample_value("ai_queue_depth", {"provider": "gemini"})
+
+        *results, queued = await asyncio.gather(
+            provider.categorize_expense("Tesco", 12.5),
+            provider.categorize_expense("Tesco", 12.5),
+            provider.categorize_expense("Tesco", 12.5),
+            sample_queue_depth(),
+        )
+
+    assert [r["category"] for r in results] == ["Groceries"] * 3
+    assert provider._model.max_running == 1
+    assert queued == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_provider_queue_timeout():
+    """Test that waiting too long for a slot raises instead of piling up."""
+    with patch.object(settings, "AI_MAX_CONCURRENCY", 1), \
+            patch.object(settings, "AI_QUEUE_TIMEOUT_SECONDS", 0.01):
+        provider = GeminiProvider()
+
+        async with provider._concurrency_slot():
+            with pytest.raises(AIProviderBusyError):
+                async with provider._concurrency_slot():
+                    pass
+
+
+@pytest.mark.unit
+def test_unconfigured_service_is_unavailable():
+    """Test that no provider is available without API keys."""
+    with patch.object(settings, "GEMINI_API_KEY", ""), patch.object(settings, "OPENAI_API_KEY", ""):
+        assert AIService().is_available() is False
+
+
+@pytest.mark.integration
+def test_suggest_tasks_uses_injected_service(client, household_member):
+    """Test that the suggestions endpoint gets the AI service via dependency injection."""
+    user, household = household_member
+    fake = FakeAIService()
+    app.dependency_overrides[get_ai_service] = lambda: fake
+
+    token = create_access_token({"sub": str(user.id)})
+    response = client.post(
+        f"/api/v1/expenses/ai/suggest-tasks?household_id={household.id}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 200
+    assert fake.calls == 1
+    assert response.json()["suggestions"][0]["title"] == "Clean kitchen"
+
+
+@pytest.mark.unit
+def test_providers_are_created_from_registry():
+    """Test that AI_PROVIDERS names map to registered providers and unknown names are skipped."""
+    assert {"gemini", "openai", "stub"} <= set(PROVIDER_REGISTRY)
+
+    providers = create_providers(["stub", "missing"])
+
+    assert [provider.name for provider in providers] == ["stub"]
+
+
+@pytest.mark.unit
+def test_shared_parsing_validates_responses():
+    """Test that responses are unwrapped and validated the same way for every provider."""
+    result = parse_categorization('```json\n{"category": "Made up", "confidence": 3}\n```')
+    assert result["category"] == "Other"
+    assert result["confidence"] == 1.0
+
+    wrapped = parse_task_suggestions('{"suggestions": [{"title": "Hoover", "priority": "urgent"}]}')
+    bare = parse_task_suggestions('[{"title": "Hoover", "priority": "urgent"}]')
+    assert wrapped == bare == [{"title": "Hoover", "priority": "medium"}]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_stub_provider_is_deterministic():
+    """Test that the stub answers offline through the shared parsing, identically on every run."""
+    with patch.object(settings, "AI_STUB_LATENCY_MS", 1), patch.object(settings, "AI_STUB_JITTER_MS", 1):
+        first, second = StubProvider(), StubProvider()
+        items = [{"description": "Tesco", "amount": 12.5}, {"description": "Mystery charge", "amount": 3}]
+
+        results = await first.categorize_expenses_batch(items)
+        assert results == await second.categorize_expenses_batch(items)
+        assert results[0]["category"] == "Groceries"
+
+        receipt = await first.extract_receipt_data(b"receipt bytes")
+        assert receipt["success"] is True
+        assert receipt == await second.extract_receipt_data(b"receipt bytes")
+
+        suggestions = await first.suggest_tasks({"member_count": 3}, [], [{"amount": 5, "description": "Milk"}])
+        assert [s["category"] for s in suggestions] == ["chores", "shopping", "financial"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_stub_simulates_failures():
+    """Test that simulated failures come back as fallback results, or as errors for task suggestions."""
+    with patch.object(settings, "AI_STUB_LATENCY_MS", 0), patch.object(settings, "AI_STUB_JITTER_MS", 0), \
+            patch.object(settings, "AI_STUB_FAILURE_RATE", 1.0):
+        provider = StubProvider()
+
+        categorization = await provider.categorize_expense("Tesco", 12.5)
+        receipt = await provider.extract_receipt_data(b"receipt bytes")
+        with pytest.raises(StubProviderError, match="Simulated suggest_tasks failure"):
+            await provider.suggest_tasks({"member_count": 3}, [], [])
+
+    assert categorization["confidence"] == 0.0
+    assert "Simulated categorize failure" in categorization["reasoning"]
+    assert receipt["success"] is False
+
+
+class EmptySuggestionsProvider:
+    """Provider double with nothing to suggest."""
+
+    name = "empty-suggestions"
+
+    def __init__(self):
+        self.calls = 0
+
+    def is_available(self):
+        return True
+
+    async def suggest_tasks(self, household_context, existing_tasks, recent_expenses=None):
+        self.calls += 1
+        return []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_empty_task_suggestions_are_not_failures():
+    """Test that an empty suggestion list is an answer and doesn't count against the provider's circuit."""
+    provider = EmptySuggestionsProvider()
+    service = AIService(providers=[provider])
+
+    with patch.object(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 1):
+        for _ in range(3):
+            assert await service.suggest_tasks({"member_count": 3}, [], []) == []
+
+    assert provider.calls == 3
+    assert service.router.breakers["empty-suggestions"].failures == 0
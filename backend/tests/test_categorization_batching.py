@@ -0,0 +1,182 @@
+"""
+Tests for batched expense categorization.
+"""
+import asyncio
+import json
+import pytest
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.services.ai_service import (
+    AIService,
+    GeminiProvider,
+    get_ai_service,
+    parse_batch_categorization,
+)
+from app.services.categorization_cache import CategorizationCache
+from app.services.local_categorizer import LocalCategorizer
+
+
+class BatchGeminiModel:
+    """Gemini model double answering batch prompts for every item but the last."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        if "Provide a JSON object with a \"results\" array" in prompt:
+            count = prompt.count(" | Amount: ")
+            results = [
+                {"index": i, "category": "Groceries", "confidence": 0.9}
+                for i in range(count - 1)
+            ]
+            return SimpleNamespace(text="```json\n" + json.dumps({"results": results}) + "\n```")
+        return SimpleNamespace(text='{"category": "Dining", "confidence": 0.7}')
+
+
+class BatchingProvider:
+    """Provider double recording how requests were grouped."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.single_calls = 0
+        self.batches = []
+
+    def is_available(self):
+        return True
+
+    async def aclose(self):
+        return None
+
+    async def categorize_expense(self, description, amount, context=None):
+        self.single_calls += 1
+        return {"category": "Groceries", "confidence": 0.9, "reasoning": "", "suggested_tags": []}
+
+    async def categorize_expenses_batch(self, items):
+        self.batches.append([item["description"] for item in items])
+        return [
+            {"category": "Groceries", "confidence": 0.9, "reasoning": "", "suggested_tags": []}
+            for _ in items
+        ]
+
+
+@pytest.fixture(autouse=True)
+def disable_local_categorizer():
+    """Send every expense to the provider so batching behaviour is isolated."""
+    with patch.object(settings, "LOCAL_CATEGORIZER_ENABLED", False):
+        yield
+
+
+def make_service(provider):
+    """Build an AI service with a fresh cache in front of the given provider."""
+    return AIService(cache=CategorizationCache(), local=LocalCategorizer(), providers=[provider])
+
+
+@pytest.mark.unit
+def test_parse_batch_marks_bad_entries_missing():
+    """Test that malformed, duplicate and out-of-range entries are left for retry."""
+    text = json.dumps({"results": [
+        {"index": 0, "category": "Rent", "confidence": 2},
+        {"index": 0, "category": "Dining", "confidence": 0.5},
+        {"index": 2, "category": "Made up", "confidence": "high"},
+        {"index": 7, "category": "Rent"},
+        {"index": 3, "category": "Made up", "confidence": 0.4},
+    ]})
+
+    results = parse_batch_categorization(text, 4)
+
+    assert results[0]["category"] == "Rent"
+    assert results[0]["confidence"] == 1.0
+    assert results[1] is None
+    assert results[2] is None
+    assert results[3]["category"] == "Other"
+    assert parse_batch_categorization("not json", 2) == [None, None]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_provider_batch_falls_back_per_item():
+    """Test that one prompt covers the batch and only unanswered items are retried."""
+    with patch.object(settings, "GEMINI_API_KEY", "test-key"), \
+            patch.object(settings, "AI_BATCH_MAX_SIZE", 3):
+        provider = GeminiProvider()
+        provider._model = BatchGeminiModel()
+
+        items = [{"description": f"item {i}", "amount": 5.0} for i in range(5)]
+        results = await provider.categorize_expenses_batch(items)
+
+    # Two batch prompts (3 + 2 items), then one retry for the last item of each
+    assert len(provider._model.prompts) == 4
+    assert [r["category"] for r in results] == ["Groceries", "Groceries", "Dining", "Groceries", "Dining"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced():
+    """Test that concurrent single categorizations share one provider call."""
+    provider = BatchingProvider()
+    service = make_service(provider)
+
+    with patch.object(settings, "AI_BATCH_WINDOW_MS", 20):
+        results = await asyncio.gather(*(
+            service.categorize_expense(f"expense {i}", 10.0) for i in range(5)
+        ))
+
+    assert provider.single_calls == 0
+    assert provider.batches == [[f"expense {i}" for i in range(5)]]
+    assert all(r["source"] == "ai" for r in results)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_without_waiting():
+    """Test that reaching the batch size flushes immediately."""
+    provider = BatchingProvider()
+    service = make_service(provider)
+
+    with patch.object(settings, "AI_BATCH_WINDOW_MS", 10000), \
+            patch.object(settings, "AI_BATCH_MAX_SIZE", 2):
+        await asyncio.wait_for(
+            asyncio.gather(
+                service.categorize_expense("first", 1.0),
+                service.categorize_expense("second", 1.0),
+            ),
+            timeout=1,
+        )
+
+    assert provider.batches == [["first", "second"]]
+
+
+@pytest.mark.integration
+def test_categorize_batch_endpoint(client, db_session):
+    """Test that the batch endpoint answers repeats from the cache."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    provider = BatchingProvider()
+    service = make_service(provider)
+    app.dependency_overrides[get_ai_service] = lambda: service
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    body = {"expenses": [{"description": "Tesco", "amount": 12.5}, {"description": "Aldi", "amount": 30}]}
+
+    first = client.post("/api/v1/expenses/ai/categorize/batch", json=body, headers=headers)
+    second = client.post("/api/v1/expenses/ai/categorize/batch", json=body, headers=headers)
+
+    assert first.status_code == 200
+    assert [r["source"] for r in first.json()["results"]] == ["ai", "ai"]
+    assert [r["source"] for r in second.json()["results"]] == ["cache", "cache"]
+    assert provider.batches == [["Tesco", "Aldi"]]
@@ -0,0 +1,250 @@
+"""
+Tests for the expense categorization cache.
+"""
+import pytest
+import uuid
+from unittest.mock import patch
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.main import app
+from app.models.ai_cache import CategorizationCacheEntry
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+from app.services.ai_service import AIService, get_ai_service
+from app.services.categorization_cache import (
+    CategorizationCache,
+    build_cache_key,
+    normalize_description,
+)
+
+
+class CountingProvider:
+    """Provider double that counts categorization calls."""
+
+    name = "fake"
+
+    def __init__(self, confidence=0.9):
+        self.calls = 0
+        self.confidence = confidence
+
+    def is_available(self):
+        return True
+
+    async def aclose(self):
+        return None
+
+    async def categorize_expense(self, description, amount, context=None):
+        self.calls += 1
+        return {
+            "category": "Groceries",
+            "subcategory": None,
+            "confidence": self.confidence,
+            "reasoning": "Supermarket",
+            "suggested_tags": ["food"],
+        }
+
+
+@pytest.fixture(autouse=True)
+def disable_local_categorizer():
+    """Send every cache miss to the provider so cache behaviour is isolated."""
+    with patch.object(settings, "LOCAL_CATEGORIZER_ENABLED", False):
+        yield
+
+
+def make_service(provider, cache=None):
+    """Build an AI service backed by the given provider and a fresh cache."""
+    return AIService(cache=cache or CategorizationCache(), providers=[provider])
+
+
+@pytest.fixture
+def household_member(db_session):
+    """Create a user who owns a household."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.flush()
+    household = Household(name="Test House", created_by=user.id)
+    db_session.add(household)
+    db_session.flush()
+    db_session.add(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.OWNER))
+    db_session.commit()
+    return user, household
+
+
+@pytest.mark.unit
+def test_normalized_keys_ignore_noise():
+    """Test that case, punctuation, numbers and nearby amounts share a key."""
+    assert normalize_description("TESCO Express #1234") == "express tesco"
+    assert build_cache_key("Tesco Express #1234", 12.40) == build_cache_key("express tesco", 13.99)
+    assert build_cache_key("Tesco", 12.40) != build_cache_key("Tesco", 120.00)
+    assert build_cache_key("Tesco", 12.40) != build_cache_key("Tesco", 12.40, "party supplies")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_repeated_categorization_is_cached(db_session, household_member):
+    """Test that a repeated description is served without calling the provider."""
+    _, household = household_member
+    provider = CountingProvider()
+    service = make_service(provider)
+
+    first = await service.categorize_expense("Tesco", 12.5, household_id=household.id, db=db_session)
+    second = await service.categorize_expense("tesco!", 13.0, household_id=household.id, db=db_session)
+
+    assert provider.calls == 1
+    assert first["source"] == "ai"
+    assert second["source"] == "cache"
+    assert second["category"] == "Groceries"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_database_tier_survives_worker_restart(db_session, household_member):
+    """Test that entries persisted by one worker are found by another."""
+    _, household = household_member
+    provider = CountingProvider()
+
+    await make_service(provider).categorize_expense(
+        "Electricity bill", 60, household_id=household.id, db=db_session
+    )
+    result = await make_service(provider).categorize_expense(
+        "electricity bill", 55, household_id=household.id, db=db_session
+    )
+
+    assert provider.calls == 1
+    assert result["source"] == "cache"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_global_tier_requires_confidence(db_session, household_member):
+    """Test that only confident results are shared with other households."""
+    user, household = household_member
+    other = Household(name="Other House", created_by=user.id)
+    db_session.add(other)
+    db_session.commit()
+    other_household = other.id
+
+    confident = CountingProvider(confidence=0.95)
+    service = make_service(confident)
+    await service.categorize_expense("Uber", 20, household_id=household.id, db=db_session)
+    shared = await service.categorize_expense("Uber", 20, household_id=other_household, db=db_session)
+    assert confident.calls == 1
+    assert shared["source"] == "cache"
+
+    unsure = CountingProvider(confidence=0.4)
+    service = make_service(unsure)
+    await service.categorize_expense("Misc stuff", 20, household_id=household.id, db=db_session)
+    await service.categorize_expense("Misc stuff", 20, household_id=other_household, db=db_session)
+    assert unsure.calls == 2
+
+    scopes = {
+        row.household_id
+        for row in db_session.query(CategorizationCacheEntry).filter(
+            CategorizationCacheEntry.cache_key == build_cache_key("Misc stuff", 20)
+        )
+    }
+    assert scopes == {household.id, other_household}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_fallback_results_are_not_cached(db_session):
+    """Test that zero-confidence fallbacks are retried rather than cached."""
+    provider = CountingProvider(confidence=0.0)
+    service = make_service(provider)
+
+    await service.categorize_expense("Tesco", 12.5, db=db_session)
+    await service.categorize_expense("Tesco", 12.5, db=db_session)
+
+    assert provider.calls == 2
+    assert db_session.query(CategorizationCacheEntry).count() == 0
+
+
+@pytest.mark.unit
+def test_memory_tier_evicts_least_recently_used(db_session):
+    """Test that the in-memory tier is bounded."""
+    cache = CategorizationCache(max_entries=2)
+    result = {"category": "Groceries", "confidence": 0.9}
+
+    cache.set(db_session, "apples", 5, result)
+    cache.set(db_session, "bread", 5, result)
+    assert cache._memory_get(None, build_cache_key("apples", 5)) is not None
+    cache.set(db_session, "cheese", 5, result)
+
+    assert len(cache._entries) == 2
+    assert cache._memory_get(None, build_cache_key("bread", 5)) is None
+    assert cache._memory_get(None, build_cache_key("apples", 5)) is not None
+
+
+@pytest.mark.unit
+def test_cache_leaves_callers_transaction_alone(db_session, household_member):
+    """Test that cache writes don't commit, and cache failures don't roll back, the caller's work."""
+    user, _ = household_member
+    cache = CategorizationCache()
+    result = {"category": "Groceries", "confidence": 0.9}
+
+    db_session.add(Household(name="Pending House", created_by=user.id))
+    cache.set(db_session, "apples", 5, result)
+    db_session.rollback()
+    assert db_session.query(Household).filter(Household.name == "Pending House").count() == 0
+    assert db_session.query(CategorizationCacheEntry).count() == 1
+
+    db_session.add(Household(name="Flushed House", created_by=user.id))
+    db_session.flush()
+    with patch.object(CategorizationCache, "_session", side_effect=RuntimeError("database gone")):
+        cache.clear()
+        assert cache.get(db_session, "apples", 5) is None
+        cache.set(db_session, "bread", 5, result)
+    assert db_session.query(Household).filter(Household.name == "Flushed House").count() == 1
+
+
+@pytest.mark.unit
+def test_workers_storing_the_same_key_share_one_row(db_session, household_member):
+    """Test that a key stored by several workers is upserted into one row per tier."""
+    _, household = household_member
+    first, second = CategorizationCache(), CategorizationCache()
+
+    first.set(db_session, "Tesco", 12.5, {"category": "Groceries", "confidence": 0.9}, household_id=household.id)
+    second.set(db_session, "Tesco", 12.5, {"category": "Shopping", "confidence": 0.95}, household_id=household.id)
+
+    rows = db_session.query(CategorizationCacheEntry).all()
+    assert sorted(row.household_id is None for row in rows) == [False, True]
+    assert all(row.result["category"] == "Shopping" for row in rows)
+
+    db_session.add(CategorizationCacheEntry(
+        household_id=None, cache_key=build_cache_key("Tesco", 12.5), result={}, expires_at=rows[0].expires_at,
+    ))
+    with pytest.raises(IntegrityError):
+        db_session.flush()
+    db_session.rollback()
+
+
+@pytest.mark.integration
+def test_categorize_endpoint(client, household_member):
+    """Test that the categorize endpoint reports cache hits."""
+    user, household = household_member
+    provider = CountingProvider()
+    service = make_service(provider)
+    app.dependency_overrides[get_ai_service] = lambda: service
+
+    token = create_access_token({"sub": str(user.id)})
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"description": "Tesco", "amount": 12.5, "household_id": str(household.id)}
+
+    first = client.post("/api/v1/expenses/ai/categorize", json=body, headers=headers)
+    second = client.post("/api/v1/expenses/ai/categorize", json=body, headers=headers)
+
+    assert first.status_code == 200
+    assert first.json()["source"] == "ai"
+    assert second.json()["source"] == "cache"
+    assert second.json()["category"] == "Groceries"
+    assert provider.calls == 1
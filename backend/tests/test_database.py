@@ -2,7 +2,12 @@
 Tests for database connection and configuration.
 """
 import pytest
-from sqlalchemy import text
+import uuid
+from sqlalchemy import event, text
+
+from app.core.database import release_connection
+from app.core.security import create_access_token
+from app.models.user import User
 
 
 @pytest.mark.integration
@@ -40,3 +45,57 @@ def test_database_transaction_rollback(db_session):
     # Should still be able to query after rollback
     result_after = db_session.execute(text("SELECT 1")).scalar()
     assert result_after == 1
+
+
+@pytest.fixture
+def user(db_session):
+    """Create a test user."""
+    user = User(id=uuid.uuid4(), email="test@example.com", full_name="Test User", google_id="google-123")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def checkouts(db_session):
+    """Count connections checked out of the test engine's pool."""
+    counted = []
+
+    def count(dbapi_connection, connection_record, connection_proxy):
+        counted.append(connection_record)
+
+    event.listen(db_session.bind.pool, "checkout", count)
+    yield counted
+    event.remove(db_session.bind.pool, "checkout", count)
+
+
+@pytest.mark.unit
+def test_release_connection_keeps_loaded_objects(db_session, user):
+    """Test that releasing ends the transaction but loaded attributes stay readable."""
+    loaded = db_session.get(User, user.id)
+    assert db_session.in_transaction()
+
+    release_connection(db_session)
+
+    assert not db_session.in_transaction()
+    assert loaded.email == "test@example.com"
+    assert not db_session.in_transaction()
+
+
+@pytest.mark.integration
+def test_request_releases_connection_when_endpoint_returns(client, db_session, user):
+    """Test that the request's session holds no transaction once the endpoint has returned."""
+    token = create_access_token({"sub": str(user.id)})
+    response = client.get("/api/v1/households/mine", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert not db_session.in_transaction()
+
+
+@pytest.mark.integration
+def test_rejected_token_checks_out_no_connection(client, checkouts):
+    """Test that a request failing token validation never takes a pooled connection."""
+    response = client.get("/api/v1/households/mine", headers={"Authorization": "Bearer not-a-jwt"})
+
+    assert response.status_code == 401
+    assert checkouts == []
@@ -0,0 +1,107 @@
+"""
+Tests for connection pool warming and keepalive.
+"""
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.db_warmup import ConnectionWarmer, connection_warmer, in_active_hours, parse_active_hours, warm_pool
+from app.services.health import ReadinessMonitor
+
+
+def at_hour(hour):
+    """A UTC datetime at the given hour."""
+    return datetime(2024, 1, 1, hour, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.unit
+def test_active_hours():
+    """Test parsing and matching of keepalive hours, including ranges past midnight."""
+    assert parse_active_hours("") is None
+    assert parse_active_hours("7-23") == (7, 23)
+    assert in_active_hours((7, 23), at_hour(7))
+    assert not in_active_hours((7, 23), at_hour(23))
+    assert in_active_hours((22, 6), at_hour(2))
+    assert not in_active_hours((22, 6), at_hour(12))
+    assert not in_active_hours(None, at_hour(12))
+
+    for spec in ("7", "7-7", "25-3", "morning"):
+        with pytest.raises(ValueError):
+            parse_active_hours(spec)
+
+
+@pytest.mark.unit
+def test_warm_pool_opens_distinct_connections(tmp_path):
+    """Test that warming leaves the requested connections idle in the pool, up to its size."""
+    engine = create_engine(f"sqlite:///{tmp_path}/warm.db", poolclass=QueuePool, pool_size=3)
+
+    with patch("app.core.db_warmup.engine", engine):
+        assert warm_pool(2) == 2
+        assert engine.pool.checkedin() == 2
+        assert warm_pool(10) == 3
+        assert engine.pool.checkedin() == 3
+        assert engine.pool.checkedout() == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_readiness_reports_warming():
+    """Test that readiness is "warming" until startup warming finishes, then rechecked."""
+    monitor = ReadinessMonitor()
+    result = {"status": "unhealthy", "checks": {"database": "unhealthy", "database_latency_ms": None}}
+    healthy = {"status": "healthy", "checks": {"database": "healthy", "database_latency_ms": 1.0}}
+
+    with patch.object(connection_warmer, "state", ConnectionWarmer.WARMING), \
+            patch("app.services.health.check_readiness", return_value=result):
+        readiness = await monitor.status()
+    assert readiness["status"] == "warming"
+    assert readiness["checks"]["warmup"] == "warming"
+
+    with patch.object(connection_warmer, "state", ConnectionWarmer.WARM), \
+            patch("app.services.health.check_readiness", return_value=healthy) as check:
+        readiness = await monitor.status()
+    assert readiness["status"] == "healthy"
+    assert readiness["checks"]["warmup"] == "warm"
+    check.assert_called_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_keepalive_skips_while_traffic_keeps_database_awake():
+    """Test that the keepalive only pings during active hours when nothing else has."""
+    warmer = ConnectionWarmer()
+    recent = {"value": (0.0, 0.001)}
+
+    with patch.object(settings, "DB_KEEPALIVE_HOURS", "0-24"), \
+            patch.object(settings, "DB_KEEPALIVE_INTERVAL_SECONDS", 0.01), \
+            patch.object(warmer, "warm", AsyncMock()) as warm, \
+            patch("app.core.db_warmup.last_query", side_effect=lambda: recent["value"]):
+        await warmer.start()
+        await asyncio.sleep(0.05)
+        assert warm.await_count == 1
+
+        recent["value"] = None
+        await asyncio.sleep(0.05)
+        await warmer.stop()
+
+    assert warm.await_count > 1
+
+
+@pytest.mark.integration
+@pytest.mark.asyncio
+async def test_startup_warming_reaches_warm():
+    """Test that warming the app's own engine completes."""
+    warmer = ConnectionWarmer()
+
+    await warmer.start()
+    for _ in range(100):
+        if not warmer.warming:
+            break
+        await asyncio.sleep(0.01)
+    await warmer.stop()
+
+    assert warmer.state == ConnectionWarmer.WARM
@@ -1,9 +1,19 @@
 """
 Tests for health check endpoint.
 """
+import asyncio
 import pytest
+from unittest.mock import MagicMock, patch
 from fastapi import status
 
+from app.core.config import settings
+from app.services.health import ReadinessMonitor, check_database
+
+
+def readiness_result(status_value="healthy"):
+    """A readiness result as check_readiness returns it."""
+    return {"status": status_value, "checks": {"database": status_value, "database_latency_ms": None}}
+
 
 def test_health_check(client):
     """
@@ -48,3 +58,75 @@ def test_health_check_structure(client):
     # Check data types
     assert isinstance(data["status"], str)
     assert isinstance(data["database"], str)
+
+
+@pytest.mark.unit
+def test_liveness_does_no_io(client):
+    """Test that the liveness probe doesn't run readiness checks."""
+    with patch("app.services.health.check_readiness") as check:
+        response = client.get("/health/live")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "alive"}
+    check.assert_not_called()
+
+
+@pytest.mark.unit
+def test_database_check_skipped_after_recent_traffic():
+    """Test that a recent successful query stands in for the database probe."""
+    with patch("app.services.health.get_db_with_retry") as connect, \
+            patch("app.services.health.last_query", return_value=(1.0, 0.002)):
+        result = check_database()
+
+    assert result["database"] == "healthy"
+    assert result["database_latency_ms"] == 2.0
+    assert result["database_checked_by"] == "traffic"
+    connect.assert_not_called()
+
+    with patch("app.services.health.get_db_with_retry") as connect, \
+            patch("app.services.health.last_query", return_value=None):
+        result = check_database()
+
+    assert result["database_checked_by"] == "probe"
+    connect.assert_called_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_readiness_is_cached_and_refreshed_in_background():
+    """Test that stale readiness is served at once while a background refresh runs."""
+    monitor = ReadinessMonitor()
+    check = MagicMock(side_effect=[readiness_result("healthy"), readiness_result("unhealthy")])
+
+    with patch("app.services.health.check_readiness", check):
+        await monitor.start()
+        try:
+            assert (await monitor.status())["status"] == "healthy"
+            assert (await monitor.status())["status"] == "healthy"
+            assert check.call_count == 1
+
+            with patch.object(settings, "HEALTH_CACHE_SECONDS", 0):
+                assert (await monitor.status())["status"] == "healthy"
+                for _ in range(100):
+                    if check.call_count == 2:
+                        break
+                    await asyncio.sleep(0.01)
+            assert (await monitor.status())["status"] == "unhealthy"
+        finally:
+            await monitor.stop()
+
+
+@pytest.mark.integration
+def test_readiness_reports_unavailable_database(client):
+    """Test that the readiness probe answers 503 when the database can't be reached."""
+    with patch("app.main.readiness_monitor", ReadinessMonitor()), \
+            patch("app.services.health.last_query", return_value=None), \
+            patch("app.services.health.get_db_with_retry", side_effect=ConnectionError("no route to host")):
+        ready = client.get("/health/ready")
+        health = client.get("/health")
+
+    assert ready.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert ready.json()["checks"]["database_error"] == "no route to host"
+    assert "pool" in ready.json()["checks"] and "ai" in ready.json()["checks"]
+    assert health.status_code == status.HTTP_200_OK
+    assert health.json()["database"] == "disconnected"
@@ -0,0 +1,193 @@
+"""
+Tests for the local expense categorizer.
+"""
+import pytest
+import uuid
+
+from app.models.user import User
+from app.models.household import Household
+from app.models.expense import Expense, ExpenseCategory
+from app.services.ai_service import AIService
+from app.services.categorization_cache import CategorizationCache
+from app.services.local_categorizer import (
+    LocalCategorizer,
+    NaiveBayesModel,
+    evaluate,
+    match_keywords,
+    predict,
+)
+
+TRAINING_ROWS = [
+    ("Corner shop veg", ExpenseCategory.GROCERIES),
+    ("Corner shop milk and eggs", ExpenseCategory.GROCERIES),
+    ("Corner shop bread", ExpenseCategory.GROCERIES),
+    ("Veg box delivery", ExpenseCategory.GROCERIES),
+    ("Milk run", ExpenseCategory.GROCERIES),
+    ("Thames bill", ExpenseCategory.UTILITIES),
+    ("Octopus bill", ExpenseCategory.UTILITIES),
+    ("Octopus top up", ExpenseCategory.UTILITIES),
+    ("Thames quarterly bill", ExpenseCategory.UTILITIES),
+    ("Friday curry night", ExpenseCategory.FOOD),
+    ("Curry house", ExpenseCategory.FOOD),
+    ("Curry takeaway", ExpenseCategory.FOOD),
+]
+
+
+class CountingProvider:
+    """Provider double that counts categorization calls."""
+
+    name = "fake"
+
+    def __init__(self, confidence=0.9):
+        self.calls = 0
+        self.confidence = confidence
+
+    def is_available(self):
+        return True
+
+    async def aclose(self):
+        return None
+
+    async def categorize_expense(self, description, amount, context=None):
+        self.calls += 1
+        return {
+            "category": "Shopping" if self.confidence else "Other",
+            "subcategory": None,
+            "confidence": self.confidence,
+            "reasoning": "Provider",
+            "suggested_tags": [],
+        }
+
+
+@pytest.fixture
+def household_with_history(db_session):
+    """Create a household with categorized expenses to learn from."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.flush()
+    household = Household(name="Test House", created_by=user.id)
+    db_session.add(household)
+    db_session.flush()
+    for description, category in TRAINING_ROWS:
+        db_session.add(Expense(
+            household_id=household.id,
+            created_by=user.id,
+            amount=10,
+            description=description,
+            category=category,
+        ))
+    db_session.commit()
+    return household
+
+
+def make_service(provider):
+    """Build an AI service with a fresh cache and local categorizer."""
+    return AIService(cache=CategorizationCache(), local=LocalCategorizer(), providers=[provider])
+
+
+@pytest.mark.unit
+def test_keyword_rules():
+    """Test that unambiguous keywords match and conflicting ones do not."""
+    assert match_keywords("Tesco Express") == "Groceries"
+    assert match_keywords("Uber to airport") == "Transportation"
+    assert match_keywords("Uber Eats") is None
+    assert match_keywords("Birthday present") is None
+
+
+@pytest.mark.unit
+def test_naive_bayes_learns_household_vocabulary():
+    """Test that the model picks up words the keyword rules don't know."""
+    model = NaiveBayesModel().fit(
+        (description, category.value) for description, category in TRAINING_ROWS
+    )
+
+    label, probability = model.predict("octopus energy bill")
+    assert label == "utilities"
+    assert probability > 0.5
+    assert model.predict("completely unseen words") is None
+
+
+@pytest.mark.unit
+def test_model_needs_enough_categories_and_evidence():
+    """Test that a one-category model or stopwords alone can't outvote the keyword rules."""
+    groceries_only = NaiveBayesModel().fit(
+        ("Weekly shop at the market", "Groceries") for _ in range(20)
+    )
+    assert groceries_only.predict("the council tax bill") is None
+    assert predict("the council tax bill", groceries_only)[0] == "Utilities"
+
+    flat = NaiveBayesModel().fit(
+        [("Flat rent", "Rent")] * 10 + [("Corner shop veg", "Groceries")] * 10
+    )
+    label, confidence = flat.predict("flat repairs")
+    assert label == "Rent"
+    assert confidence < 0.8
+    assert predict("flat repairs", flat)[0] == "Home Maintenance"
+    assert flat.predict("the and of") is None
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_confident_local_answer_skips_llm(db_session, household_with_history):
+    """Test that household-specific descriptions are answered without the provider."""
+    provider = CountingProvider()
+    service = make_service(provider)
+
+    result = await service.categorize_expense(
+        "Corner shop veg", 8.0, household_id=household_with_history.id, db=db_session
+    )
+
+    assert provider.calls == 0
+    assert result["source"] == "local"
+    assert result["category"] == "Groceries"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_uncertain_cases_escalate_to_llm(db_session, household_with_history):
+    """Test that descriptions the local categorizer can't place go to the provider."""
+    provider = CountingProvider()
+    service = make_service(provider)
+
+    result = await service.categorize_expense(
+        "Birthday present", 30.0, household_id=household_with_history.id, db=db_session
+    )
+
+    assert provider.calls == 1
+    assert result["source"] == "ai"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_local_guess_replaces_failed_llm_call(db_session, household_with_history):
+    """Test that a failed provider call falls back to the local guess, not "Other"."""
+    provider = CountingProvider(confidence=0.0)
+    service = make_service(provider)
+
+    result = await service.categorize_expense(
+        "Curry and milk", 12.0, household_id=household_with_history.id, db=db_session
+    )
+
+    assert provider.calls == 1
+    assert result["source"] == "local"
+    assert result["category"] in ("Dining", "Groceries")
+    assert 0 < result["confidence"]
+
+
+@pytest.mark.unit
+def test_evaluate_reports_accuracy_and_savings():
+    """Test the offline evaluation report."""
+    rows = TRAINING_ROWS * 2 + [("Tesco", ExpenseCategory.GROCERIES), ("Curry house", ExpenseCategory.FOOD)]
+
+    report = evaluate(rows, holdout=0.25, min_confidence=0.8)
+
+    assert report["evaluated"] == 6
+    assert 0 < report["answered_locally"] <= report["evaluated"]
+    assert report["accuracy"] == 1.0
+    assert report["llm_calls_saved"] == report["answered_locally"] / report["evaluated"]
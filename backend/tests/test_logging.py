@@ -0,0 +1,67 @@
+"""
+Tests for the queued structured logging pipeline.
+"""
+import io
+import json
+import threading
+import pytest
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.logging import get_logger, log_context, clear_log_context, setup_logging, shutdown_logging, should_log_request
+
+
+class ThreadRecordingStream(io.StringIO):
+    """Stream remembering which threads wrote to it."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def write(self, text):
+        self.threads.add(threading.get_ident())
+        return super().write(text)
+
+
+@pytest.fixture
+def json_logs():
+    """Route logs through the queue into a stream as JSON, restoring stdout logging afterwards."""
+    stream = ThreadRecordingStream()
+    with patch.object(settings, "ENVIRONMENT", "production"):
+        setup_logging(stream=stream)
+    yield stream
+    shutdown_logging()
+    setup_logging()
+
+
+@pytest.mark.unit
+def test_logs_are_written_off_thread_as_json(json_logs):
+    """Test that log lines keep their context and are written by the listener thread."""
+    log_context(request_id="abc123")
+    try:
+        get_logger("tests").info("Request completed", status_code=200)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("tests").exception("Request failed")
+    finally:
+        clear_log_context()
+    shutdown_logging()
+
+    lines = [json.loads(line) for line in json_logs.getvalue().splitlines()]
+    completed = next(line for line in lines if line["event"] == "Request completed")
+    failed = next(line for line in lines if line["event"] == "Request failed")
+    assert completed["request_id"] == "abc123"
+    assert completed["status_code"] == 200
+    assert "ValueError: boom" in failed["exception"]
+    assert threading.get_ident() not in json_logs.threads
+
+
+@pytest.mark.unit
+def test_success_logs_are_sampled_per_route():
+    """Test that route sample rates apply to successes only."""
+    with patch.object(settings, "LOG_ROUTE_SAMPLE_RATES", {"/health": 0.0}), \
+            patch.object(settings, "LOG_SUCCESS_SAMPLE_RATE", 1.0):
+        assert should_log_request("/health", 200) is None
+        assert should_log_request("/health", 503) == 1.0
+        assert should_log_request("/api/v1/todos/", 200) == 1.0
@@ -0,0 +1,123 @@
+"""
+Tests for household membership claims embedded in access tokens.
+"""
+import pytest
+import uuid
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.security import create_access_token, decode_access_token
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+
+
+@pytest.fixture(autouse=True)
+def embed_memberships():
+    """Enable membership claims for every test in this module."""
+    with patch.object(settings, "JWT_EMBED_MEMBERSHIPS", True):
+        yield
+
+
+@pytest.fixture
+def test_user(db_session):
+    """Create a test user."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def household(db_session, test_user):
+    """Create a household owned by the test user."""
+    household = Household(name="Test House", created_by=test_user.id)
+    db_session.add(household)
+    db_session.flush()
+    db_session.add(
+        HouseholdMember(user_id=test_user.id, household_id=household.id, role=MemberRole.OWNER)
+    )
+    db_session.commit()
+    return household
+
+
+def refresh_token_for(client, user):
+    """Exchange a plain token for one carrying membership claims."""
+    plain = create_access_token({"sub": str(user.id)})
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": plain})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+@pytest.mark.integration
+def test_refresh_embeds_memberships(client, test_user, household):
+    """Test that refreshed tokens carry household roles and the membership version."""
+    payload = decode_access_token(refresh_token_for(client, test_user))
+
+    assert payload["hh"] == {str(household.id): "owner"}
+    assert payload["mv"] == test_user.membership_version
+
+
+@pytest.mark.integration
+def test_claims_authorize_without_membership_row(client, test_user, household, db_session):
+    """Test that household access is granted from claims alone."""
+    token = refresh_token_for(client, test_user)
+
+    # Drop the row behind the server's back; the claims are still trusted
+    db_session.query(HouseholdMember).delete()
+    db_session.commit()
+
+    response = client.get(
+        f"/api/v1/todos/?household_id={household.id}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.integration
+def test_claims_deny_other_households(client, test_user, household):
+    """Test that households missing from the claims are rejected."""
+    token = refresh_token_for(client, test_user)
+
+    response = client.get(
+        f"/api/v1/todos/?household_id={uuid.uuid4()}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.integration
+def test_membership_change_invalidates_claims(client, test_user, household, db_session):
+    """Test that leaving a household forces a token refresh."""
+    token = refresh_token_for(client, test_user)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.post(f"/api/v1/households/{household.id}/leave", headers=headers)
+    assert response.status_code == 204
+
+    response = client.get("/api/v1/auth/me", headers=headers)
+    assert response.status_code == 401
+
+    # A refreshed token reflects the new memberships
+    db_session.refresh(test_user)
+    payload = decode_access_token(refresh_token_for(client, test_user))
+    assert payload["hh"] == {}
+    assert payload["mv"] == test_user.membership_version
+
+
+@pytest.mark.integration
+def test_tokens_without_claims_fall_back_to_database(client, test_user, household):
+    """Test that tokens issued without claims still authorize via the database."""
+    token = create_access_token({"sub": str(test_user.id)})
+
+    response = client.get(
+        f"/api/v1/todos/?household_id={household.id}",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
@@ -0,0 +1,116 @@
+"""
+Tests for HTTP metrics labelling.
+"""
+import os
+import subprocess
+import sys
+import pytest
+import uuid
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from app.core.metrics import UNMATCHED_ROUTE, get_metrics
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+def endpoint_labels(metric="http_requests_total"):
+    """All endpoint label values currently exported for a metric."""
+    return {
+        sample.labels["endpoint"]
+        for family in REGISTRY.collect() if family.name == metric.removesuffix("_total")
+        for sample in family.samples if "endpoint" in sample.labels
+    }
+
+
+@pytest.mark.unit
+def test_requests_are_labelled_by_route_template(client):
+    """Test that IDs in the path don't show up in metric labels."""
+    todo_id = uuid.uuid4()
+    client.get(f"/api/v1/todos/{todo_id}")
+
+    labels = endpoint_labels()
+    assert "/api/v1/todos/{todo_id}" in labels
+    assert not any(str(todo_id) in label for label in labels)
+
+
+@pytest.mark.unit
+def test_unknown_paths_share_one_label(client):
+    """Test that requests matching no route are counted under a single label."""
+    for _ in range(5):
+        response = client.get(f"/does-not-exist/{uuid.uuid4()}")
+        assert response.status_code == 404
+
+    samples = [
+        sample for family in REGISTRY.collect() if family.name == "http_requests"
+        for sample in family.samples
+        if sample.name == "http_requests_total" and sample.labels["endpoint"] == UNMATCHED_ROUTE
+    ]
+    assert sum(sample.value for sample in samples) >= 5
+
+
+@pytest.mark.unit
+def test_label_cardinality_is_bounded_by_routes(client):
+    """Test that many distinct URLs add no labels beyond their route templates."""
+    before = {metric: endpoint_labels(metric) for metric in ("http_requests_total", "http_request_duration_seconds")}
+    item_ids = [uuid.uuid4() for _ in range(20)]
+    for item_id in item_ids:
+        client.get(f"/api/v1/todos/{item_id}")
+        client.delete(f"/api/v1/households/{item_id}")
+        client.get(f"/api/v1/unknown/{item_id}")
+
+    expected = {"/api/v1/todos/{todo_id}", "/api/v1/households/{household_id}", UNMATCHED_ROUTE}
+    for metric, labels in before.items():
+        assert endpoint_labels(metric) - labels <= expected
+    for label in endpoint_labels("http_requests_in_progress"):
+        assert not any(str(item_id) in label for item_id in item_ids)
+
+
+@pytest.mark.unit
+def test_in_progress_gauge_returns_to_zero(client):
+    """Test that finished requests are no longer counted as in progress."""
+    client.get(f"/api/v1/todos/{uuid.uuid4()}")
+
+    gauge = REGISTRY.get_sample_value(
+        "http_requests_in_progress", {"method": "GET", "endpoint": "/api/v1/todos/{todo_id}"}
+    )
+    assert gauge == 0
+
+
+@pytest.mark.unit
+def test_multiprocess_metrics_are_aggregated_across_workers(tmp_path):
+    """Test that /metrics sums counters written by separate worker processes."""
+    worker = (
+        "from app.core.metrics import HTTP_REQUESTS_TOTAL; "
+        "HTTP_REQUESTS_TOTAL.labels(method='GET', endpoint='/workers', status_code=200).inc()"
+    )
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+
+    with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}):
+        body = get_metrics().body.decode()
+
+    assert 'http_requests_total{endpoint="/workers",method="GET",status_code="200"} 2.0' in body
+
+
+@pytest.mark.unit
+def test_database_queries_are_counted_per_request(client, db_session):
+    """Test that the query count is returned in X-DB-Queries and statements are timed."""
+    before = REGISTRY.get_sample_value(
+        "db_query_duration_seconds_count", {"operation": "select", "table": "users"}
+    ) or 0
+
+    user = User(id=uuid.uuid4(), email="test@example.com", full_name="Test User", google_id="google-123", is_active=True)
+    db_session.add(user)
+    db_session.commit()
+    token = create_access_token({"sub": str(user.id)})
+    response = client.get("/api/v1/households/mine", headers={"Authorization": f"Bearer {token}"})
+
+    # Loading the user, then their memberships
+    assert int(response.headers["X-DB-Queries"]) >= 2
+    after = REGISTRY.get_sample_value(
+        "db_query_duration_seconds_count", {"operation": "select", "table": "users"}
+    )
+    assert after > before
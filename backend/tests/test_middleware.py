@@ -0,0 +1,36 @@
+"""
+Tests for the request logging middleware.
+"""
+import pytest
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestLoggingMiddleware
+
+
+@pytest.mark.unit
+def test_responses_carry_request_id(client):
+    """Test that matched and unmatched requests both get a request ID."""
+    assert len(client.get("/").headers["X-Request-ID"]) == 8
+    assert len(client.get("/does-not-exist").headers["X-Request-ID"]) == 8
+
+
+@pytest.mark.unit
+def test_streaming_responses_pass_through():
+    """Test that streamed bodies are forwarded chunk by chunk with headers added."""
+    streaming_app = FastAPI()
+
+    @streaming_app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"first,", b"second"]), media_type="text/plain")
+
+    streaming_app.add_middleware(RequestLoggingMiddleware)
+
+    with TestClient(streaming_app) as test_client:
+        with test_client.stream("GET", "/stream") as response:
+            chunks = list(response.iter_bytes())
+
+    assert b"".join(chunks) == b"first,second"
+    assert "X-Request-ID" in response.headers
@@ -0,0 +1,67 @@
+"""
+Tests for N+1 query detection.
+"""
+import pytest
+import uuid
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.db_metrics import NPlusOneError, statement_shape
+from app.core.security import create_access_token
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+
+
+@pytest.fixture
+def member_of_many(db_session):
+    """Create a user who belongs to enough households to trip the detector."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.flush()
+    for index in range(4):
+        household = Household(name=f"House {index}", created_by=user.id)
+        db_session.add(household)
+        db_session.flush()
+        db_session.add(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.OWNER))
+    db_session.commit()
+    return user
+
+
+@pytest.mark.unit
+def test_statement_shape_ignores_values():
+    """Test that statements differing only in values share a shape."""
+    first = statement_shape("SELECT * FROM todos WHERE id = ? AND title = 'bins' AND id IN (?, ?)")
+    second = statement_shape("SELECT *  FROM todos\nWHERE id = ? AND title = 'dishes' AND id IN (?, ?, ?, ?)")
+    assert first == second
+
+
+@pytest.mark.integration
+def test_repeated_queries_fail_the_request(client, member_of_many):
+    """Test that a request repeating a query past the threshold raises in raise mode."""
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(member_of_many.id)})}"}
+
+    with patch.object(settings, "N_PLUS_ONE_THRESHOLD", 2):
+        with pytest.raises(NPlusOneError, match="households.py"):
+            client.get("/api/v1/households/mine", headers=headers)
+
+
+@pytest.mark.integration
+def test_repeated_queries_are_only_logged_in_log_mode(client, member_of_many):
+    """Test that log mode reports the pattern without failing the request."""
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(member_of_many.id)})}"}
+
+    with patch.object(settings, "N_PLUS_ONE_THRESHOLD", 2), \
+            patch.object(settings, "N_PLUS_ONE_DETECTION", "log"), \
+            patch("app.core.db_metrics.logger") as logger:
+        response = client.get("/api/v1/households/mine", headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 4
+    call_sites = [call.kwargs["call_site"] for call in logger.warning.call_args_list]
+    assert call_sites and all("list_my_households" in site for site in call_sites)
@@ -0,0 +1,81 @@
+"""
+Tests for the slow-request sampling profiler.
+"""
+import time
+import pytest
+import uuid
+from unittest.mock import patch
+
+from app.core.config import settings
+from app.core.profiling import request_profiler, sign_profile_token, verify_profile_token
+from app.core.security import create_access_token
+from app.models.user import User
+
+
+@pytest.fixture
+def admin_headers(db_session):
+    """Create an admin user and return their auth headers."""
+    user = User(
+        id=uuid.uuid4(),
+        email="admin@example.com",
+        full_name="Admin User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+    request_profiler.profiles.clear()
+    with patch.object(settings, "ADMIN_EMAILS", ["admin@example.com"]):
+        yield {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    request_profiler.profiles.clear()
+
+
+@pytest.mark.unit
+def test_profile_token_signature_and_expiry():
+    """Test that only correctly signed, unexpired tokens are accepted."""
+    token = sign_profile_token(int(time.time()) + 60)
+    assert verify_profile_token(token)
+    assert not verify_profile_token(token[:-1] + ("0" if token[-1] != "0" else "1"))
+    assert not verify_profile_token(sign_profile_token(int(time.time()) - 1))
+    assert not verify_profile_token("garbage")
+    assert not verify_profile_token(None)
+
+
+@pytest.mark.integration
+def test_signed_header_profiles_request(client, admin_headers):
+    """Test that a request with a signed X-Profile header is kept and served as collapsed stacks."""
+    token = client.post("/api/v1/admin/profiles/token", headers=admin_headers).json()["token"]
+
+    client.get("/health", headers={"X-Profile": token})
+    profiles = client.get("/api/v1/admin/profiles", headers=admin_headers).json()
+
+    assert [profile["endpoint"] for profile in profiles] == ["/health"]
+    assert profiles[0]["forced"] is True
+
+    response = client.get(f"/api/v1/admin/profiles/{profiles[0]['id']}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for line in response.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+
+@pytest.mark.integration
+def test_only_slow_requests_are_kept(client, admin_headers):
+    """Test that with profiling enabled, requests under the threshold are discarded."""
+    with patch.object(settings, "PROFILING_ENABLED", True):
+        with patch.object(settings, "PROFILE_SLOW_REQUEST_MS", 60_000):
+            client.get("/health")
+        assert len(request_profiler.profiles) == 0
+
+        with patch.object(settings, "PROFILE_SLOW_REQUEST_MS", 0):
+            client.get("/health")
+        assert [profile.endpoint for profile in request_profiler.profiles] == ["/health"]
+
+
+@pytest.mark.integration
+def test_profiles_require_admin(client, admin_headers):
+    """Test that non-admin users can't read profiles."""
+    with patch.object(settings, "ADMIN_EMAILS", []):
+        response = client.get("/api/v1/admin/profiles", headers=admin_headers)
+    assert response.status_code == 403
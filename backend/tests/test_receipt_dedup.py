@@ -0,0 +1,157 @@
+"""
+Tests for receipt deduplication by perceptual hash.
+"""
+import io
+import pytest
+import random
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+
+from PIL import Image, ImageDraw
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+from app.models.expense import Expense
+from app.models.receipt import ReceiptScan
+from app.services.ai_service import get_ai_service
+from app.services.receipt_processing import hamming_distance, preprocess_receipt_image, receipt_dhash
+
+
+def make_receipt_photo(seed, quality=90, size=(1200, 1600)):
+    """Build a receipt photo whose line layout depends on the seed."""
+    rng = random.Random(seed)
+    width, height = 1200, 1600
+    image = Image.new("RGB", (width, height), (50, 40, 30))
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = width // 5, height // 10, width * 4 // 5, height * 9 // 10
+    draw.rectangle((left, top, right, bottom), fill=(245, 245, 240))
+    y = top + 40
+    while y < bottom - 60:
+        line_right = left + 30 + rng.randint(width // 10, right - left - 60)
+        draw.rectangle((left + 30, y, line_right, y + rng.randint(10, 40)), fill=(20, 20, 20))
+        y += rng.randint(50, 120)
+
+    output = io.BytesIO()
+    image.resize(size).save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+class CountingOCRService:
+    """AI service double returning a fixed extraction."""
+
+    def __init__(self, total=12.5):
+        self.calls = 0
+        self.total = total
+
+    async def extract_receipt_data(self, image_data, mime_type="image/jpeg", preprocess=True):
+        self.calls += 1
+        return {"success": True, "merchant": "Tesco", "date": "2026-10-18", "total": self.total, "items": []}
+
+
+@pytest.fixture(autouse=True)
+def preprocess_in_thread():
+    """Avoid spawning worker processes."""
+    with patch.object(settings, "RECEIPT_PREPROCESS_WORKERS", 0):
+        yield
+
+
+@pytest.fixture
+def household_member(db_session):
+    """Create a user who owns a household."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.flush()
+    household = Household(name="Test House", created_by=user.id)
+    db_session.add(household)
+    db_session.flush()
+    db_session.add(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.OWNER))
+    db_session.commit()
+    return user, household
+
+
+@pytest.mark.unit
+def test_dhash_tolerates_reencoding_but_not_different_receipts():
+    """Test that the same receipt hashes close together and different ones far apart."""
+    original = receipt_dhash(preprocess_receipt_image(make_receipt_photo(1)))
+    reshot = receipt_dhash(preprocess_receipt_image(make_receipt_photo(1, quality=60, size=(1080, 1440))))
+    other = receipt_dhash(preprocess_receipt_image(make_receipt_photo(2)))
+
+    assert hamming_distance(original, reshot) <= settings.RECEIPT_DEDUP_MAX_DISTANCE
+    assert hamming_distance(original, other) > settings.RECEIPT_DEDUP_MAX_DISTANCE
+
+
+@pytest.mark.integration
+def test_rescanned_receipt_is_flagged(client, db_session, household_member):
+    """Test that re-uploads skip OCR, reshots are confirmed by OCR, and both flag the matching expense."""
+    user, household = household_member
+    fake = CountingOCRService()
+    app.dependency_overrides[get_ai_service] = lambda: fake
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    url = f"/api/v1/expenses/ai/ocr?household_id={household.id}"
+
+    first = client.post(url, files={"file": ("r.jpg", make_receipt_photo(1), "image/jpeg")}, headers=headers)
+    assert first.status_code == 200
+    assert first.json()["duplicate_of"] is None
+    assert first.json()["possible_duplicate_expenses"] == []
+
+    expense = Expense(
+        household_id=household.id,
+        created_by=user.id,
+        amount=12.50,
+        description="Tesco",
+        date=datetime(2026, 10, 18, 19, 30),
+    )
+    db_session.add(expense)
+    db_session.commit()
+
+    reupload = client.post(url, files={"file": ("r.jpg", make_receipt_photo(1), "image/jpeg")}, headers=headers)
+    assert fake.calls == 1
+    assert reupload.json()["duplicate_of"]["scan_id"] == first.json()["scan_id"]
+    assert reupload.json()["possible_duplicate_expenses"] == [str(expense.id)]
+
+    reshot = make_receipt_photo(1, quality=60, size=(1080, 1440))
+    second = client.post(url, files={"file": ("r.jpg", reshot, "image/jpeg")}, headers=headers)
+    body = second.json()
+
+    assert fake.calls == 2
+    assert body["merchant"] == "Tesco"
+    assert body["duplicate_of"]["scan_id"] == first.json()["scan_id"]
+    assert body["possible_duplicate_expenses"] == [str(expense.id)]
+    assert db_session.query(ReceiptScan).count() == 1
+
+    different = make_receipt_photo(2)
+    client.post(url, files={"file": ("r.jpg", different, "image/jpeg")}, headers=headers)
+    assert fake.calls == 3
+
+
+@pytest.mark.integration
+def test_similar_looking_receipts_with_different_details_do_not_match(client, db_session, household_member):
+    """Test that a receipt hashing close to an earlier one isn't a duplicate when its details differ."""
+    user, household = household_member
+    fake = CountingOCRService()
+    app.dependency_overrides[get_ai_service] = lambda: fake
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    url = f"/api/v1/expenses/ai/ocr?household_id={household.id}"
+
+    first = client.post(url, files={"file": ("r.jpg", make_receipt_photo(1), "image/jpeg")}, headers=headers)
+
+    fake.total = 48.2
+    lookalike = make_receipt_photo(1, quality=60, size=(1080, 1440))
+    second = client.post(url, files={"file": ("r.jpg", lookalike, "image/jpeg")}, headers=headers)
+    body = second.json()
+
+    assert fake.calls == 2
+    assert body["total"] == 48.2
+    assert body["duplicate_of"] is None
+    assert body["scan_id"] != first.json()["scan_id"]
+    assert db_session.query(ReceiptScan).count() == 2
@@ -0,0 +1,473 @@
+"""
+Tests for background receipt OCR jobs.
+"""
+import asyncio
+import hashlib
+import hmac
+import io
+import pytest
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base, utc_now
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.models.receipt import ReceiptJob, ReceiptJobStatus
+from app.services.receipt_jobs import (
+    DatabaseReceiptJobQueue,
+    InProcessReceiptJobQueue,
+    ReceiptJobQueue,
+    WebhookURLError,
+    get_receipt_job_queue,
+    submit_receipt_job,
+    validate_webhook_url,
+)
+
+
+def make_image():
+    """Build a small JPEG."""
+    output = io.BytesIO()
+    Image.new("RGB", (200, 300), (240, 240, 240)).save(output, format="JPEG")
+    return output.getvalue()
+
+
+class FlakyOCRService:
+    """AI service double that raises for the first ``failures`` calls."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    async def extract_receipt_data(self, image_data, mime_type="image/jpeg", preprocess=True):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("provider unreachable")
+        return {"success": True, "merchant": "Tesco", "total": 12.5, "items": []}
+
+
+class RecordingQueue:
+    """Queue double recording notifications."""
+
+    def __init__(self):
+        self.notified = []
+
+    def notify(self, job_id):
+        self.notified.append(job_id)
+
+
+@pytest.fixture(autouse=True)
+def fast_jobs():
+    """Preprocess in a thread and retry almost immediately."""
+    with patch.object(settings, "RECEIPT_PREPROCESS_WORKERS", 0), \
+            patch.object(settings, "RECEIPT_JOB_RETRY_BASE_SECONDS", 0.01), \
+            patch.object(settings, "RECEIPT_JOB_POLL_SECONDS", 0.01):
+        yield
+
+
+@pytest.fixture
+def db_session(tmp_path):
+    """
+    A database file rather than the shared in-memory one.
+
+    Queue workers run their database work in threads, so each needs its own
+    connection, as they would from a real pool.
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False, "timeout": 10}
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def test_user(db_session):
+    """Create a test user."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def make_queue(queue_class, db_session, ai_service):
+    """Build a single-worker queue sharing the test database."""
+    return queue_class(
+        workers=1,
+        session_factory=sessionmaker(bind=db_session.get_bind()),
+        ai_service_factory=lambda: ai_service,
+    )
+
+
+async def wait_for_status(db_session, job_id, statuses, timeout=2.0):
+    """Poll the job until it reaches one of the given statuses."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        db_session.expire_all()
+        job = db_session.query(ReceiptJob).filter(ReceiptJob.id == job_id).first()
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job.status}")
+
+
+async def wait_for_awaits(mock, count, timeout=2.0):
+    """Wait until an AsyncMock has been awaited ``count`` times; outcomes are committed before webhooks are sent."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while mock.await_count < count and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_in_process_queue_completes_job(db_session, test_user):
+    """Test that a submitted job is processed and its image discarded."""
+    ai_service = FlakyOCRService()
+    queue = make_queue(InProcessReceiptJobQueue, db_session, ai_service)
+    await queue.start()
+    try:
+        job = submit_receipt_job(db_session, make_image(), test_user.id)
+        queue.notify(job.id)
+        await asyncio.wait_for(queue.join(), timeout=2)
+    finally:
+        await queue.stop()
+
+    db_session.expire_all()
+    job = db_session.query(ReceiptJob).filter(ReceiptJob.id == job.id).first()
+    assert job.status == ReceiptJobStatus.COMPLETED
+    assert job.result["merchant"] == "Tesco"
+    assert job.image_data is None
+    assert job.attempts == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_attempts_are_retried_with_backoff(db_session, test_user):
+    """Test that transient failures are retried until the job succeeds."""
+    ai_service = FlakyOCRService(failures=2)
+    queue = make_queue(InProcessReceiptJobQueue, db_session, ai_service)
+    await queue.start()
+    try:
+        job = submit_receipt_job(db_session, make_image(), test_user.id)
+        queue.notify(job.id)
+        job = await wait_for_status(db_session, job.id, {ReceiptJobStatus.COMPLETED, ReceiptJobStatus.FAILED})
+    finally:
+        await queue.stop()
+
+    assert job.status == ReceiptJobStatus.COMPLETED
+    assert job.attempts == 3
+    assert ai_service.calls == 3
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_jobs_fail_after_max_attempts(db_session, test_user):
+    """Test that a job gives up after RECEIPT_JOB_MAX_ATTEMPTS and calls its webhook."""
+    ai_service = FlakyOCRService(failures=10)
+    queue = make_queue(InProcessReceiptJobQueue, db_session, ai_service)
+    with patch.object(ReceiptJobQueue, "_send_webhook", new_callable=AsyncMock) as webhook:
+        await queue.start()
+        try:
+            job = submit_receipt_job(
+                db_session, make_image(), test_user.id, webhook_url="https://example.com/hook"
+            )
+            queue.notify(job.id)
+            job = await wait_for_status(db_session, job.id, {ReceiptJobStatus.FAILED})
+            await wait_for_awaits(webhook, 1)
+        finally:
+            await queue.stop()
+
+    assert job.attempts == settings.RECEIPT_JOB_MAX_ATTEMPTS
+    assert "provider unreachable" in job.error
+    webhook.assert_awaited_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_unreadable_image_fails_without_retry(db_session, test_user):
+    """Test that an upload that isn't an image fails on the first attempt."""
+    ai_service = FlakyOCRService()
+    queue = make_queue(InProcessReceiptJobQueue, db_session, ai_service)
+    await queue.start()
+    try:
+        job = submit_receipt_job(db_session, b"not an image", test_user.id)
+        queue.notify(job.id)
+        job = await wait_for_status(db_session, job.id, {ReceiptJobStatus.FAILED})
+    finally:
+        await queue.stop()
+
+    assert job.attempts == 1
+    assert ai_service.calls == 0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_database_queue_polls_for_jobs(db_session, test_user):
+    """Test that the durable queue picks up jobs submitted without a notification."""
+    ai_service = FlakyOCRService()
+    job = submit_receipt_job(db_session, make_image(), test_user.id)
+
+    queue = make_queue(DatabaseReceiptJobQueue, db_session, ai_service)
+    await queue.start()
+    try:
+        job = await wait_for_status(db_session, job.id, {ReceiptJobStatus.COMPLETED})
+    finally:
+        await queue.stop()
+
+    assert job.result["merchant"] == "Tesco"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_idle_database_queue_backs_off_until_notified(db_session, test_user):
+    """Test that empty polls back off, stale jobs are requeued once, and notify wakes the workers."""
+    ai_service = FlakyOCRService()
+    queue = make_queue(DatabaseReceiptJobQueue, db_session, ai_service)
+
+    with patch.object(settings, "RECEIPT_JOB_MAX_POLL_SECONDS", 0.04), \
+            patch.object(queue, "due_job_ids", wraps=queue.due_job_ids) as polls, \
+            patch.object(queue, "requeue_stale", wraps=queue.requeue_stale) as requeues:
+        await queue.start()
+        try:
+            await asyncio.sleep(0.3)
+            # 0.01, 0.02, then 0.04 s apart, rather than every 0.01 s
+            assert polls.call_count < 12
+            assert requeues.call_count == 1
+
+            with patch.object(settings, "RECEIPT_JOB_POLL_SECONDS", 60), \
+                    patch.object(settings, "RECEIPT_JOB_MAX_POLL_SECONDS", 60):
+                await asyncio.sleep(0.05)
+                job = submit_receipt_job(db_session, make_image(), test_user.id)
+                queue.notify(job.id)
+                job = await wait_for_status(db_session, job.id, {ReceiptJobStatus.COMPLETED})
+        finally:
+            await queue.stop()
+
+    assert queue.poll_interval(0) == settings.RECEIPT_JOB_POLL_SECONDS
+    assert queue.poll_interval(1000) == settings.RECEIPT_JOB_MAX_POLL_SECONDS
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_database_work_runs_off_the_event_loop(db_session, test_user):
+    """Test that polls, requeues, claims and outcome updates don't run on the serving event loop."""
+    ai_service = FlakyOCRService()
+    queue = make_queue(DatabaseReceiptJobQueue, db_session, ai_service)
+    loop_thread = threading.get_ident()
+    threads = {}
+
+    def recording(name, method):
+        def wrapper(*args, **kwargs):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return method(*args, **kwargs)
+        return wrapper
+
+    for name in ("claim", "due_job_ids", "requeue_stale", "_finish"):
+        setattr(queue, name, recording(name, getattr(queue, name)))
+
+    job = submit_receipt_job(db_session, make_image(), test_user.id)
+    await queue.start()
+    try:
+        await wait_for_status(db_session, job.id, {ReceiptJobStatus.COMPLETED})
+    finally:
+        await queue.stop()
+
+    assert set(threads) == {"claim", "due_job_ids", "requeue_stale", "_finish"}
+    assert all(loop_thread not in idents for idents in threads.values())
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_stale_jobs_on_their_last_attempt_fail_instead_of_requeuing(db_session, test_user):
+    """Test that a job whose worker keeps dying is failed once RECEIPT_JOB_MAX_ATTEMPTS is used up."""
+    ai_service = FlakyOCRService()
+    stale_at = utc_now() - timedelta(seconds=settings.RECEIPT_JOB_LEASE_SECONDS + 1)
+    jobs = []
+    for attempts in (1, settings.RECEIPT_JOB_MAX_ATTEMPTS):
+        job = submit_receipt_job(db_session, make_image(), test_user.id, webhook_url="https://example.com/hook")
+        job.status, job.attempts, job.locked_at = ReceiptJobStatus.PROCESSING, attempts, stale_at
+        jobs.append(job.id)
+    db_session.commit()
+    retried, exhausted = jobs
+
+    queue = make_queue(DatabaseReceiptJobQueue, db_session, ai_service)
+    assert queue.claim(db_session, exhausted) is False
+    with patch.object(ReceiptJobQueue, "_send_webhook", new_callable=AsyncMock) as webhook:
+        await queue.start()
+        try:
+            job = await wait_for_status(db_session, exhausted, {ReceiptJobStatus.FAILED})
+            await wait_for_status(db_session, retried, {ReceiptJobStatus.COMPLETED})
+            await wait_for_awaits(webhook, 2)
+        finally:
+            await queue.stop()
+
+    assert job.attempts == settings.RECEIPT_JOB_MAX_ATTEMPTS
+    assert job.image_data is None
+    assert ai_service.calls == 1
+    assert sorted(call.args[0].id for call in webhook.await_args_list) == sorted(jobs)
+
+
+@pytest.mark.unit
+def test_jobs_are_claimed_once(db_session, test_user):
+    """Test that only one worker can claim a job."""
+    job = submit_receipt_job(db_session, make_image(), test_user.id)
+    queue = DatabaseReceiptJobQueue(workers=0)
+
+    assert queue.claim(db_session, job.id) is True
+    assert queue.claim(db_session, job.id) is False
+
+
+@pytest.mark.integration
+def test_submit_and_poll_endpoints(client, db_session, test_user):
+    """Test that submitting returns a pending job visible only to its owner."""
+    queue = RecordingQueue()
+    app.dependency_overrides[get_receipt_job_queue] = lambda: queue
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(test_user.id)})}"}
+
+    response = client.post(
+        "/api/v1/expenses/ai/ocr/jobs",
+        files={"file": ("receipt.jpg", make_image(), "image/jpeg")},
+        headers=headers,
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert response.json()["status"] == "pending"
+    assert [str(notified) for notified in queue.notified] == [job_id]
+
+    response = client.post(
+        "/api/v1/expenses/ai/ocr/jobs",
+        files={"file": ("receipt.jpg", make_image(), "image/jpeg")},
+        data={"webhook_url": "https://169.254.169.254/latest/meta-data"},
+        headers=headers,
+    )
+    assert response.status_code == 400
+    assert len(queue.notified) == 1
+
+    response = client.get(f"/api/v1/expenses/ai/ocr/jobs/{job_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["result"] is None
+
+    other = User(id=uuid.uuid4(), email="other@example.com", full_name="Other", google_id="google-456", is_active=True)
+    db_session.add(other)
+    db_session.commit()
+    other_headers = {"Authorization": f"Bearer {create_access_token({'sub': str(other.id)})}"}
+    response = client.get(f"/api/v1/expenses/ai/ocr/jobs/{job_id}", headers=other_headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", [
+    "https://127.0.0.1/hook",
+    "https://localhost/hook",
+    "https://169.254.169.254/latest/meta-data",
+    "https://10.0.0.5/hook",
+    "https://[::1]/hook",
+    "https://[::ffff:192.168.1.1]/hook",
+    "https://0.0.0.0/hook",
+    "ftp://93.184.216.34/hook",
+])
+async def test_webhooks_to_internal_addresses_are_refused(url):
+    """Test that webhook URLs resolving to non-public addresses are rejected."""
+    with pytest.raises(WebhookURLError):
+        await validate_webhook_url(url)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_webhook_host_allowlist():
+    """Test that public hosts are accepted, and only allowlisted ones once an allowlist is set."""
+    await validate_webhook_url("https://93.184.216.34/hook")
+
+    with patch.object(settings, "RECEIPT_WEBHOOK_ALLOWED_HOSTS", ["hooks.example.com"]):
+        with pytest.raises(WebhookURLError):
+            await validate_webhook_url("https://93.184.216.34/hook")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_webhook_is_checked_again_before_delivery(db_session, test_user):
+    """Test that a webhook whose host now resolves internally is not called."""
+    job = submit_receipt_job(db_session, make_image(), test_user.id, webhook_url="https://127.0.0.1/hook")
+    queue = DatabaseReceiptJobQueue(workers=0)
+
+    with patch("app.services.receipt_jobs.httpx.AsyncClient") as client:
+        await queue._send_webhook(job)
+
+    client.assert_not_called()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_webhooks_are_signed_with_their_own_secret(db_session, test_user):
+    """Test that webhook bodies are signed with RECEIPT_WEBHOOK_SECRET, never SECRET_KEY."""
+    job = submit_receipt_job(db_session, make_image(), test_user.id, webhook_url="https://hooks.example.com/hook")
+    queue = DatabaseReceiptJobQueue(workers=0)
+
+    for secret in ("webhook-secret", ""):
+        with patch.object(settings, "RECEIPT_WEBHOOK_SECRET", secret), \
+                patch("app.services.receipt_jobs.validate_webhook_url", AsyncMock(return_value="93.184.216.34")), \
+                patch("app.services.receipt_jobs.httpx.AsyncClient") as client:
+            post = client.return_value.__aenter__.return_value.post = AsyncMock(return_value=MagicMock())
+            await queue._send_webhook(job)
+
+        body, headers = post.call_args.kwargs["content"], post.call_args.kwargs["headers"]
+        if secret:
+            assert headers["X-Flatmates-Signature"] == hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+            assert headers["X-Flatmates-Signature"] != hmac.new(
+                settings.SECRET_KEY.encode(), body, hashlib.sha256
+            ).hexdigest()
+        else:
+            assert "X-Flatmates-Signature" not in headers
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_webhook_is_sent_to_the_address_that_was_checked(db_session, test_user):
+    """Test that a host re-resolving to an internal address after the check still gets the checked one."""
+    job = submit_receipt_job(db_session, make_image(), test_user.id, webhook_url="https://hooks.example.com:8443/hook?a=1")
+    queue = DatabaseReceiptJobQueue(workers=0)
+    answers = iter(["93.184.216.34", "127.0.0.1", "169.254.169.254"])
+    sent = []
+
+    async def rebinding_getaddrinfo(host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (next(answers), port))]
+
+    def handler(request):
+        sent.append(request)
+        return httpx.Response(200)
+
+    real_client = httpx.AsyncClient
+    loop = asyncio.get_running_loop()
+    with patch.object(loop, "getaddrinfo", side_effect=rebinding_getaddrinfo), \
+            patch("app.services.receipt_jobs.httpx.AsyncClient",
+                  lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)):
+        await queue._send_webhook(job)
+
+    [request] = sent
+    assert request.url.host == "93.184.216.34"
+    assert request.url.port == 8443
+    assert request.url.raw_path == b"/hook?a=1"
+    assert request.headers["Host"] == "hooks.example.com:8443"
+    assert request.extensions["sni_hostname"] == "hooks.example.com"
@@ -0,0 +1,134 @@
+"""
+Tests for receipt image preprocessing.
+"""
+import io
+import pytest
+import uuid
+from unittest.mock import patch
+
+from PIL import Image, ImageDraw
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.services import receipt_processing
+from app.services.ai_service import get_ai_service
+from app.services.receipt_processing import (
+    ReceiptImageError,
+    preprocess_receipt,
+    preprocess_receipt_image,
+)
+
+
+def make_receipt_photo(width=4000, height=3000, orientation=None):
+    """Build a phone-style photo: a white receipt with text on a dark table."""
+    image = Image.new("RGB", (width, height), (60, 45, 30))
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = width // 4, height // 6, width // 2, height * 5 // 6
+    draw.rectangle((left, top, right, bottom), fill=(245, 245, 240))
+    for y in range(top + 50, bottom - 50, 60):
+        draw.rectangle((left + 40, y, right - 40, y + 20), fill=(20, 20, 20))
+
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=95, exif=exif)
+    return output.getvalue()
+
+
+class RecordingAIService:
+    """AI service double recording what reached the provider."""
+
+    def __init__(self):
+        self.uploads = []
+
+    async def extract_receipt_data(self, image_data, mime_type="image/jpeg", preprocess=True):
+        if preprocess:
+            image_data, mime_type = await preprocess_receipt(image_data)
+        self.uploads.append((image_data, mime_type))
+        return {"success": True, "merchant": "Tesco", "total": 12.5, "items": []}
+
+
+@pytest.fixture(autouse=True)
+def preprocess_in_thread():
+    """Avoid spawning worker processes in most tests."""
+    with patch.object(settings, "RECEIPT_PREPROCESS_WORKERS", 0):
+        yield
+
+
+@pytest.mark.unit
+def test_preprocess_shrinks_and_strips_metadata():
+    """Test that photos are rotated, cropped, grayscaled, downsized and stripped of EXIF."""
+    original = make_receipt_photo(orientation=6)
+
+    processed = preprocess_receipt_image(original)
+    image = Image.open(io.BytesIO(processed))
+
+    assert image.format == "JPEG"
+    assert image.mode == "L"
+    assert max(image.size) <= settings.RECEIPT_MAX_DIMENSION
+    assert 0x0112 not in image.getexif()
+    assert len(processed) < len(original) / 3
+    # The photo itself would come out portrait (3000x4000 once rotated); the
+    # receipt, a 1000x2000 strip rotated a quarter turn, comes out 2:1 landscape
+    assert image.width / image.height == pytest.approx(2, rel=0.05)
+
+
+@pytest.mark.unit
+def test_preprocess_rejects_non_images():
+    """Test that undecodable uploads raise a dedicated error."""
+    with pytest.raises(ReceiptImageError):
+        preprocess_receipt_image(b"not an image")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_preprocess_in_process_pool():
+    """Test that preprocessing works through the process pool, whose workers aren't forked from the app."""
+    with patch.object(settings, "RECEIPT_PREPROCESS_WORKERS", 1):
+        try:
+            processed, mime_type = await preprocess_receipt(make_receipt_photo(800, 600))
+            assert receipt_processing._get_executor()._mp_context.get_start_method() != "fork"
+        finally:
+            receipt_processing.shutdown_receipt_executor()
+
+    assert mime_type == "image/jpeg"
+    assert Image.open(io.BytesIO(processed)).mode == "L"
+
+
+@pytest.mark.integration
+def test_ocr_endpoint_uploads_processed_image(client, db_session):
+    """Test that the OCR endpoint sends the preprocessed image to the AI."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+    fake = RecordingAIService()
+    app.dependency_overrides[get_ai_service] = lambda: fake
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    photo = make_receipt_photo()
+
+    response = client.post(
+        "/api/v1/expenses/ai/ocr",
+        files={"file": ("receipt.jpg", photo, "image/jpeg")},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["merchant"] == "Tesco"
+    uploaded, mime_type = fake.uploads[0]
+    assert mime_type == "image/jpeg"
+    assert len(uploaded) < len(photo)
+
+    response = client.post(
+        "/api/v1/expenses/ai/ocr",
+        files={"file": ("notes.txt", b"hello", "text/plain")},
+        headers=headers,
+    )
+    assert response.status_code == 415
@@ -0,0 +1,312 @@
+"""
+Tests for read replica routing.
+"""
+import pytest
+import threading
+import time
+import uuid
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from app.core import db_metrics, replicas
+from app.core.config import settings
+from app.core.database import Base, RoutingSession, get_db
+from app.core.replicas import ReplicaRouter
+from app.core.security import create_access_token
+from app.main import app
+from app.models.expense import Expense
+from app.models.household import Household, HouseholdMember, MemberRole
+from app.models.user import User
+
+
+def sqlite_engine():
+    """Create a separate in-memory database with the app's tables."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def databases():
+    """A primary and a replica holding different users."""
+    primary, replica = sqlite_engine(), sqlite_engine()
+    for engine, name in ((primary, "primary"), (replica, "replica")):
+        session = RoutingSession(bind=engine)
+        session.add(User(id=uuid.uuid4(), email=f"{name}@example.com", full_name=name, google_id=name))
+        session.commit()
+        session.close()
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+class InlineThread:
+    """Thread double that runs its target when started, so lag checks finish before route() returns."""
+
+    def __init__(self, target, args=(), daemon=None):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def router(databases):
+    """A router over the replica, standing in for the app's router."""
+    router = ReplicaRouter([databases[1]])
+    writes = replicas._replica_writes.set(None)
+    with patch.object(replicas, "replica_router", router), \
+            patch.object(replicas.threading, "Thread", InlineThread):
+        yield router
+    replicas._replica_writes.reset(writes)
+
+
+def user_names(db) -> set:
+    """Names of the users the session can see."""
+    return {user.full_name for user in db.query(User).all()}
+
+
+@pytest.mark.unit
+def test_routed_session_reads_replica_and_writes_primary(databases, router):
+    """Test that reads go to the assigned replica, writes still go to the primary."""
+    primary, replica = databases
+    db = RoutingSession(bind=primary)
+
+    assert router.route(db, uuid.uuid4())
+    assert user_names(db) == {"replica"}
+
+    db.add(User(id=uuid.uuid4(), email="new@example.com", full_name="new", google_id="new"))
+    db.commit()
+
+    assert "replica" not in db.info
+    assert user_names(db) == {"primary", "new"}
+    db.close()
+
+
+@pytest.mark.unit
+def test_user_reads_primary_until_a_replica_has_their_write(databases, router):
+    """Test that a user who just committed a write only reads a replica that has replayed its WAL position."""
+    primary, _ = databases
+    user_id = uuid.uuid4()
+    writes = replicas.start_replica_writes(None)
+    db = RoutingSession(bind=primary)
+    db.info["user_id"] = user_id
+    db.add(User(id=user_id, email="writer@example.com", full_name="writer", google_id="writer"))
+    with patch.object(replicas, "current_lsn", return_value=5000) as current_lsn:
+        db.commit()
+        db.query(User).all()
+        db.rollback()
+    current_lsn.assert_called_once_with(primary)
+    assert writes.read_after(user_id) == 5000
+    assert writes.read_after(uuid.uuid4()) is None
+
+    with patch.object(replicas, "measure_lag", return_value=(0.0, 4999)):
+        assert not router.route(db, user_id)
+        assert "writer" in user_names(db)
+        assert router.route(db, uuid.uuid4())
+    db.close()
+
+    # Another worker only has the token the response carried
+    replicas.start_replica_writes(writes.response_token())
+    with patch.object(settings, "REPLICA_LAG_CHECK_SECONDS", 0):
+        with patch.object(replicas, "measure_lag", return_value=(0.0, 4999)):
+            assert not router.route(db, user_id)
+        with patch.object(replicas, "measure_lag", return_value=(0.0, None)):
+            assert not router.route(db, user_id)
+        with patch.object(replicas, "measure_lag", return_value=(0.0, 5000)):
+            assert router.route(db, user_id)
+    db.close()
+
+
+@pytest.mark.unit
+def test_read_after_token_is_bound_to_user_and_expires():
+    """Test that X-Read-After tokens are only honoured for their user, unaltered and while fresh."""
+    user_id = uuid.uuid4()
+    token = replicas.sign_read_after(user_id, 5000, time.time())
+    lsn, issued_ms, signature = token.split(".")
+
+    assert replicas.verify_read_after(token, user_id) == 5000
+    assert replicas.verify_read_after(token, uuid.uuid4()) is None
+    assert replicas.verify_read_after(f"4000.{issued_ms}.{signature}", user_id) is None
+    assert replicas.verify_read_after(f"{lsn}.{int(issued_ms) + 1000}.{signature}", user_id) is None
+    assert replicas.verify_read_after("not-a-token", user_id) is None
+    assert replicas.verify_read_after(None, user_id) is None
+    with patch.object(settings, "REPLICA_STICKY_SECONDS", 0):
+        assert replicas.verify_read_after(token, user_id) is None
+
+
+@pytest.mark.unit
+def test_lagging_or_unreachable_replica_falls_back_to_primary(databases, router):
+    """Test that replicas are skipped while lagging or down, with lag checked once per window."""
+    db = RoutingSession(bind=databases[0])
+
+    with patch.object(replicas, "measure_lag", return_value=(60.0, None)) as measure:
+        assert not router.route(db, uuid.uuid4())
+        assert not router.route(db, uuid.uuid4())
+    assert measure.call_count == 1
+    assert router.status()["lag_seconds"] == [60.0]
+
+    with patch.object(settings, "REPLICA_LAG_CHECK_SECONDS", 0), \
+            patch.object(replicas, "measure_lag", side_effect=OperationalError("SELECT", {}, Exception())):
+        assert not router.route(db, uuid.uuid4())
+    assert router.status()["lag_seconds"] == [None]
+
+    with patch.object(settings, "REPLICA_LAG_CHECK_SECONDS", 0):
+        assert router.route(db, uuid.uuid4())
+    assert user_names(db) == {"replica"}
+    db.close()
+
+
+@pytest.mark.unit
+def test_lag_is_checked_in_one_background_thread_at_a_time(databases):
+    """Test that concurrent callers don't block on, or repeat, a lag check in progress."""
+    router = ReplicaRouter([databases[1]])
+    release = threading.Event()
+
+    def slow_measure(replica):
+        release.wait(timeout=5)
+        return 0.5, None
+
+    with patch.object(replicas, "measure_lag", side_effect=slow_measure) as measure:
+        callers = [threading.Thread(target=router.lag, args=(0,)) for _ in range(8)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join(timeout=1)
+        assert not any(caller.is_alive() for caller in callers)
+        assert router.lag(0) is None
+
+        release.set()
+        for _ in range(100):
+            if router.status()["lag_seconds"] == [0.5]:
+                break
+            time.sleep(0.01)
+
+    assert measure.call_count == 1
+    assert router.lag(0) == 0.5
+
+
+@pytest.mark.unit
+def test_replica_queries_do_not_count_as_primary_traffic(databases):
+    """Test that only primary statements update last_query, and replica pools have their own gauges."""
+    primary, replica = databases
+    with patch.object(replicas, "create_engine", return_value=replica):
+        replicas.create_replica_engine("postgresql://replica/app", 1)
+    db_metrics.instrument_engine(primary)
+
+    def active(name):
+        return REGISTRY.get_sample_value("db_connections_active", {"engine": name}) or 0
+
+    with patch.object(db_metrics, "_last_query", None):
+        primary_before = active("primary")
+        with replica.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            assert active("replica-1") == 1
+            assert active("primary") == primary_before
+        assert db_metrics.last_query() is None
+        assert active("replica-1") == 0
+
+        with primary.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            assert active("primary") == primary_before + 1
+        assert db_metrics.last_query()[0] < 1
+
+
+@pytest.mark.integration
+def test_read_only_endpoint_routes_after_authenticating(client, db_session):
+    """Test that read-only endpoints authenticate first, then ask for a replica."""
+    user = User(id=uuid.uuid4(), email="test@example.com", full_name="Test User", google_id="google-123")
+    db_session.add(user)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+    with patch.object(replicas.replica_router, "route", return_value=False) as route:
+        assert client.get("/api/v1/households/mine", headers=headers).status_code == 200
+        assert client.post("/api/v1/households/", json={"name": "Flat"}, headers=headers).status_code == 201
+
+    route.assert_called_once_with(db_session, user.id)
+    assert db_session.info["user_id"] == user.id
+
+
+@pytest.mark.integration
+def test_removed_member_is_refused_while_replica_still_lists_them(client, databases):
+    """Test that access is checked on the primary even when the replica hasn't caught up with a removal."""
+    primary, replica = databases
+    user_id, household_id = uuid.uuid4(), uuid.uuid4()
+    for engine in (primary, replica):
+        session = RoutingSession(bind=engine)
+        session.add(User(id=user_id, email="member@example.com", full_name="Member", google_id="google-123"))
+        session.add(Household(id=household_id, name="Flat", created_by=user_id))
+        session.add(Expense(household_id=household_id, created_by=user_id, amount=10, description="Milk"))
+        session.commit()
+        session.close()
+    session = RoutingSession(bind=replica)
+    session.add(HouseholdMember(user_id=user_id, household_id=household_id, role=MemberRole.OWNER))
+    session.commit()
+    session.close()
+
+    def routed_db():
+        db = RoutingSession(bind=primary)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = routed_db
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    with patch.object(replicas.replica_router, "replicas", [replica]), \
+            patch.object(replicas.replica_router, "_lag", {}), \
+            patch.object(replicas.threading, "Thread", InlineThread), \
+            patch.object(replicas.replica_router, "route", wraps=replicas.replica_router.route) as route:
+        assert client.get(f"/api/v1/households/{household_id}", headers=headers).status_code == 403
+        assert client.get(f"/api/v1/expenses/households/{household_id}/summary", headers=headers).status_code == 403
+        assert client.get("/api/v1/todos/", params={"household_id": str(household_id)}, headers=headers).status_code == 403
+        assert client.get("/api/v1/expenses/", headers=headers).json() == []
+        assert client.get("/api/v1/households/mine", headers=headers).json() == []
+
+    # Only the list endpoints, which found no households, got as far as routing
+    assert route.call_count == 2
+
+
+@pytest.mark.integration
+def test_write_response_keeps_the_client_on_the_primary(client, databases):
+    """Test that a write's response carries a read-after token, sent back by header or cookie."""
+    primary, replica = databases
+    user_id = uuid.uuid4()
+    session = RoutingSession(bind=primary)
+    session.add(User(id=user_id, email="member@example.com", full_name="Member", google_id="google-123"))
+    session.commit()
+    session.close()
+
+    def routed_db():
+        db = RoutingSession(bind=primary)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = routed_db
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    with patch.object(replicas.replica_router, "replicas", [replica]), \
+            patch.object(replicas.replica_router, "pick", return_value=None) as pick, \
+            patch.object(replicas, "current_lsn", return_value=5000):
+        response = client.post("/api/v1/households/", json={"name": "Flat"}, headers=headers)
+        assert response.status_code == 201
+        token = response.headers[replicas.READ_AFTER_HEADER]
+        assert f"{replicas.READ_AFTER_COOKIE}={token}" in response.headers["set-cookie"]
+        assert replicas.verify_read_after(token, user_id) == 5000
+
+        # The cookie comes back on its own
+        client.get("/api/v1/households/mine", headers=headers)
+        client.cookies.clear()
+        client.get("/api/v1/households/mine", headers={**headers, replicas.READ_AFTER_HEADER: token})
+        response = client.get("/api/v1/households/mine", headers=headers)
+        assert replicas.READ_AFTER_HEADER not in response.headers
+
+    assert [call.args for call in pick.call_args_list] == [(5000,), (5000,), (None,)]
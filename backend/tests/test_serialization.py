@@ -0,0 +1,107 @@
+"""
+Tests for serving responses from plain database rows.
+"""
+import pytest
+import uuid
+from decimal import Decimal
+
+from app.core.security import create_access_token
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+from app.models.expense import Expense, ExpenseSplit, ExpenseCategory
+from app.models.todo import Todo
+from app.schemas.base import schema_columns
+from app.schemas.expense import ExpenseResponse
+
+
+@pytest.fixture
+def household(db_session):
+    """Create two members of a household with a few expenses split between them."""
+    users = [
+        User(
+            id=uuid.uuid4(),
+            email=f"test{index}@example.com",
+            full_name=f"Test User {index}",
+            google_id=f"google-12{index}",
+            is_active=True
+        )
+        for index in range(2)
+    ]
+    db_session.add_all(users)
+    db_session.flush()
+    household = Household(name="Test House", created_by=users[0].id)
+    db_session.add(household)
+    db_session.flush()
+    for user in users:
+        db_session.add(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.MEMBER))
+    for index in range(3):
+        expense = Expense(
+            household_id=household.id,
+            created_by=users[index % 2].id,
+            amount=Decimal("42.50"),
+            description=f"Groceries {index}",
+            category=ExpenseCategory.GROCERIES,
+        )
+        db_session.add(expense)
+        db_session.flush()
+        for user in users:
+            db_session.add(ExpenseSplit(expense_id=expense.id, user_id=user.id, amount_owed=Decimal("21.25")))
+    db_session.add(Todo(household_id=household.id, title="Bins", created_by=users[0].id))
+    db_session.commit()
+    return household
+
+
+def auth_headers(household) -> dict:
+    """Headers authenticating as the household's creator."""
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(household.created_by)})}"}
+
+
+@pytest.mark.unit
+def test_schema_columns_skip_fields_without_columns():
+    """Test that only fields backed by a column are selected."""
+    names = [column.key for column in schema_columns(ExpenseResponse, Expense)]
+
+    assert names[0] == "id"
+    assert "amount" in names
+    assert "creator_name" not in names
+
+
+@pytest.mark.integration
+def test_list_expenses_includes_creator(client, household):
+    """Test that listed expenses carry their creator's details."""
+    response = client.get("/api/v1/expenses/", headers=auth_headers(household))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body) == 3
+    assert {expense["creator_name"] for expense in body} == {"Test User 0", "Test User 1"}
+    assert all(expense["amount"] == "42.50" and expense["category"] == "groceries" for expense in body)
+
+
+@pytest.mark.integration
+def test_sync_groups_splits_by_expense(client, household):
+    """Test that synced expenses carry their own splits, loaded in one query."""
+    response = client.post(
+        "/api/v1/sync/",
+        json={"last_sync_timestamp": 0, "household_id": str(household.id)},
+        headers=auth_headers(household),
+    )
+
+    assert response.status_code == 200
+    expenses = response.json()["expenses"]
+    assert len(expenses) == 3
+    for expense in expenses:
+        assert len(expense["splits"]) == 2
+        assert all(split["expense_id"] == expense["id"] for split in expense["splits"])
+    assert response.json()["todos"][0]["title"] == "Bins"
+    assert int(response.headers["X-DB-Queries"]) < 10
+
+
+@pytest.mark.integration
+def test_list_todos_returns_rows(client, household):
+    """Test that todos listed from plain rows keep their enum values."""
+    response = client.get(f"/api/v1/todos/?household_id={household.id}", headers=auth_headers(household))
+
+    assert response.status_code == 200
+    assert response.json()[0]["title"] == "Bins"
+    assert response.json()[0]["status"] == "pending"
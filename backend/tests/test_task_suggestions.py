@@ -0,0 +1,160 @@
+"""
+Tests for cached AI task suggestions.
+"""
+import asyncio
+import pytest
+import uuid
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import create_access_token
+from app.main import app
+from app.models.user import User
+from app.models.household import Household, HouseholdMember, MemberRole
+from app.models.todo import Todo
+from app.services.ai_service import get_ai_service
+from app.services.task_suggestions import TaskSuggestionCache, household_fingerprint, task_suggestion_cache
+
+
+class SuggestingAIService:
+    """AI service double numbering each batch of suggestions it generates."""
+
+    def __init__(self, empty=False):
+        self.calls = 0
+        self.empty = empty
+
+    async def suggest_tasks(self, household_context, existing_tasks, recent_expenses=None):
+        self.calls += 1
+        if self.empty:
+            return []
+        return [
+            {
+                "title": f"Suggestion {self.calls}",
+                "description": f"Based on {len(existing_tasks)} open tasks",
+                "priority": "medium",
+                "category": "chores",
+                "reasoning": "Test",
+            }
+        ]
+
+
+@pytest.fixture
+def household_member(db_session):
+    """Create a user who owns a household."""
+    user = User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        full_name="Test User",
+        google_id="google-123",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.flush()
+    household = Household(name="Test House", created_by=user.id)
+    db_session.add(household)
+    db_session.flush()
+    db_session.add(HouseholdMember(user_id=user.id, household_id=household.id, role=MemberRole.OWNER))
+    db_session.commit()
+    return user, household
+
+
+def add_todo(db_session, user, household, title="Take out bins"):
+    """Add an open todo to the household."""
+    db_session.add(Todo(household_id=household.id, title=title, created_by=user.id))
+    db_session.commit()
+
+
+def make_cache(db_session):
+    """Build a cache whose background refreshes use the test database."""
+    return TaskSuggestionCache(session_factory=sessionmaker(bind=db_session.get_bind()))
+
+
+@pytest.mark.unit
+def test_fingerprint_tracks_household_changes(db_session, household_member):
+    """Test that the fingerprint is stable until todos or members change."""
+    user, household = household_member
+    first = household_fingerprint(db_session, household.id)
+    assert household_fingerprint(db_session, household.id) == first
+
+    add_todo(db_session, user, household)
+    second = household_fingerprint(db_session, household.id)
+    assert second != first
+
+    db_session.query(HouseholdMember).delete()
+    db_session.commit()
+    assert household_fingerprint(db_session, household.id) != second
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_unchanged_household_is_served_from_cache(db_session, household_member):
+    """Test that repeat views don't call the AI while nothing changed."""
+    _, household = household_member
+    cache = make_cache(db_session)
+    ai_service = SuggestingAIService()
+
+    first, first_cached = await cache.get_suggestions(ai_service, db_session, household)
+    second, second_cached = await cache.get_suggestions(ai_service, db_session, household)
+
+    assert (first_cached, second_cached) == (False, True)
+    assert second == first
+    assert ai_service.calls == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_changed_household_serves_stale_and_refreshes(db_session, household_member):
+    """Test that outdated suggestions are served while new ones are generated in the background."""
+    user, household = household_member
+    cache = make_cache(db_session)
+    ai_service = SuggestingAIService()
+    await cache.get_suggestions(ai_service, db_session, household)
+
+    add_todo(db_session, user, household)
+    stale, cached = await cache.get_suggestions(ai_service, db_session, household)
+    assert cached is True
+    assert stale[0]["title"] == "Suggestion 1"
+
+    await asyncio.gather(*cache._tasks)
+    db_session.expire_all()
+    fresh, cached = await cache.get_suggestions(ai_service, db_session, household)
+
+    assert cached is True
+    assert fresh[0]["title"] == "Suggestion 2"
+    assert fresh[0]["description"] == "Based on 1 open tasks"
+    assert ai_service.calls == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_failed_suggestions_are_not_cached(db_session, household_member):
+    """Test that an empty answer from the AI is retried on the next view."""
+    _, household = household_member
+    cache = make_cache(db_session)
+    ai_service = SuggestingAIService(empty=True)
+
+    await cache.get_suggestions(ai_service, db_session, household)
+    suggestions, cached = await cache.get_suggestions(ai_service, db_session, household)
+
+    assert suggestions == []
+    assert cached is False
+    assert ai_service.calls == 2
+
+
+@pytest.mark.integration
+def test_suggest_tasks_endpoint_reports_cached(client, household_member):
+    """Test that the second request for the same household is answered from the cache."""
+    user, household = household_member
+    fake = SuggestingAIService()
+    app.dependency_overrides[get_ai_service] = lambda: fake
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    url = f"/api/v1/expenses/ai/suggest-tasks?household_id={household.id}"
+
+    first = client.post(url, headers=headers)
+    second = client.post(url, headers=headers)
+
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["suggestions"] == first.json()["suggestions"]
+    assert fake.calls == 1
+    assert not task_suggestion_cache._tasks
@@ -0,0 +1,83 @@
+"""
+Tests for OpenTelemetry tracing.
+"""
+import pytest
+from unittest.mock import patch
+
+from app.core import tracing
+from app.core.config import settings
+from app.services.ai_router import AIRouter
+from app.services.health import ReadinessMonitor
+
+
+class AnsweringProvider:
+    """Provider double answering every categorization."""
+
+    name = "tracing-provider"
+
+    def is_available(self):
+        return True
+
+    async def categorize_expense(self, description, amount, context=None):
+        return {"category": "Groceries", "confidence": 0.9}
+
+
+@pytest.fixture
+def spans():
+    """Enable tracing with the in-memory exporter, restoring the no-op tracer afterwards."""
+    with patch.object(settings, "ENABLE_TRACING", True), \
+            patch.object(settings, "TRACING_EXPORTER", "memory"), \
+            patch.object(tracing, "_tracer", tracing._tracer), \
+            patch.object(tracing, "_enabled", False), \
+            patch.object(tracing, "memory_exporter", None):
+        assert tracing.init_tracing()
+        yield tracing.memory_exporter
+
+
+@pytest.mark.integration
+def test_request_continues_propagated_trace(client, spans):
+    """Test that the request span joins the caller's trace and SQL spans are its children."""
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    parent_id = "00f067aa0ba902b7"
+    # A fresh monitor with no recent traffic probes the database inline
+    with patch("app.main.readiness_monitor", ReadinessMonitor()), \
+            patch("app.services.health.last_query", return_value=None):
+        client.get("/health", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    finished = spans.get_finished_spans()
+    request_span = next(span for span in finished if span.name == "GET /health")
+    assert format(request_span.context.trace_id, "032x") == trace_id
+    assert format(request_span.parent.span_id, "016x") == parent_id
+    assert request_span.attributes["http.response.status_code"] == 200
+
+    sql_spans = [
+        span for span in finished
+        if "db.statement" in span.attributes and span.context.trace_id == request_span.context.trace_id
+    ]
+    assert sql_spans
+    assert all(span.parent.span_id == request_span.context.span_id for span in sql_spans)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_ai_provider_calls_are_traced(spans):
+    """Test that each provider call gets a span with its provider and outcome."""
+    router = AIRouter([AnsweringProvider()])
+    await router.call(
+        "categorize",
+        lambda provider: provider.categorize_expense("Tesco", 12.5),
+        lambda result: result["confidence"] <= 0,
+        lambda: {"category": "Other", "confidence": 0.0},
+    )
+
+    (span,) = spans.get_finished_spans()
+    assert span.name == "ai categorize"
+    assert span.attributes["ai.provider"] == "tracing-provider"
+    assert span.attributes["ai.status"] == "success"
+
+
+@pytest.mark.integration
+def test_tracing_is_off_by_default(client):
+    """Test that no spans are recorded unless ENABLE_TRACING is set."""
+    assert not tracing.tracing_enabled()
+    assert client.get("/health").status_code == 200